@@ -0,0 +1,37 @@
+"""Dependências de autorização das rotas.
+
+O FastAPI resolve cada dependência uma vez por requisição, então o token é
+validado e o role é descoberto uma única vez, por mais que a rota os use.
+Rotas admin recebem `current_role` e chamam `ensure_admin` no começo do corpo.
+
+O role vem primeiro de `app_metadata.role` do usuário autenticado (claims do
+JWT na validação local, ou o usuário devolvido pelo GoTrue no modo remote):
+`app_metadata` só é gravável com a service role, então é confiável. Sem ele,
+`users_repo.get_role` consulta a tabela `users` com cache de TTL curto.
+"""
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, Header, HTTPException
+
+from ..utils.auth import get_user_from_token_async
+from . import users_repo
+
+ADMIN_ROLE = "admin"
+
+
+async def current_user(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+    return await get_user_from_token_async(authorization)
+
+
+async def current_role(user: Dict[str, Any] = Depends(current_user)) -> Optional[str]:
+    role = (user.get("app_metadata") or {}).get("role")
+    if role:
+        return role
+    return await users_repo.get_role(user.get("id"))
+
+
+def ensure_admin(role: Optional[str]) -> None:
+    """Chamado no corpo da rota: sem token é 401 (na dependência), corpo inválido
+    é 422 e só então falta de permissão vira 403."""
+    if role != ADMIN_ROLE:
+        raise HTTPException(status_code=403, detail="Acesso negado: requer role admin")
@@ -1,5 +1,119 @@
+import asyncio
+import logging
 import os
-from supabase import create_client, Client
+from typing import Callable, Optional
+
+import httpx
+from gotrue import AsyncMemoryStorage
+from postgrest import AsyncPostgrestClient
+from supabase import create_client, Client, ClientOptions
+from supabase._async.auth_client import AsyncSupabaseAuthClient
+from supabase._async.client import AsyncClient
+
+from ..utils import metrics
+from ..utils.env import env_bool
+from ..utils.resilience import ResilientTransport
+
+logger = logging.getLogger("app")
+
+
+# Pool HTTP: todos os clientes (anon e service, GoTrue e PostgREST) compartilham
+# um único transporte por processo, com limites e timeouts explícitos.
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.environ.get("SUPABASE_HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.environ.get("SUPABASE_HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.environ.get("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+def http_timeout() -> httpx.Timeout:
+    read = float(os.environ.get("SUPABASE_HTTP_READ_TIMEOUT", "10"))
+    return httpx.Timeout(
+        connect=float(os.environ.get("SUPABASE_HTTP_CONNECT_TIMEOUT", "5")),
+        read=read,
+        write=read,
+        # Tempo máximo esperando uma conexão livre do pool
+        pool=float(os.environ.get("SUPABASE_HTTP_POOL_TIMEOUT", "5")),
+    )
+
+
+def _http2() -> bool:
+    return env_bool("SUPABASE_HTTP2", True)
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close()
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Transporte compartilhado que publica o uso do pool nas métricas."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_connections: int):
+        self._transport = transport
+        metrics.UPSTREAM_POOL_MAX.set(max_connections)
+
+    def _done(self) -> None:
+        metrics.UPSTREAM_IN_FLIGHT.dec()
+        pool = getattr(self._transport, "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+            idle = sum(1 for c in connections if c.is_idle())
+            metrics.UPSTREAM_POOL_CONNECTIONS.labels("active").set(len(connections) - idle)
+            metrics.UPSTREAM_POOL_CONNECTIONS.labels("idle").set(idle)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics.UPSTREAM_IN_FLIGHT.inc()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._done()
+            raise
+        # A conexão só volta ao pool quando o corpo termina de ser lido
+        response.stream = _TrackedStream(response.stream, self._done)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _pool_transport() -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(http2=_http2(), limits=_limits())
+
+
+_transport: Optional[ResilientTransport] = None
+_sync_transport: Optional[httpx.HTTPTransport] = None
+
+
+def get_transport() -> ResilientTransport:
+    """Pool compartilhado, com prazos, retries e circuit breaker por cima (ver utils/resilience.py)."""
+    global _transport
+    if _transport is None:
+        _transport = ResilientTransport(PooledTransport(_pool_transport(), _limits().max_connections))
+    return _transport
+
+
+def _get_sync_transport() -> httpx.HTTPTransport:
+    global _sync_transport
+    if _sync_transport is None:
+        _sync_transport = httpx.HTTPTransport(http2=_http2(), limits=_limits())
+    return _sync_transport
+
 
 # Workaround: gotrue uses 'proxy' arg unsupported by httpx>=0.24.
 # Monkeypatch to ignore 'proxy' when constructing SyncClient.
@@ -11,15 +125,16 @@ def _patch_gotrue_httpx_proxy():
         return
     try:
         from gotrue._sync import gotrue_base_api as gb  # type: ignore
-        from httpx import SyncClient as _HttpxSyncClient  # type: ignore
+        from gotrue.http_clients import SyncClient as _HttpxSyncClient  # type: ignore
 
         # Replace the SyncClient reference in gotrue module with a factory
-        # that ignores unsupported 'proxy' arg.
+        # that ignores unsupported 'proxy' arg and uses the shared sync pool.
         def _sync_client_factory(*, verify: bool = True, proxy=None, follow_redirects: bool = True, http2: bool = True):
             return _HttpxSyncClient(
                 verify=bool(verify),
                 follow_redirects=follow_redirects,
-                http2=http2,
+                timeout=http_timeout(),
+                transport=_get_sync_transport(),
             )
 
         gb.SyncClient = _sync_client_factory  # type: ignore
@@ -54,4 +169,111 @@ def get_service_client() -> Client | None:
         _service_client = None
         return _service_client
     _service_client = create_client(supabase_url, supabase_service_key)
-    return _service_client
\ No newline at end of file
+    return _service_client
+
+# Clientes assíncronos: usados pelas rotas `async def`, sem ocupar o threadpool.
+# Sessões de usuário não são persistidas nem renovadas no cliente compartilhado.
+_async_anon_client: AsyncClient | None = None
+_async_service_client: AsyncClient | None = None
+
+
+def _async_options() -> ClientOptions:
+    return ClientOptions(storage=AsyncMemoryStorage(), auto_refresh_token=False, persist_session=False)
+
+
+def _pooled_http_client(**kwargs) -> httpx.AsyncClient:
+    # Nunca fechar estes clientes individualmente: `aclose()` fecharia o
+    # transporte compartilhado. O pool é fechado uma vez em `close_async_clients`.
+    return httpx.AsyncClient(transport=get_transport(), timeout=http_timeout(), follow_redirects=True, **kwargs)
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True) -> httpx.AsyncClient:
+        return _pooled_http_client(base_url=base_url, headers=headers)
+
+
+class PooledAsyncClient(AsyncClient):
+    """Cliente Supabase assíncrono cujo GoTrue e PostgREST usam o pool compartilhado."""
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url: str, client_options: ClientOptions) -> AsyncSupabaseAuthClient:
+        return AsyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=_pooled_http_client(),
+        )
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None) -> AsyncPostgrestClient:
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema)
+
+
+def get_async_anon_client() -> AsyncClient:
+    global _async_anon_client
+    if _async_anon_client is not None:
+        return _async_anon_client
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_anon_key = os.environ.get("SUPABASE_ANON_KEY")
+    if not supabase_url or not supabase_anon_key:
+        raise RuntimeError("SUPABASE_URL e SUPABASE_ANON_KEY são obrigatórios no .env")
+    _async_anon_client = PooledAsyncClient(supabase_url, supabase_anon_key, _async_options())
+    return _async_anon_client
+
+
+def get_async_service_client() -> AsyncClient | None:
+    global _async_service_client
+    if _async_service_client is not None:
+        return _async_service_client
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not supabase_service_key:
+        _async_service_client = None
+        return _async_service_client
+    _async_service_client = PooledAsyncClient(supabase_url, supabase_service_key, _async_options())
+    return _async_service_client
+
+
+async def warmup() -> None:
+    """Cria os clientes e abre conexões do pool antes da primeira requisição.
+
+    Falhas só geram log: a API sobe mesmo com o Supabase fora do ar.
+    """
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_anon_key = os.environ.get("SUPABASE_ANON_KEY")
+    if not supabase_url or not supabase_anon_key:
+        return
+    get_async_anon_client()
+    get_async_service_client()
+    transport = get_transport()
+
+    async def probe() -> None:
+        request = httpx.Request(
+            "GET",
+            f"{supabase_url.rstrip('/')}/auth/v1/health",
+            headers={"apikey": supabase_anon_key},
+            extensions={"timeout": http_timeout().as_dict()},
+        )
+        response = await transport.handle_async_request(request)
+        await response.aread()
+        await response.aclose()
+
+    # Sondas simultâneas: cada uma ocupa uma conexão (handshake TLS incluído)
+    connections = int(os.environ.get("SUPABASE_HTTP_WARMUP_CONNECTIONS", "2"))
+    results = await asyncio.gather(*(probe() for _ in range(connections)), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("supabase_warmup_failed: %r", result)
+
+
+async def close_async_clients() -> None:
+    """Fecha o pool compartilhado; os próximos acessos criam clientes novos."""
+    global _transport, _async_anon_client, _async_service_client
+    transport, _transport = _transport, None
+    _async_anon_client = None
+    _async_service_client = None
+    if transport is not None:
+        await transport.aclose()
@@ -0,0 +1,228 @@
+"""Importação em massa de usuários (`POST /users/import`).
+
+O corpo (NDJSON ou CSV com cabeçalho `email,password,name,phone`) é lido e
+validado linha a linha enquanto chega. As linhas válidas passam por
+`IMPORT_SIGNUP_CONCURRENCY` sign-ups simultâneos no GoTrue e os perfis são
+gravados em `insert`s de até `IMPORT_INSERT_CHUNK` linhas. Um resultado por
+linha volta assim que fica pronto (fora da ordem do arquivo, com o número da
+linha) e, no fim, um resumo.
+
+Memória limitada qualquer que seja o tamanho do arquivo: filas curtas entre as
+etapas seguram a leitura do corpo quando o GoTrue ou o cliente ficam lentos, e
+linhas acima de `IMPORT_MAX_LINE_BYTES` são recusadas sem serem acumuladas.
+
+O sign-up e o insert não são atômicos: uma linha cujo sign-up deu certo e cujo
+insert falhou volta como `auth_created`, com o `id` da conta no GoTrue, para
+que o perfil seja criado depois. Se o corpo falhar no meio, as linhas já aceitas
+terminam antes do erro; se o cliente desconectar, os ids que ficaram sem perfil
+vão para o log (`import_auth_created`).
+"""
+import asyncio
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..schemas import RegisterRequest
+from ..utils.logging import get_logger
+from ..utils.metrics import upstream_call
+from . import users_repo
+from .supabase_client import get_async_anon_client
+
+CSV_COLUMNS = ("email", "password", "name", "phone")
+
+_DONE = object()
+
+logger = get_logger()
+
+
+def _settings() -> Tuple[int, int, int]:
+    return (
+        max(1, int(os.environ.get("IMPORT_SIGNUP_CONCURRENCY", "8"))),
+        max(1, int(os.environ.get("IMPORT_INSERT_CHUNK", "200"))),
+        int(os.environ.get("IMPORT_MAX_LINE_BYTES", "65536")),
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """Linhas do corpo, sem o `\\n`; `None` no lugar de uma linha longa demais."""
+    buffer = bytearray()
+    too_long = False
+    async for chunk in chunks:
+        buffer += chunk
+        while (end := buffer.find(b"\n")) >= 0:
+            line = bytes(buffer[:end])
+            del buffer[: end + 1]
+            yield None if too_long or len(line) > max_bytes else line
+            too_long = False
+        if len(buffer) > max_bytes:
+            # Descarta o resto da linha até o próximo `\n`
+            too_long = True
+            buffer.clear()
+    if too_long:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'linha'}: {err['msg']}" for err in e.errors())
+
+
+class _Parser:
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+
+    def parse(self, line: bytes) -> Optional[Dict[str, Any]]:
+        """Dict da linha; None para o cabeçalho do CSV. Levanta ValueError se ilegível."""
+        text = line.decode("utf-8").strip()
+        if self.fmt == "ndjson":
+            row = json.loads(text)
+            if not isinstance(row, dict):
+                raise ValueError("cada linha deve ser um objeto JSON")
+            return row
+        fields = next(csv.reader([text]))
+        if self.header is None:
+            header = [f.strip().lower() for f in fields]
+            missing = [c for c in CSV_COLUMNS if c not in header]
+            if missing:
+                raise ValueError(f"cabeçalho do CSV sem as colunas: {', '.join(missing)}")
+            self.header = header
+            return None
+        return dict(zip(self.header, fields))
+
+
+async def _sign_up(email: str, password: str) -> str:
+    anon_client = get_async_anon_client()
+    with upstream_call("auth.sign_up"):
+        res = await anon_client.auth.sign_up({"email": email, "password": password})
+    user = getattr(res, "user", None)
+    user_id = getattr(user, "id", None)
+    if user_id is None and isinstance(user, dict):
+        user_id = user.get("id")
+    if not user_id:
+        raise ValueError("Falha ao obter ID do usuário")
+    return user_id
+
+
+def _error(e: BaseException) -> str:
+    return getattr(e, "detail", None) or str(e) or type(e).__name__
+
+
+async def import_users(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Dict[str, Any]]:
+    """Resultados por linha (`created`, `auth_created`, `invalid` ou `error`) e, por último, o resumo."""
+    concurrency, chunk_size, max_line = _settings()
+    signups: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    results: asyncio.Queue = asyncio.Queue(maxsize=chunk_size + concurrency)
+    summary = {"rows": 0, "created": 0, "auth_created": 0, "invalid": 0, "failed": 0}
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+    # Contas já criadas no GoTrue cujo resultado ainda não foi emitido, por linha
+    unsaved: Dict[int, str] = {}
+
+    async def emit(result: Dict[str, Any]) -> None:
+        summary[result["status"] if result["status"] in summary else "failed"] += 1
+        unsaved.pop(result.get("line"), None)
+        await results.put(result)
+
+    async def read() -> None:
+        parser = _Parser(fmt)
+        number = 0
+        async for line in _lines(chunks, max_line):
+            number += 1
+            if line is not None and not line.strip():
+                continue
+            try:
+                if line is None:
+                    raise ValueError(f"linha maior que {max_line} bytes")
+                row = parser.parse(line)
+                if row is None:
+                    continue
+                payload = RegisterRequest.model_validate(row)
+            except ValidationError as e:
+                summary["rows"] += 1
+                await emit({"line": number, "status": "invalid", "error": _validation_error(e)})
+                continue
+            except ValueError as e:
+                summary["rows"] += 1
+                await emit({"line": number, "status": "invalid", "error": str(e)})
+                if parser.fmt == "csv" and parser.header is None:
+                    # Sem cabeçalho válido nenhuma linha do CSV pode ser lida
+                    return
+                continue
+            summary["rows"] += 1
+            await signups.put((number, payload))
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            await users_repo.insert_many([row for _, row in batch], columns="id,email")
+        except Exception as e:
+            if len(batch) == 1:
+                number, row = batch[0]
+                # A conta existe no GoTrue, só falta o perfil: o id vai junto
+                await emit({
+                    "line": number, "email": row["email"], "status": "auth_created", "id": row["id"], "error": _error(e),
+                })
+                return
+            # Uma linha ruim (ex.: email duplicado) derruba o insert todo: isola uma a uma
+            for item in batch:
+                await flush([item])
+            return
+        for number, row in batch:
+            await emit({"line": number, "email": row["email"], "status": "created", "id": row["id"]})
+
+    async def sign_up_worker() -> None:
+        while (item := await signups.get()) is not _DONE:
+            number, payload = item
+            try:
+                user_id = await _sign_up(payload.email, payload.password)
+            except Exception as e:
+                await emit({"line": number, "email": payload.email, "status": "error", "error": _error(e)})
+                continue
+            unsaved[number] = user_id
+            pending.append((number, {
+                "id": user_id, "name": payload.name, "email": payload.email, "phone": payload.phone, "status": "active",
+            }))
+            if len(pending) >= chunk_size:
+                batch = pending[:]
+                pending.clear()
+                await flush(batch)
+
+    async def run() -> None:
+        workers = [asyncio.ensure_future(sign_up_worker()) for _ in range(concurrency)]
+        failure: Optional[Exception] = None
+        try:
+            try:
+                await read()
+            except Exception as e:
+                # Falha ao ler o corpo: as linhas já aceitas vão até o fim antes do erro
+                failure = e
+            for _ in workers:
+                await signups.put(_DONE)
+            await asyncio.gather(*workers)
+            if pending:
+                batch = pending[:]
+                pending.clear()
+                await flush(batch)
+            if failure is not None:
+                await results.put({"status": "error", "error": _error(failure)})
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if unsaved:
+                # Cancelada no meio (cliente desconectou): ninguém mais lê os resultados
+                logger.warning("import_auth_created", extra={"user_ids": sorted(unsaved.values())})
+        await results.put(_DONE)
+
+    runner = asyncio.ensure_future(run())
+    try:
+        while (result := await results.get()) is not _DONE:
+            yield result
+        await runner
+        yield {"summary": summary}
+    finally:
+        # Cliente desconectou no meio: interrompe a importação
+        if not runner.done():
+            runner.cancel()
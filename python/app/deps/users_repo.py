@@ -0,0 +1,192 @@
+"""Acesso à tabela `users`.
+
+Cada função faz exatamente uma chamada ao PostgREST: escritas usam
+`Prefer: return=representation` com `select=<colunas>`, então a linha
+atualizada/inserida volta na própria resposta, sem um select adicional.
+
+Perfis lidos por `get_profile` passam por um cache read-through; toda escrita
+feita por este módulo invalida a entrada do usuário afetado. Misses simultâneos
+do mesmo perfil compartilham uma única leitura.
+
+Cada escrita também incrementa a geração do usuário no backend do cache
+(`CacheBackend.invalidate`): uma leitura que começou antes dela não grava no
+cache a linha (possivelmente antiga) que trouxe, e leituras que começam depois
+não se juntam a ela. Com `CACHE_BACKEND=shared` a geração fica na memória
+compartilhada, então vale entre workers.
+
+`get_role` (autorização de rotas admin) tem um cache próprio, de TTL curto,
+invalidado por inserts e por updates que mudam `role`; mudanças feitas fora da
+API (ex.: SQL no Dashboard) valem em até `ROLE_CACHE_TTL` segundos.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from ..utils.cache import CacheBackend, make_cache
+from ..utils.metrics import upstream_call
+from ..utils.singleflight import AsyncSingleFlight
+from .supabase_client import get_async_anon_client, get_async_service_client
+
+TABLE = "users"
+PROFILE_COLUMNS = "id,name,email,phone,status,created_at,updated_at,role"
+
+profile_cache: CacheBackend = make_cache(
+    "profiles",
+    int(os.environ.get("PROFILE_CACHE_SIZE", "1024")),
+    float(os.environ.get("PROFILE_CACHE_TTL", "30")),
+)
+
+role_cache: CacheBackend = make_cache(
+    "roles",
+    int(os.environ.get("ROLE_CACHE_SIZE", "4096")),
+    float(os.environ.get("ROLE_CACHE_TTL", "10")),
+    slot_bytes=128,
+)
+
+
+def _invalidate(user_id: str, role: bool = True) -> None:
+    profile_cache.invalidate(user_id)
+    if role:
+        role_cache.invalidate(user_id)
+
+
+# Leituras simultâneas do mesmo perfil (ex.: várias `/users/me` na abertura do app)
+_profile_flight = AsyncSingleFlight("users.profile")
+_role_flight = AsyncSingleFlight("users.role")
+
+
+def set_profile_cache(backend: CacheBackend) -> None:
+    """Troca o backend do cache de perfis (ex.: um store compartilhado entre workers)."""
+    global profile_cache
+    profile_cache = backend
+
+
+def set_role_cache(backend: CacheBackend) -> None:
+    global role_cache
+    role_cache = backend
+
+
+def _db():
+    return get_async_service_client() or get_async_anon_client()
+
+
+def _project(builder, columns: str):
+    # O PostgREST aplica `select` também à representação retornada por insert/update
+    builder.params = builder.params.set("select", columns)
+    return builder
+
+
+async def _execute(builder, operation: str):
+    try:
+        with upstream_call(f"table({TABLE}).{operation}"):
+            return await builder.execute()
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message or str(e))
+
+
+def _first(res) -> Optional[Dict[str, Any]]:
+    data = res.data or []
+    return data[0] if data else None
+
+
+async def get_by_id(user_id: str, columns: str) -> Optional[Dict[str, Any]]:
+    res = await _execute(_db().table(TABLE).select(columns).eq("id", user_id).limit(1), "select")
+    return _first(res)
+
+
+async def get_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    row = profile_cache.get(user_id)
+    if row is not None:
+        return row
+    generation = profile_cache.generation(user_id)
+    return await _profile_flight.do((user_id, generation), lambda: _load_profile(user_id, generation))
+
+
+async def _load_profile(user_id: str, generation: int) -> Optional[Dict[str, Any]]:
+    row = await get_by_id(user_id, PROFILE_COLUMNS)
+    if row is not None:
+        # Não grava se uma escrita (em qualquer worker) invalidou o usuário no meio do caminho
+        profile_cache.set(user_id, row, if_generation=generation)
+    return row
+
+
+async def get_role(user_id: str) -> Optional[str]:
+    """Role do usuário (None se ele não existir), via cache de TTL curto."""
+    entry = role_cache.get(user_id)
+    if entry is not None:
+        return entry["role"]
+    generation = role_cache.generation(user_id)
+    return await _role_flight.do((user_id, generation), lambda: _load_role(user_id, generation))
+
+
+async def _load_role(user_id: str, generation: int) -> Optional[str]:
+    row = await get_by_id(user_id, "id,role")
+    role = row.get("role") if row is not None else None
+    role_cache.set(user_id, {"role": role}, if_generation=generation)
+    return role
+
+
+def invalidate_role(user_id: str) -> bool:
+    """Descarta o role em cache (ex.: depois de promover um usuário fora da API)."""
+    return role_cache.delete(user_id)
+
+
+async def get_by_email(email: str, columns: str) -> Optional[Dict[str, Any]]:
+    res = await _execute(_db().table(TABLE).select(columns).eq("email", email).limit(1), "select")
+    return _first(res)
+
+
+async def insert(row: Dict[str, Any], columns: str) -> Optional[Dict[str, Any]]:
+    res = await _execute(_project(_db().table(TABLE).insert(row), columns), "insert")
+    if row.get("id"):
+        _invalidate(row["id"])
+    return _first(res)
+
+
+async def insert_many(rows: List[Dict[str, Any]], columns: str) -> List[Dict[str, Any]]:
+    """Várias linhas num único `insert` (um statement, tudo ou nada)."""
+    res = await _execute(_project(_db().table(TABLE).insert(rows), columns), "insert")
+    for row in rows:
+        _invalidate(row["id"])
+    return res.data or []
+
+
+async def update(
+    user_id: str, updates: Dict[str, Any], columns: str, *, if_updated_at: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Com `if_updated_at`, só atualiza se a linha ainda estiver nessa versão (senão devolve None)."""
+    builder = _db().table(TABLE).update(updates).eq("id", user_id)
+    if if_updated_at is not None:
+        builder = builder.eq("updated_at", if_updated_at)
+    res = await _execute(_project(builder, columns), "update")
+    _invalidate(user_id, role="role" in updates)
+    return _first(res)
+
+
+async def update_many(user_ids: List[str], updates: Dict[str, Any], columns: str) -> List[Dict[str, Any]]:
+    """Aplica o mesmo update a vários ids em um único statement (`id=in.(...)`)."""
+    res = await _execute(_project(_db().table(TABLE).update(updates).in_("id", user_ids), columns), "update")
+    for user_id in user_ids:
+        _invalidate(user_id, role="role" in updates)
+    return res.data or []
+
+
+async def list_page(
+    columns: str,
+    limit: int,
+    after: Optional[Tuple[str, str]] = None,
+    filters: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Uma página ordenada por `(created_at, id)`, começando após a chave `after` (keyset)."""
+    query = _db().table(TABLE).select(columns)
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    if after is not None:
+        created_at, last_id = after
+        query = query.or_(
+            f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{last_id}")'
+        )
+    res = await _execute(query.order("created_at").order("id").limit(limit), "select")
+    return res.data or []
@@ -1,20 +1,70 @@
-import os
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from dotenv import load_dotenv
 import time
 
-from .utils.logging import configure_logging, get_logger
+# Duração do import deste módulo (dependências + rotas), reportada no startup
+_import_started = time.perf_counter()
 
+import asyncio  # noqa: E402
+import os  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.exceptions import RequestValidationError  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse, Response  # noqa: E402
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+import uuid  # noqa: E402
+
+# Antes dos módulos do app: alguns leem a configuração já no import
 load_dotenv()
 
-app = FastAPI(title="Users API (Python)", version="1.0.0")
+from .deps import supabase_client  # noqa: E402
+from .utils import auth as auth_utils  # noqa: E402
+from .utils import metrics  # noqa: E402
+from .utils import tracing  # noqa: E402
+from .utils.admission import AdmissionMiddleware  # noqa: E402
+from .utils.logging import configure_logging, get_logger  # noqa: E402
+
+IMPORT_SECONDS = 0.0
+
+
+async def _warmup_verifier() -> None:
+    try:
+        await asyncio.to_thread(auth_utils.warmup_local_verifier)
+    except Exception as e:
+        logger.warning("jwt_warmup_failed: %r", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes, pool do Supabase (com handshakes) e chaves JWT prontos antes do
+    # primeiro request; /ready só responde 200 depois disso
+    started = time.perf_counter()
+    await asyncio.gather(supabase_client.warmup(), _warmup_verifier())
+    app.state.startup = {
+        "import_ms": int(IMPORT_SECONDS * 1000),
+        "warmup_ms": int((time.perf_counter() - started) * 1000),
+    }
+    app.state.ready = True
+    logger.info("startup", extra=app.state.startup)
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await supabase_client.close_async_clients()
+
+
+app = FastAPI(
+    title="Users API (Python)",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.state.ready = False
 configure_logging()
 logger = get_logger()
 
+# A admissão fica por dentro do CORS, para que o 503 também leve os headers CORS
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,23 +74,83 @@ app.add_middleware(
 )
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class RequestLoggingMiddleware:
+    """Log de acesso e métricas HTTP como middleware ASGI puro.
+
+    Não cria task nem envolve o corpo da resposta em outro stream (como o
+    `BaseHTTPMiddleware`), então respostas em streaming passam direto. O id da
+    requisição vem do header `X-Request-ID` (ou é gerado), fica em
+    `request.state.request_id` e volta no header da resposta. Com o tracing
+    ligado, também abre o trace da requisição e escreve o `Server-Timing`.
+    """
+
+    header = b"x-request-id"
+    server_timing_header = b"server-timing"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _request_id(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                request_id = value.decode("latin-1").strip()
+                if 0 < len(request_id) <= 128:
+                    return request_id
+                break
+        return uuid.uuid4().hex
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start = time.perf_counter()
-        response = await call_next(request)
-        latency_ms = int((time.perf_counter() - start) * 1000)
-        # Avoid logging overly large bodies; focus on essentials
-        extra = {
-            "method": request.method,
-            "path": request.url.path,
-            "status": response.status_code,
-            "latency_ms": latency_ms,
-        }
+        request_id = self._request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        status = 500
+        bytes_sent = 0
+        trace = tracing.tracer.begin()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, bytes_sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((self.header, request_id.encode("latin-1")))
+                if trace is not None and tracing.tracer.server_timing:
+                    # Spans de um corpo em streaming terminam depois daqui e ficam só no arquivo
+                    timing = trace.server_timing(time.perf_counter() - start)
+                    headers.append((self.server_timing_header, timing.encode("latin-1")))
+                message["headers"] = headers
+            elif message["type"] == "http.response.body":
+                bytes_sent += len(message.get("body", b""))
+            await send(message)
+
         try:
-            logger.info("http_request", extra=extra)
-        except Exception:
-            pass
-        return response
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # O router do Starlette grava a rota casada no próprio scope; sem
+            # rota (404) o log fica com o path cru
+            route = getattr(scope.get("route"), "path", None)
+            metrics.observe_request(scope["method"], route or metrics.UNMATCHED_ROUTE, status, elapsed)
+            extra = {
+                "method": scope["method"],
+                "path": route or scope["path"],
+                "status": status,
+                "latency_ms": int(elapsed * 1000),
+                "bytes_sent": bytes_sent,
+                "request_id": request_id,
+            }
+            try:
+                logger.info("http_request", extra=extra)
+            except Exception:
+                pass
+            if trace is not None:
+                try:
+                    tracing.tracer.finish(trace, **extra)
+                except Exception:
+                    pass
 
 
 app.add_middleware(RequestLoggingMiddleware)
@@ -60,10 +170,29 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 from .routers.auth import router as auth_router  # noqa: E402
 from .routers.users import router as users_router  # noqa: E402
+from .routers.batch import router as batch_router  # noqa: E402
 
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(users_router, prefix="/users", tags=["users"])
+app.include_router(batch_router, tags=["batch"])
 
 @app.get("/")
-def root():
-    return {"status": "ok", "service": "Users API (Python)", "version": "1.0.0"}
\ No newline at end of file
+async def root():
+    return {"status": "ok", "service": "Users API (Python)", "version": "1.0.0"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    # Síncrono: no modo multiprocess a coleta lê os arquivos de todos os workers
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    if not app.state.ready:
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready", **app.state.startup}
+
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
 from ..schemas import (
     RegisterRequest,
     LoginRequest,
@@ -6,25 +8,38 @@ from ..schemas import (
     LoginResponse,
     UserBasic,
 )
-from ..deps.supabase_client import get_anon_client, get_service_client
+from ..deps import users_repo
+from ..deps.supabase_client import get_async_anon_client
+from ..utils import admission
+from ..utils.metrics import upstream_call
+from ..utils.resilience import raise_if_unavailable
+from ..utils.responses import model_response, trusted
 
 router = APIRouter()
 
 
+def _discard(task: asyncio.Task) -> None:
+    task.cancel()
+    # Resultado e erro ignorados, sem aviso de exceção não recuperada
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
 @router.post("/register", response_model=RegisterResponse, responses={
     400: {"description": "Erro ao registrar"},
     422: {"description": "Erro de validação"},
 })
-def register(payload: RegisterRequest):
+async def register(payload: RegisterRequest):
     email = payload.email
     password = payload.password
     name = payload.name
     phone = payload.phone
 
-    anon_client = get_anon_client()
+    anon_client = get_async_anon_client()
     try:
-        res = anon_client.auth.sign_up({"email": email, "password": password})
+        with upstream_call("auth.sign_up"):
+            res = await anon_client.auth.sign_up({"email": email, "password": password})
     except Exception as e:
+        raise_if_unavailable(e)
         # Erros de validação do Supabase (e.g., email inválido)
         raise HTTPException(status_code=400, detail=str(e))
     user = getattr(res, "user", None)
@@ -41,39 +56,57 @@ def register(payload: RegisterRequest):
     if not user_id:
         raise HTTPException(status_code=400, detail="Falha ao obter ID do usuário")
 
-    # Inserir na tabela users
-    service_client = get_service_client()
-    db = service_client or anon_client
-    inserted = db.table("users").insert(
-        {"id": user_id, "name": name, "email": email, "phone": phone, "status": "active"}
-    ).execute()
-    if getattr(inserted, "error", None):
-        raise HTTPException(status_code=400, detail=str(inserted.error))
-
-    # Seleciona os campos
-    result = db.table("users").select("id,name,email").eq("id", user_id).single().execute()
-    if getattr(result, "error", None):
-        raise HTTPException(status_code=400, detail=str(result.error))
+    # Inserir na tabela users (a linha inserida volta na mesma chamada)
+    inserted = await users_repo.insert(
+        {"id": user_id, "name": name, "email": email, "phone": phone, "status": "active"},
+        columns="id,name,email",
+    )
+    if inserted is None:
+        raise HTTPException(status_code=400, detail="Falha ao cadastrar usuário")
 
-    return {"message": "Usuário cadastrado com sucesso", "user": UserBasic(**result.data)}
+    return model_response(RegisterResponse.model_construct(
+        message="Usuário cadastrado com sucesso", user=trusted(UserBasic, inserted)
+    ))
 
 
 @router.post("/login", response_model=LoginResponse, responses={
     400: {"description": "Erro ao autenticar"},
     422: {"description": "Erro de validação"},
+    429: {"description": "Muitas tentativas de login"},
 })
-def login(payload: LoginRequest):
+async def login(payload: LoginRequest, request: Request):
     email = payload.email
     password = payload.password
 
-    anon_client = get_anon_client()
+    # Rate limit por IP e por email antes de qualquer chamada ao Supabase
+    client_ip = request.client.host if request.client else "desconhecido"
+    for limiter, key in ((admission.login_ip_limiter, client_ip), (admission.login_email_limiter, email.lower())):
+        allowed, wait = limiter.allow(key)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Muitas tentativas de login, tente novamente mais tarde",
+                headers={"Retry-After": admission.retry_after(wait)},
+            )
+
+    # O perfil é buscado em paralelo com a autenticação; se ela falhar, o
+    # resultado é descartado sem ser lido, então a resposta não revela se a conta existe
+    profile_task = asyncio.create_task(users_repo.get_by_email(email, columns="id,email,name"))
+    anon_client = get_async_anon_client()
     try:
-        res = anon_client.auth.sign_in_with_password({"email": email, "password": password})
+        with upstream_call("auth.sign_in_with_password"):
+            res = await anon_client.auth.sign_in_with_password({"email": email, "password": password})
+    except asyncio.CancelledError:
+        _discard(profile_task)
+        raise
     except Exception as e:
+        _discard(profile_task)
+        raise_if_unavailable(e)
         # Erros comuns: Email not confirmed, invalid credentials
         raise HTTPException(status_code=400, detail=str(e))
     session = getattr(res, "session", None)
     if session is None:
+        _discard(profile_task)
         raise HTTPException(status_code=400, detail="Login falhou: sessão não retornada")
 
     # Extrai tokens considerando modelo pydantic
@@ -83,14 +116,10 @@ def login(payload: LoginRequest):
         access_token = session.get("access_token")
         refresh_token = session.get("refresh_token")
 
-    service_client = get_service_client()
-    db = service_client or anon_client
-    profile = db.table("users").select("id,email,name").eq("email", email).single().execute()
-    if getattr(profile, "error", None):
-        raise HTTPException(status_code=400, detail=str(profile.error))
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "user": UserBasic(**profile.data),
-    }
\ No newline at end of file
+    profile = await profile_task
+    if profile is None:
+        raise HTTPException(status_code=400, detail="Perfil do usuário não encontrado")
+
+    return model_response(LoginResponse.model_construct(
+        access_token=access_token, refresh_token=refresh_token, user=trusted(UserBasic, profile)
+    ))
\ No newline at end of file
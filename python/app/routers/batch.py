@@ -0,0 +1,155 @@
+"""POST /batch: várias requisições da API numa única ida e volta.
+
+O token é validado uma vez para o lote inteiro; cada sub-requisição passa em
+processo pelo app completo (middlewares, admissão, handlers de erro) com o
+mesmo `Authorization`, que as rotas resolvem sem validar de novo.
+
+GETs consecutivos rodam em paralelo. Uma escrita espera tudo o que veio antes
+dela e segura o que vem depois, então o resultado é o mesmo de enviar as
+requisições em ordem, uma por vez.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+import orjson
+from fastapi import APIRouter, Header, Request
+from starlette.types import ASGIApp, Message, Scope
+
+from ..schemas import BatchRequest, BatchResponse, BatchSubRequest
+from ..utils.auth import authenticated, get_user_from_token_async
+from ..utils.logging import get_logger
+from ..utils.responses import json_response
+
+router = APIRouter()
+logger = get_logger()
+
+# Headers da sub-requisição que o lote define (os enviados em `headers` são ignorados)
+_RESERVED_HEADERS = frozenset(("authorization", "content-length", "host", "x-request-id"))
+# Headers da sub-resposta que não fazem sentido dentro do corpo do lote
+_DROPPED_HEADERS = frozenset(("content-length", "x-request-id"))
+
+
+def _waves(requests: List[BatchSubRequest]) -> List[List[int]]:
+    """Índices agrupados em etapas: GETs seguidos juntos, cada escrita sozinha."""
+    waves: List[List[int]] = []
+    reads: List[int] = []
+    for index, sub in enumerate(requests):
+        if sub.method == "GET":
+            reads.append(index)
+            continue
+        if reads:
+            waves.append(reads)
+            reads = []
+        waves.append([index])
+    if reads:
+        waves.append(reads)
+    return waves
+
+
+def _error(status: int, detail: str) -> Dict[str, Any]:
+    return {"status": status, "headers": {"content-type": "application/json"}, "body": {"detail": detail}}
+
+
+def _decode(content: bytes, content_type: str) -> Any:
+    if not content:
+        return None
+    if content_type.startswith("application/json"):
+        return orjson.loads(content)
+    return content.decode("utf-8", errors="replace")
+
+
+def _scope(parent: Scope, sub: BatchSubRequest, headers: Dict[str, str]) -> Scope:
+    path, _, query = sub.path.partition("?")
+    return {
+        "type": "http",
+        "asgi": parent["asgi"],
+        "http_version": parent.get("http_version", "1.1"),
+        "method": sub.method,
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": unquote(path),
+        "raw_path": path.encode("latin-1"),
+        "query_string": query.encode("latin-1"),
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+    }
+
+
+async def _dispatch(app: ASGIApp, parent: Scope, sub: BatchSubRequest, authorization: str, request_id: str) -> Dict[str, Any]:
+    if sub.path.partition("?")[0].rstrip("/") == "/batch":
+        return _error(400, "Lotes aninhados não são permitidos")
+
+    body = b"" if sub.body is None else orjson.dumps(sub.body)
+    headers = {name.lower(): value for name, value in sub.headers.items() if name.lower() not in _RESERVED_HEADERS}
+    headers.setdefault("accept", "application/json")
+    headers.update({"authorization": authorization, "x-request-id": request_id})
+    if body:
+        headers.setdefault("content-type", "application/json")
+        headers["content-length"] = str(len(body))
+    try:
+        scope = _scope(parent, sub, headers)
+    except UnicodeEncodeError:
+        return _error(400, "Path ou headers com caracteres inválidos")
+
+    body_sent = False
+    finished = asyncio.Event()
+    status = 500
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def receive() -> Message:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Respostas em streaming escutam a desconexão: só acontece no fim
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for name, value in message.get("headers", []):
+                name = name.decode("latin-1")
+                if name not in _DROPPED_HEADERS:
+                    response_headers[name] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # O app já respondeu 500 (e registrou o acesso); o lote segue
+        logger.exception("batch_subrequest_failed", extra={"request_id": request_id})
+        return _error(500, "Erro interno")
+    finally:
+        finished.set()
+    return {
+        "status": status,
+        "headers": response_headers,
+        "body": _decode(b"".join(chunks), response_headers.get("content-type", "")),
+    }
+
+
+@router.post("/batch", response_model=BatchResponse, responses={
+    401: {"description": "Token não fornecido"},
+    422: {"description": "Erro de validação (inclusive lote vazio ou com mais de 20 requisições)"},
+})
+async def batch(payload: BatchRequest, request: Request, authorization: Optional[str] = Header(None)):
+    auth_user = await get_user_from_token_async(authorization)
+    parent_id = request.state.request_id
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payload.requests)
+    # As tasks do gather herdam o contexto: o token já validado vale para todas
+    with authenticated(authorization, auth_user):
+        for wave in _waves(payload.requests):
+            responses = await asyncio.gather(*(
+                _dispatch(request.app, request.scope, payload.requests[i], authorization, f"{parent_id}-{i}")
+                for i in wave
+            ))
+            for i, response in zip(wave, responses):
+                results[i] = response
+    return json_response({"responses": results})
@@ -1,27 +1,58 @@
-from fastapi import APIRouter, Header, HTTPException
-from typing import Optional
+import base64
+import json
+import os
+import uuid
+from datetime import datetime
+
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from ..schemas import (
     UpdateUserRequest,
     StatusPatchRequest,
+    BulkStatusPatchRequest,
     UpdateUserResponse,
     UserMeResponse,
     StatusPatchResponse,
+    BulkStatusPatchResponse,
+    BulkStatusItem,
+    UserListResponse,
     UserBasic,
 )
-from ..deps.supabase_client import get_anon_client, get_service_client
-from ..utils.auth import get_user_from_token
+from ..deps import user_import, users_repo
+from ..deps.authz import current_role, ensure_admin
+from ..utils import etag
+from ..utils.auth import get_user_from_token_async
+from ..utils.responses import json_response, model_response, trusted
 
 router = APIRouter()
 
+# Quantos ids vão em cada `update ... where id in (...)` do PATCH /users/status
+BULK_STATUS_CHUNK_SIZE = int(os.environ.get("BULK_STATUS_CHUNK_SIZE", "200"))
+
+
+PRECONDITION_FAILED = "O usuário foi modificado por outra requisição (If-Match não confere)"
+
+# Colunas que podem ser pedidas em GET /users?fields=...
+LISTABLE_FIELDS = tuple(UserBasic.model_fields)
+
 
 @router.put("/{id}", response_model=UpdateUserResponse, responses={
     400: {"description": "Erro na atualização"},
     401: {"description": "Token não fornecido"},
     403: {"description": "Acesso negado"},
+    404: {"description": "Usuário não encontrado"},
+    412: {"description": "If-Match não confere com a versão atual"},
     422: {"description": "Erro de validação"},
 })
-def update_user(id: str, payload: UpdateUserRequest, authorization: Optional[str] = Header(None)):
-    auth_user = get_user_from_token(authorization)
+async def update_user(
+    id: str,
+    payload: UpdateUserRequest,
+    authorization: Optional[str] = Header(None),
+    if_match: Optional[str] = Header(None),
+):
+    auth_user = await get_user_from_token_async(authorization)
     auth_user_id = auth_user.get("id")
     if not auth_user_id or auth_user_id != id:
         raise HTTPException(status_code=403, detail="Você só pode atualizar seus próprios dados")
@@ -30,60 +61,211 @@ def update_user(id: str, payload: UpdateUserRequest, authorization: Optional[str
     if not updates:
         raise HTTPException(status_code=400, detail="É necessário enviar pelo menos um campo para atualizar")
 
-    anon_client = get_anon_client()
-    service_client = get_service_client()
-    db = service_client or anon_client
-    # supabase-py não suporta select encadeado após update no builder sync
-    upd = db.table("users").update(updates).eq("id", auth_user_id).execute()
-    if getattr(upd, "error", None):
-        raise HTTPException(status_code=400, detail=str(upd.error))
-    res = db.table("users").select(
-        "id,name,email,phone,status,updated_at"
-    ).eq("id", auth_user_id).single().execute()
-    if getattr(res, "error", None):
-        raise HTTPException(status_code=400, detail=str(res.error))
-    return {"message": "Usuário atualizado com sucesso", "user": UserBasic(**res.data)}
+    expected_version = None
+    if if_match is not None:
+        # Concorrência otimista: a versão lida aqui também condiciona o update,
+        # então uma escrita concorrente entre a leitura e o update dá 412
+        current = await users_repo.get_by_id(auth_user_id, columns="id,updated_at")
+        if current is None:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        if not etag.match(if_match, etag.etag_for(current)):
+            raise HTTPException(status_code=412, detail=PRECONDITION_FAILED)
+        expected_version = current["updated_at"]
+
+    # update com return=representation: a linha atualizada volta na mesma chamada
+    row = await users_repo.update(
+        auth_user_id, updates, columns="id,name,email,phone,status,updated_at", if_updated_at=expected_version
+    )
+    if row is None:
+        if expected_version is not None:
+            raise HTTPException(status_code=412, detail=PRECONDITION_FAILED)
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return model_response(UpdateUserResponse.model_construct(
+        message="Usuário atualizado com sucesso", user=trusted(UserBasic, row)
+    ), headers={"ETag": etag.etag_for(row)})
 
 
 @router.get("/me", response_model=UserMeResponse, responses={
+    304: {"description": "Perfil não mudou desde o ETag enviado em If-None-Match"},
     401: {"description": "Token não fornecido"},
+    404: {"description": "Usuário não encontrado"},
 })
-def me(authorization: Optional[str] = Header(None)):
-    auth_user = get_user_from_token(authorization)
+async def me(authorization: Optional[str] = Header(None), if_none_match: Optional[str] = Header(None)):
+    auth_user = await get_user_from_token_async(authorization)
     auth_user_id = auth_user.get("id")
-    anon_client = get_anon_client()
-    service_client = get_service_client()
-    db = service_client or anon_client
-    res = db.table("users").select(
-        "id,name,email,phone,status,created_at,updated_at,role"
-    ).eq("id", auth_user_id).single().execute()
-    if getattr(res, "error", None):
-        raise HTTPException(status_code=400, detail=str(res.error))
-    return UserBasic(**res.data)
+    row = await users_repo.get_profile(auth_user_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    tag = etag.etag_for(row)
+    if if_none_match is not None and etag.none_match(if_none_match, tag):
+        return etag.not_modified(tag)
+    return model_response(trusted(UserMeResponse, row), headers={"ETag": tag})
 
 
 @router.patch("/{id}/status", response_model=StatusPatchResponse, responses={
     400: {"description": "Erro na atualização de status"},
     401: {"description": "Token não fornecido"},
     403: {"description": "Acesso negado"},
+    404: {"description": "Usuário não encontrado"},
     422: {"description": "Erro de validação"},
 })
-def patch_status(id: str, payload: StatusPatchRequest, authorization: Optional[str] = Header(None)):
-    auth_user = get_user_from_token(authorization)
-    auth_user_id = auth_user.get("id")
-    anon_client = get_anon_client()
-    service_client = get_service_client()
-    db = service_client or anon_client
-    me = db.table("users").select("id,role").eq("id", auth_user_id).single().execute()
-    if getattr(me, "error", None):
-        raise HTTPException(status_code=400, detail=str(me.error))
-    if me.data.get("role") != "admin":
-        raise HTTPException(status_code=403, detail="Acesso negado: requer role admin")
-
-    upd = db.table("users").update({"status": payload.status}).eq("id", id).execute()
-    if getattr(upd, "error", None):
-        raise HTTPException(status_code=400, detail=str(upd.error))
-    res = db.table("users").select("id,status").eq("id", id).single().execute()
-    if getattr(res, "error", None):
-        raise HTTPException(status_code=400, detail=str(res.error))
-    return {"message": "Status atualizado com sucesso", "user": UserBasic(**res.data)}
\ No newline at end of file
+async def patch_status(id: str, payload: StatusPatchRequest, caller_role: Optional[str] = Depends(current_role)):
+    ensure_admin(caller_role)
+
+    row = await users_repo.update(id, {"status": payload.status}, columns="id,status")
+    if row is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return model_response(StatusPatchResponse.model_construct(
+        message="Status atualizado com sucesso", user=trusted(UserBasic, row)
+    ))
+
+
+def _canonical_uuid(value: str) -> Optional[str]:
+    """Forma canônica (minúscula, com hífens) de um UUID; None se não for um."""
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+@router.patch("/status", response_model=BulkStatusPatchResponse, responses={
+    401: {"description": "Token não fornecido"},
+    403: {"description": "Acesso negado"},
+    422: {"description": "Erro de validação"},
+})
+async def patch_status_bulk(payload: BulkStatusPatchRequest, caller_role: Optional[str] = Depends(current_role)):
+    ensure_admin(caller_role)
+
+    # `users.id` é uuid: um id malformado derrubaria o lote inteiro no PostgREST,
+    # então é recusado sozinho; os demais seguem na forma canônica, a mesma que volta
+    ids = list(dict.fromkeys(_canonical_uuid(user_id) or user_id for user_id in payload.ids))
+    results: Dict[str, Dict[str, Any]] = {
+        user_id: {"id": user_id, "updated": False, "error": "ID inválido"}
+        for user_id in ids
+        if _canonical_uuid(user_id) is None
+    }
+    valid_ids = [user_id for user_id in ids if user_id not in results]
+    for start in range(0, len(valid_ids), BULK_STATUS_CHUNK_SIZE):
+        chunk = valid_ids[start : start + BULK_STATUS_CHUNK_SIZE]
+        try:
+            rows = await users_repo.update_many(chunk, {"status": payload.status}, columns="id,status")
+        except HTTPException as e:
+            # Falha de um lote não invalida os lotes já aplicados
+            for user_id in chunk:
+                results[user_id] = {"id": user_id, "updated": False, "error": str(e.detail)}
+            continue
+        for row in rows:
+            results[row["id"]] = {"id": row["id"], "updated": True, "status": row.get("status")}
+
+    items = [results.get(user_id) or {"id": user_id, "updated": False, "error": "Usuário não encontrado"} for user_id in ids]
+    updated = sum(1 for item in items if item["updated"])
+    return model_response(BulkStatusPatchResponse.model_construct(
+        message="Status atualizado em lote",
+        updated=updated,
+        results=[trusted(BulkStatusItem, item) for item in items],
+    ))
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """StreamingResponse para geradores que ainda leem o corpo da requisição.
+
+    A padrão escuta `http.disconnect` em paralelo com o stream e consumiria as
+    mensagens do corpo antes de `request.stream()`; aqui uma desconexão durante
+    o upload aparece como `ClientDisconnect` na própria leitura.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/import", responses={
+    200: {"content": {"application/x-ndjson": {}}, "description": "Stream NDJSON com um resultado por linha e o resumo no fim"},
+    401: {"description": "Token não fornecido"},
+    403: {"description": "Acesso negado"},
+})
+async def import_users(request: Request, caller_role: Optional[str] = Depends(current_role)):
+    """Cadastra usuários em massa a partir de um corpo NDJSON ou CSV (`Content-Type: text/csv`)."""
+    ensure_admin(caller_role)
+
+    fmt = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+
+    async def stream() -> AsyncIterator[bytes]:
+        async for result in user_import.import_users(request.stream(), fmt):
+            yield orjson.dumps(result) + b"\n"
+
+    return _UploadStreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """`(created_at, id)` do cursor; os dois vão para o filtro `or=(...)` do PostgREST,
+    então só passam um timestamp ISO 8601 e um UUID."""
+    try:
+        created_at, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        datetime.fromisoformat(created_at)
+        return created_at, str(uuid.UUID(last_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _list_columns(fields: Optional[str]) -> Tuple[str, set]:
+    """Colunas do select e colunas a devolver; `id` e `created_at` são sempre lidos para o cursor."""
+    if not fields:
+        return ",".join(LISTABLE_FIELDS), set(LISTABLE_FIELDS)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in wanted if f not in LISTABLE_FIELDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos em fields: {', '.join(invalid)}")
+    output = {"id", *wanted}
+    columns = [c for c in LISTABLE_FIELDS if c in output or c == "created_at"]
+    return ",".join(columns), output
+
+
+@router.get("", response_model=UserListResponse, response_model_exclude_unset=True, responses={
+    200: {"content": {"application/x-ndjson": {}}, "description": "Página de usuários ou stream NDJSON"},
+    400: {"description": "Parâmetros inválidos"},
+    401: {"description": "Token não fornecido"},
+    403: {"description": "Acesso negado"},
+})
+async def list_users(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern=r"^(active|inactive|blocked)$"),
+    role: Optional[str] = None,
+    fields: Optional[str] = None,
+    caller_role: Optional[str] = Depends(current_role),
+):
+    ensure_admin(caller_role)
+
+    columns, output = _list_columns(fields)
+    filters = {k: v for k, v in (("status", status), ("role", role)) if v is not None}
+    after = _decode_cursor(cursor) if cursor else None
+
+    def shape(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in row.items() if k in output}
+
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        # Exportação: percorre todas as páginas, escrevendo cada uma assim que chega
+        async def stream() -> AsyncIterator[bytes]:
+            position = after
+            while True:
+                rows = await users_repo.list_page(columns, limit, position, filters)
+                if not rows:
+                    return
+                yield b"".join(orjson.dumps(shape(r)) + b"\n" for r in rows)
+                if len(rows) < limit:
+                    return
+                position = (rows[-1]["created_at"], rows[-1]["id"])
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    rows = await users_repo.list_page(columns, limit, after, filters)
+    next_cursor = _encode_cursor(rows[-1]) if len(rows) == limit else None
+    return json_response({"users": [shape(r) for r in rows], "next_cursor": next_cursor})
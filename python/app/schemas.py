@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 import re
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
@@ -38,6 +38,23 @@ class StatusPatchRequest(BaseModel):
     status: str = Field(pattern=r"^(active|inactive|blocked)$")
 
 
+class BulkStatusPatchRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=10000)
+    status: str = Field(pattern=r"^(active|inactive|blocked)$")
+
+
+class BatchSubRequest(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    # Path da API com query string, ex.: /users?limit=10
+    path: str = Field(pattern=r"^/", max_length=2048)
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(min_length=1, max_length=20)
+
+
 # Response models para documentação
 class UserBasic(BaseModel):
     id: str
@@ -72,4 +89,32 @@ class UserMeResponse(UserBasic):
 
 class StatusPatchResponse(BaseModel):
     message: str
-    user: UserBasic
\ No newline at end of file
+    user: UserBasic
+
+
+class BulkStatusItem(BaseModel):
+    id: str
+    updated: bool
+    status: str | None = None
+    error: str | None = None
+
+
+class BulkStatusPatchResponse(BaseModel):
+    message: str
+    updated: int
+    results: List[BulkStatusItem]
+
+
+class UserListResponse(BaseModel):
+    users: List[UserBasic]
+    next_cursor: str | None = None
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    headers: Dict[str, str]
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResponseItem]
@@ -0,0 +1,140 @@
+"""Entrada de produção: gunicorn com workers uvicorn e o app pré-carregado.
+
+    python -m app.serve              # imagem Docker (código em /app/app)
+    python -m python.app.serve       # a partir da raiz do repositório
+
+O app é importado uma vez no processo mestre (`preload_app`) e os workers
+nascem por fork já com todos os módulos carregados; cada worker só abre o
+próprio pool e faz o warm-up no lifespan. Variáveis:
+
+- `WEB_CONCURRENCY`: número de workers (padrão 1)
+- `PORT`: porta (padrão 3000)
+- `GUNICORN_TIMEOUT` / `GUNICORN_GRACEFUL_TIMEOUT`: em segundos (padrão 30 / 20)
+- `FORWARDED_ALLOW_IPS`: IPs dos proxies cujos `X-Forwarded-For`/`X-Forwarded-Proto`
+  são aceitos (padrão `127.0.0.1,::1`; `*` quando só o proxy alcança o serviço,
+  como no Render). Sem isso, `request.client.host` é o IP do proxy.
+
+Com mais de um worker e sem `PROMETHEUS_MULTIPROC_DIR`, um diretório
+temporário é criado para que `/metrics` agregue todos os workers. Com
+`CACHE_BACKEND=shared`, os caches criados no import feito pelo mestre são
+herdados por todos os workers.
+
+    python -m python.app.serve --import-profile [--top 25]
+
+mostra os módulos mais lentos de importar (`python -X importtime`).
+"""
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+APP_MODULE = f"{__package__}.main"
+_PROMETHEUS_DB = re.compile(r"(counter|gauge_\w+|histogram|summary)_\d+\.db")
+
+
+def _workers() -> int:
+    return max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+
+
+def _prepare_multiprocess_dir(workers: int) -> None:
+    # Precisa estar no ambiente antes de prometheus_client ser importado
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # Arquivos de uma execução anterior somariam valores antigos; só os
+        # `<tipo>_<pid>.db` do prometheus_client são apagados, o resto fica
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            if _PROMETHEUS_DB.fullmatch(os.path.basename(path)):
+                os.remove(path)
+    elif workers > 1:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+
+def _post_fork(_server, _worker) -> None:
+    from .utils.logging import reinit_after_fork
+
+    reinit_after_fork()
+
+
+def _child_exit(_server, worker) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def serve() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    workers = _workers()
+    _prepare_multiprocess_dir(workers)
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"0.0.0.0:{os.environ.get('PORT', '3000')}",
+                "workers": workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "forwarded_allow_ips": os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1,::1"),
+                "timeout": int(os.environ.get("GUNICORN_TIMEOUT", "30")),
+                "graceful_timeout": int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "20")),
+                "post_fork": _post_fork,
+                "child_exit": _child_exit,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            started = time.perf_counter()
+            from importlib import import_module
+
+            app = import_module(APP_MODULE).app
+            from .utils.logging import get_logger
+
+            get_logger().info(
+                "app_loaded",
+                extra={"import_ms": int((time.perf_counter() - started) * 1000), "workers": workers},
+            )
+            return app
+
+    Application().run()
+
+
+def import_profile(top: int) -> List[Tuple[int, int, str]]:
+    """(acumulado µs, próprio µs, módulo) dos `top` imports mais lentos do app."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {APP_MODULE}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), int(match.group(1)), match.group(4)))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-profile", action="store_true", help="mostra o tempo de import por módulo e sai")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if not args.import_profile:
+        serve()
+        return
+    for cumulative, own, module in import_profile(args.top):
+        print(f"{cumulative / 1000:>9.1f}ms {own / 1000:>8.1f}ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
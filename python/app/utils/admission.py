@@ -0,0 +1,237 @@
+"""Controle de admissão e rate limiting, em memória e por worker.
+
+- `ConcurrencyLimiter`: no máximo `limit` requisições de um grupo de rotas em
+  andamento; as excedentes esperam numa fila limitada (`queue_size`, por até
+  `queue_timeout` segundos) e, passado isso, recebem 503 com `Retry-After`.
+- `TokenBucketLimiter`: baldes por chave (IP, email) para `/auth/login` (429).
+
+Tudo roda na thread do event loop, então o estado é mexido sem locks.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requisições admitidas em andamento, por grupo de rotas",
+    ("group",),
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued",
+    "Requisições esperando admissão, por grupo de rotas",
+    ("group",),
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requisições recusadas com 503 por excesso de carga",
+    ("group",),
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requisições recusadas com 429 pelo rate limit",
+    ("limiter",),
+)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ConcurrencyLimiter:
+    """Semáforo com fila limitada e espera máxima. `limit <= 0` desativa."""
+
+    def __init__(self, group: str, limit: int, queue_size: int, queue_timeout: float):
+        self.group = group
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._in_flight_gauge = ADMISSION_IN_FLIGHT.labels(group)
+        self._queued_gauge = ADMISSION_QUEUED.labels(group)
+        self._rejected_counter = ADMISSION_REJECTED.labels(group)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self) -> None:
+        self.rejected += 1
+        self._rejected_counter.inc()
+        raise Overloaded(self.group)
+
+    async def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._in_flight_gauge.set(self.active)
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queued_gauge.set(len(self._waiters))
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self._reject()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga já tinha sido repassada a esta requisição
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._queued_gauge.set(len(self._waiters))
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        # A vaga passa direto para o próximo da fila; `active` não muda
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._queued_gauge.set(len(self._waiters))
+                return
+        self.active -= 1
+        self._in_flight_gauge.set(self.active)
+        self._queued_gauge.set(0)
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "waiting": self.waiting, "rejected": self.rejected}
+
+
+class TokenBucketLimiter:
+    """Um balde por chave: `burst` fichas, repostas a `rate` por segundo.
+
+    As chaves ficam num LRU de até `max_keys` entradas; chaves descartadas
+    voltam com o balde cheio. `rate <= 0` desativa.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_keys: int = 10000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._limited_counter = RATE_LIMITED.labels(name)
+
+    def allow(self, key: str) -> Tuple[bool, float]:
+        """Consome uma ficha; devolve (permitido, segundos até a próxima ficha)."""
+        if self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0.0
+        self._limited_counter.inc()
+        return False, (1 - tokens) / self.rate
+
+
+def _limiter(group: str) -> ConcurrencyLimiter:
+    prefix = f"ADMISSION_{group.upper()}"
+    return ConcurrencyLimiter(
+        group,
+        limit=int(os.environ.get(f"{prefix}_CONCURRENCY", "64")),
+        queue_size=int(os.environ.get(f"{prefix}_QUEUE", "128")),
+        queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2")),
+    )
+
+
+# Grupos de rotas com limite próprio, casados por prefixo do path
+limiters: Dict[str, ConcurrencyLimiter] = {
+    "/auth": _limiter("auth"),
+    "/users": _limiter("users"),
+}
+
+# Desativado por padrão: atrás de um proxy, o IP só é o do cliente se
+# `FORWARDED_ALLOW_IPS` incluir o proxy; senão todos dividiriam o mesmo bucket
+login_ip_limiter = TokenBucketLimiter(
+    "login_ip",
+    rate=float(os.environ.get("LOGIN_RATE_PER_IP", "0")),
+    burst=float(os.environ.get("LOGIN_BURST_PER_IP", "10")),
+)
+login_email_limiter = TokenBucketLimiter(
+    "login_email",
+    rate=float(os.environ.get("LOGIN_RATE_PER_EMAIL", "0.1")),
+    burst=float(os.environ.get("LOGIN_BURST_PER_EMAIL", "5")),
+)
+
+
+def limiter_for(path: str) -> Optional[ConcurrencyLimiter]:
+    for prefix, limiter in limiters.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return limiter
+    return None
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionMiddleware:
+    """Aplica o `ConcurrencyLimiter` do grupo da rota antes de chamar o app.
+
+    A vaga fica ocupada até o fim da resposta, inclusive em streaming.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._overloaded_body = json.dumps(
+            {"detail": "Serviço sobrecarregado, tente novamente em instantes"}, ensure_ascii=False
+        ).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._overloaded_body)).encode()),
+                (b"retry-after", os.environ.get("ADMISSION_RETRY_AFTER", "1").encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._overloaded_body})
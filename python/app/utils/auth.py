@@ -1,18 +1,269 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import httpx
+import jwt
 from fastapi import HTTPException
-from typing import Optional
-from ..deps.supabase_client import get_anon_client
 
+from ..deps.supabase_client import get_anon_client, get_async_anon_client
+from .cache import CacheBackend, MemoryCache, make_cache
+from .metrics import upstream_call
+from .resilience import raise_if_unavailable
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .tracing import span
 
-def get_user_from_token(bearer: Optional[str]):
-    if not bearer or not bearer.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Token não fornecido")
-    token = bearer[len("Bearer ") :]
-    # supabase-py v2
-    anon_client = get_anon_client()
+# Modos de verificação do access token (AUTH_VERIFY_MODE):
+# - "remote": chama o GoTrue (auth.get_user) a cada requisição (padrão)
+# - "secret": valida localmente com o JWT secret do projeto (HS256)
+# - "jwks":   valida localmente com as chaves públicas do endpoint JWKS
+VERIFY_MODES = ("remote", "secret", "jwks")
+
+
+def _verify_mode() -> str:
+    mode = os.environ.get("AUTH_VERIFY_MODE", "remote").strip().lower()
+    if mode not in VERIFY_MODES:
+        raise RuntimeError(f"AUTH_VERIFY_MODE inválido: {mode!r} (use {', '.join(VERIFY_MODES)})")
+    return mode
+
+
+def _fetch_jwks(url: str) -> Dict[str, Any]:
+    headers = {}
+    anon_key = os.environ.get("SUPABASE_ANON_KEY")
+    if anon_key:
+        headers["apikey"] = anon_key
+    with upstream_call("auth.jwks"):
+        resp = httpx.get(url, headers=headers, timeout=5.0)
+        resp.raise_for_status()
+    return resp.json()
+
+
+class JwksCache:
+    """Chaves públicas do JWKS em memória, recarregadas quando surge um `kid` desconhecido.
+
+    Recargas são limitadas por `min_refresh_interval` para que tokens com `kid`
+    forjado não disparem uma requisição ao JWKS a cada chamada.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        fetch: Callable[[str], Dict[str, Any]] = _fetch_jwks,
+        min_refresh_interval: float = 30.0,
+    ):
+        self.url = url
+        self._fetch = fetch
+        self._min_refresh_interval = min_refresh_interval
+        self._keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._last_refresh = float("-inf")
+        self._lock = threading.Lock()
+
+    def needs_refresh(self, kid: Optional[str]) -> bool:
+        """True se `get_key(kid)` iria baixar o JWKS (kid desconhecido e intervalo vencido)."""
+        return kid not in self._keys and time.monotonic() - self._last_refresh >= self._min_refresh_interval
+
+    def get_key(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and time.monotonic() - self._last_refresh >= self._min_refresh_interval:
+                self.refresh()
+                key = self._keys.get(kid)
+        return key
+
+    def refresh(self) -> None:
+        data = self._fetch(self.url)
+        keys: Dict[Optional[str], jwt.PyJWK] = {}
+        for jwk in data.get("keys", []):
+            try:
+                keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+            except jwt.PyJWTError:
+                # Ignora chaves com algoritmo/formato não suportado
+                continue
+        self._keys = keys
+        self._last_refresh = time.monotonic()
+
+
+class LocalJwtVerifier:
+    """Valida assinatura, `exp`, `aud` e `iss` de um access token sem chamar o GoTrue."""
+
+    def __init__(
+        self,
+        *,
+        audience: str,
+        issuer: str,
+        secret: Optional[str] = None,
+        jwks: Optional[JwksCache] = None,
+        leeway: float = 0.0,
+    ):
+        if not secret and jwks is None:
+            raise ValueError("É necessário informar o secret ou um JwksCache")
+        self.audience = audience
+        self.issuer = issuer
+        self.secret = secret
+        self.jwks = jwks
+        self.leeway = leeway
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        if self.secret and alg == "HS256":
+            key: Any = self.secret
+        elif self.jwks is not None and alg != "HS256":
+            jwk = self.jwks.get_key(header.get("kid"))
+            if jwk is None or jwk.algorithm_name != alg:
+                raise jwt.InvalidTokenError("Chave de assinatura desconhecida")
+            key = jwk.key
+        else:
+            raise jwt.InvalidAlgorithmError(f"Algoritmo não permitido: {alg}")
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp", "sub", "aud", "iss"]},
+        )
+
+
+_verifier: LocalJwtVerifier | None = None
+
+
+def warmup_local_verifier() -> None:
+    """No startup: cria o verificador local e, no modo jwks, já baixa as chaves."""
+    if _verify_mode() == "remote":
+        return
+    verifier = get_local_verifier()
+    if verifier.jwks is not None:
+        verifier.jwks.refresh()
+
+
+def get_local_verifier() -> LocalJwtVerifier:
+    global _verifier
+    if _verifier is not None:
+        return _verifier
+    mode = _verify_mode()
+    supabase_url = (os.environ.get("SUPABASE_URL") or "").rstrip("/")
+    issuer = os.environ.get("SUPABASE_JWT_ISSUER") or (f"{supabase_url}/auth/v1" if supabase_url else "")
+    if not issuer:
+        raise RuntimeError("SUPABASE_URL ou SUPABASE_JWT_ISSUER é obrigatório para validar tokens localmente")
+    audience = os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+    leeway = float(os.environ.get("SUPABASE_JWT_LEEWAY", "0"))
+    if mode == "secret":
+        secret = os.environ.get("SUPABASE_JWT_SECRET")
+        if not secret:
+            raise RuntimeError("SUPABASE_JWT_SECRET é obrigatório quando AUTH_VERIFY_MODE=secret")
+        _verifier = LocalJwtVerifier(audience=audience, issuer=issuer, secret=secret, leeway=leeway)
+    else:
+        jwks_url = os.environ.get("SUPABASE_JWKS_URL") or f"{issuer}/.well-known/jwks.json"
+        _verifier = LocalJwtVerifier(audience=audience, issuer=issuer, jwks=JwksCache(jwks_url), leeway=leeway)
+    return _verifier
+
+
+class TokenCache:
+    """Cache de tokens já validados → dict do usuário.
+
+    A chave é o SHA-256 do token (o token em si nunca fica guardado) e nenhuma
+    entrada sobrevive ao `exp` do próprio token. O armazenamento (TTL + LRU e
+    contadores de hit/miss/eviction) fica a cargo do `CacheBackend`.
+
+    Só os campos que as rotas usam (`FIELDS` + `exp`) são guardados: o usuário
+    completo do GoTrue (identities, user_metadata) não cabe nos slots do cache
+    compartilhado.
+    """
+
+    FIELDS = ("id", "email", "role", "app_metadata")
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, backend: Optional[CacheBackend] = None):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryCache(maxsize=maxsize, default_ttl=ttl)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def trim(cls, user: Dict[str, Any], exp: Optional[float]) -> Dict[str, Any]:
+        entry = {field: user[field] for field in cls.FIELDS if field in user}
+        entry["exp"] = exp
+        return entry
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get(self._key(token))
+
+    def put(self, token: str, user: Dict[str, Any], exp: Optional[float]) -> None:
+        # Sem `exp` conhecido não há como garantir que o cache não sobreviva ao token
+        if exp is None:
+            return
+        ttl = min(self.ttl, float(exp) - time.time())
+        if ttl > 0:
+            self.backend.set(self._key(token), self.trim(user, exp), ttl)
+
+    def invalidate(self, token: str) -> bool:
+        return self.backend.delete(self._key(token))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+_TOKEN_CACHE_TTL = float(os.environ.get("AUTH_TOKEN_CACHE_TTL", "60"))
+token_cache = TokenCache(
+    ttl=_TOKEN_CACHE_TTL,
+    backend=make_cache("tokens", int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024")), _TOKEN_CACHE_TTL),
+)
+
+
+# Validações remotas simultâneas do mesmo token viram uma só chamada ao GoTrue.
+# A chave é o hash do token, como no cache: o token em si não fica em memória
+_remote_flight = SingleFlight("auth.get_user")
+_remote_flight_async = AsyncSingleFlight("auth.get_user")
+
+
+def invalidate_token(bearer_or_token: str) -> bool:
+    """Remove um token do cache (ex.: logout ou mudança de permissões)."""
+    token = bearer_or_token
+    if token.startswith("Bearer "):
+        token = token[len("Bearer ") :]
+    return token_cache.invalidate(token)
+
+
+def _token_exp(token: str, user: Dict[str, Any]) -> Optional[float]:
+    exp = user.get("exp")
+    if exp is not None:
+        return exp
+    # Modo remote: o GoTrue já validou o token; aqui só lemos o `exp`
     try:
-        res = anon_client.auth.get_user(token)
-    except Exception:
-        raise HTTPException(status_code=401, detail="Token inválido")
+        return jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return None
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    # Mesmo formato (subconjunto) do model_dump do usuário retornado pelo GoTrue
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "exp": claims.get("exp"),
+    }
+
+
+def _user_response_to_dict(res: Any) -> Dict[str, Any]:
     user = getattr(res, "user", None)
     if user is None:
         raise HTTPException(status_code=401, detail="Token inválido")
@@ -23,4 +274,119 @@ def get_user_from_token(bearer: Optional[str]):
         data = user.model_dump()
     except Exception:
         data = {"id": getattr(user, "id", None), "email": getattr(user, "email", None)}
-    return data
\ No newline at end of file
+    return data
+
+
+def _get_user_remote(token: str) -> Dict[str, Any]:
+    # supabase-py v2
+    anon_client = get_anon_client()
+    try:
+        with upstream_call("auth.get_user"):
+            res = anon_client.auth.get_user(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return _user_response_to_dict(res)
+
+
+async def _get_user_remote_async(token: str) -> Dict[str, Any]:
+    anon_client = get_async_anon_client()
+    try:
+        with upstream_call("auth.get_user"):
+            res = await anon_client.auth.get_user(token)
+    except Exception as e:
+        # Supabase fora do ar não é token inválido
+        raise_if_unavailable(e)
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return _user_response_to_dict(res)
+
+
+def _get_user_local(token: str) -> Dict[str, Any]:
+    try:
+        claims = get_local_verifier().verify(token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    except httpx.HTTPError:
+        # JWKS indisponível: não é culpa do token
+        raise HTTPException(status_code=503, detail="Serviço de autenticação indisponível")
+    return _user_from_claims(claims)
+
+
+async def _get_user_local_async(token: str) -> Dict[str, Any]:
+    # A recarga do JWKS é uma requisição síncrona: roda numa thread para não travar o loop
+    verifier = get_local_verifier()
+    if verifier.jwks is not None:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.PyJWTError:
+            kid = None
+        if verifier.jwks.needs_refresh(kid):
+            return await asyncio.to_thread(_get_user_local, token)
+    return _get_user_local(token)
+
+
+def _bearer_token(bearer: Optional[str]) -> str:
+    if not bearer or not bearer.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Token não fornecido")
+    return bearer[len("Bearer ") :]
+
+
+# Token já validado nesta requisição e o usuário dele (sub-requisições do POST /batch)
+_authenticated: ContextVar[Optional[Tuple[str, Dict[str, Any]]]] = ContextVar("authenticated", default=None)
+
+
+@contextmanager
+def authenticated(bearer: Optional[str], user: Dict[str, Any]) -> Iterator[None]:
+    """Dentro do bloco (e das tasks criadas nele), `bearer` resolve para `user` sem nova validação."""
+    reset = _authenticated.set((_bearer_token(bearer), user))
+    try:
+        yield
+    finally:
+        _authenticated.reset(reset)
+
+
+def _already_authenticated(token: str) -> Optional[Dict[str, Any]]:
+    known = _authenticated.get()
+    if known is not None and known[0] == token:
+        return known[1]
+    return None
+
+
+def get_user_from_token(bearer: Optional[str]):
+    token = _bearer_token(bearer)
+    known = _already_authenticated(token)
+    if known is not None:
+        return known
+    with span("auth.token"):
+        user = token_cache.get(token)
+        if user is not None:
+            return user
+        if _verify_mode() == "remote":
+            user = _remote_flight.do(TokenCache._key(token), lambda: _get_user_remote(token))
+        else:
+            user = _get_user_local(token)
+        # Quem valida e quem acha no cache recebem o mesmo formato
+        exp = _token_exp(token, user)
+        user = TokenCache.trim(user, exp)
+        token_cache.put(token, user, exp)
+        return user
+
+
+async def get_user_from_token_async(bearer: Optional[str]):
+    """Versão para rotas `async def`; a validação local não faz I/O (a recarga do JWKS vai para uma thread)."""
+    token = _bearer_token(bearer)
+    known = _already_authenticated(token)
+    if known is not None:
+        return known
+    with span("auth.token"):
+        user = token_cache.get(token)
+        if user is not None:
+            return user
+        if _verify_mode() == "remote":
+            user = await _remote_flight_async.do(TokenCache._key(token), lambda: _get_user_remote_async(token))
+        else:
+            user = await _get_user_local_async(token)
+        # Quem valida e quem acha no cache recebem o mesmo formato
+        exp = _token_exp(token, user)
+        user = TokenCache.trim(user, exp)
+        token_cache.put(token, user, exp)
+        return user
@@ -0,0 +1,422 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import orjson
+from prometheus_client import Counter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: só o cache em memória
+    fcntl = None
+
+
+CACHE_HITS = Counter("cache_hits_total", "Consultas atendidas pelo cache", ("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "Consultas que não acharam entrada válida no cache", ("cache",))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entradas descartadas para abrir espaço", ("cache",))
+CACHE_TOO_LARGE = Counter("cache_too_large_total", "Valores que não couberam no slot do cache compartilhado", ("cache",))
+
+
+class _Uncounted:
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+def _counters(name: Optional[str]) -> Tuple[Any, Any, Any, Any]:
+    """Filhos (hits, misses, evictions, too_large) das métricas; caches sem nome não são exportados."""
+    if not name:
+        return (_Uncounted(),) * 4
+    return tuple(metric.labels(name) for metric in (CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, CACHE_TOO_LARGE))
+
+
+class CacheBackend:
+    """Interface dos caches da aplicação (tokens validados, perfis).
+
+    Valores são dicts serializáveis em JSON, para que backends compartilhados
+    entre workers possam substituir o cache em memória sem mudar quem o usa.
+
+    Cada chave tem uma geração, incrementada por `invalidate`. Quem lê da
+    origem anota `generation(key)` antes e grava com `set(..., if_generation=g)`:
+    se alguém invalidou a chave no meio (em qualquer processo que compartilhe o
+    backend), a linha lida, possivelmente antiga, não volta para o cache.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None, if_generation: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def generation(self, key: str) -> int:
+        return 0
+
+    def invalidate(self, key: str) -> None:
+        """Remove a entrada e incrementa a geração da chave (depois de uma escrita na origem)."""
+        self.delete(key)
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryCache(CacheBackend):
+    """Cache LRU com TTL por entrada, local ao processo. `maxsize <= 0` desativa.
+
+    Com `name`, os contadores também são exportados no `/metrics` (`cache_*_total{cache=name}`).
+    """
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 60.0, name: Optional[str] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Gerações por hash da chave, em tamanho fixo: colisões só fazem um `set` condicional ser descartado
+        self._generations = [0] * max(1, maxsize * 4)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hits_counter, self._misses_counter, self._evictions_counter, self._too_large_counter = _counters(name)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self._misses_counter.inc()
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                self._misses_counter.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hits_counter.inc()
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None, if_generation: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            if if_generation is not None and self._generations[self._slot(key)] != if_generation:
+                return
+            self._entries[key] = (time.time() + ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                self._evictions_counter.inc()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def _slot(self, key: str) -> int:
+        return hash(key) % len(self._generations)
+
+    def generation(self, key: str) -> int:
+        return self._generations[self._slot(key)]
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._generations[self._slot(key)] += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SharedMemoryCache(CacheBackend):
+    """Cache em memória compartilhada entre os workers de um host.
+
+    Um arquivo mapeado (`mmap`) com `maxsize` slots de `slot_bytes` bytes,
+    agrupados em buckets de `ways` slots: a chave (hash de 16 bytes) escolhe o
+    bucket e, cheio, o slot acessado há mais tempo é descartado (LRU por bucket).
+    O valor vai em JSON dentro do slot, com o TTL.
+
+    Cada slot tem um número de versão: a escrita o deixa ímpar enquanto grava e
+    par no fim, protegida por um lock de registro (`lockf`) no bucket. Leituras
+    não travam: releem a versão e descartam o que mudou no meio. Como só existe
+    uma cópia de cada entrada, uma escrita ou remoção em um worker vale na hora
+    para todos. Depois dos slots ficam as gerações (`4 * ways` contadores por
+    bucket, escolhidos pelo hash da chave), lidas e incrementadas sob o lock do
+    bucket, de modo que `invalidate` e `set(..., if_generation=...)` em
+    workers diferentes não se cruzam.
+
+    Sem `directory`, o arquivo é criado e removido do disco na hora (fica só o
+    descritor): compartilhado com os processos criados por fork depois disso,
+    como os workers do gunicorn com `preload_app`. Com `directory`, processos
+    independentes que abrem o mesmo `name` ali compartilham o cache.
+    """
+
+    MAGIC = b"DAPICSH2"
+    _HEADER = struct.Struct("<8sIII")
+    _HEADER_BYTES = 64
+    # versão, chave, expira em, último acesso, tamanho do valor
+    _SLOT = struct.Struct("<Q16sddI")
+    _SLOT_HEADER_BYTES = 48
+    _EMPTY_KEY = bytes(16)
+    _VERSION = struct.Struct("<Q")
+    _ACCESS = struct.Struct("<d")
+    _ACCESS_OFFSET = 32
+    _GENERATION = struct.Struct("<Q")
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        default_ttl: float = 60.0,
+        slot_bytes: int = 2048,
+        ways: int = 8,
+        directory: Optional[str] = None,
+    ):
+        if fcntl is None:
+            raise RuntimeError("SharedMemoryCache requer um sistema POSIX (fcntl)")
+        if slot_bytes <= self._SLOT_HEADER_BYTES:
+            raise ValueError(f"slot_bytes precisa ser maior que {self._SLOT_HEADER_BYTES}")
+        self.name = name
+        self.ways = max(1, ways)
+        self.buckets = max(1, -(-maxsize // self.ways))
+        self.maxsize = self.buckets * self.ways
+        self.default_ttl = default_ttl
+        self.slot_bytes = slot_bytes
+        self.capacity = slot_bytes - self._SLOT_HEADER_BYTES
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hits_counter, self._misses_counter, self._evictions_counter, self._too_large_counter = _counters(name)
+        self.too_large = 0
+
+        self.generations = self.maxsize * 4
+        self._generations_offset = self._HEADER_BYTES + self.maxsize * slot_bytes
+        size = self._generations_offset + self.generations * self._GENERATION.size
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(os.path.join(directory, f"{name}.cache"), os.O_RDWR | os.O_CREAT, 0o600)
+        else:
+            shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+            self._fd, path = tempfile.mkstemp(prefix=f"{name}-", suffix=".cache", dir=shm)
+            os.unlink(path)
+        # Vários processos abrindo o mesmo arquivo: só o primeiro o inicializa
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, self._HEADER.size, 0)
+            expected = self._HEADER.pack(self.MAGIC, self.maxsize, slot_bytes, self.ways)
+            if header != expected:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, expected, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _bucket(self, digest: bytes) -> int:
+        return int.from_bytes(digest[:8], "little") % self.buckets
+
+    def _offset(self, bucket: int, way: int) -> int:
+        return self._HEADER_BYTES + (bucket * self.ways + way) * self.slot_bytes
+
+    def _generation_offset(self, digest: bytes) -> int:
+        # Contadores do próprio bucket: o lock do bucket cobre também a geração
+        per_bucket = self.generations // self.buckets
+        index = self._bucket(digest) * per_bucket + int.from_bytes(digest[8:], "little") % per_bucket
+        return self._generations_offset + index * self._GENERATION.size
+
+    @contextmanager
+    def _locked(self, bucket: int) -> Iterator[None]:
+        # lockf exclui outros processos; threads do mesmo processo, o threading.Lock
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, bucket)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, bucket)
+
+    def _read(self, offset: int, digest: bytes) -> Optional[Tuple[float, bytes]]:
+        """(expira em, valor) se o slot guarda `digest`; None se guarda outra chave."""
+        mm = self._mm
+        for _ in range(8):
+            version, key, expires_at, _last_access, length = self._SLOT.unpack_from(mm, offset)
+            if version & 1:
+                continue
+            if key != digest:
+                return None
+            if length > self.capacity:
+                continue
+            start = offset + self._SLOT_HEADER_BYTES
+            data = mm[start : start + length]
+            if self._VERSION.unpack_from(mm, offset)[0] == version:
+                return expires_at, data
+        # Escrita em andamento o tempo todo: trata como miss
+        return None
+
+    def _write(self, offset: int, digest: bytes, expires_at: float, data: bytes) -> None:
+        version = self._VERSION.unpack_from(self._mm, offset)[0]
+        self._VERSION.pack_into(self._mm, offset, version + 1)
+        self._mm[offset + self._SLOT_HEADER_BYTES : offset + self._SLOT_HEADER_BYTES + len(data)] = data
+        self._SLOT.pack_into(self._mm, offset, version + 1, digest, expires_at, time.time(), len(data))
+        self._VERSION.pack_into(self._mm, offset, version + 2)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        now = time.time()
+        for way in range(self.ways):
+            offset = self._offset(bucket, way)
+            entry = self._read(offset, digest)
+            if entry is None:
+                continue
+            expires_at, data = entry
+            if expires_at <= now:
+                break
+            # Sem lock: o último acesso só orienta a escolha de quem sai do bucket
+            self._ACCESS.pack_into(self._mm, offset + self._ACCESS_OFFSET, now)
+            self.hits += 1
+            self._hits_counter.inc()
+            return orjson.loads(data)
+        self.misses += 1
+        self._misses_counter.inc()
+        return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None, if_generation: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        data = orjson.dumps(value, default=str)
+        if len(data) > self.capacity:
+            # Não cabe no slot: também não pode ficar a versão antiga
+            self.too_large += 1
+            self._too_large_counter.inc()
+            self.delete(key)
+            return
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        now = time.time()
+        with self._locked(bucket):
+            if if_generation is not None and self._GENERATION.unpack_from(self._mm, self._generation_offset(digest))[0] != if_generation:
+                return
+            # A própria chave, senão um slot vazio ou vencido, senão o menos usado
+            same = free = oldest = None
+            oldest_access = float("inf")
+            for way in range(self.ways):
+                offset = self._offset(bucket, way)
+                _version, slot_key, expires_at, last_access, _length = self._SLOT.unpack_from(self._mm, offset)
+                if slot_key == digest:
+                    same = offset
+                    break
+                if free is None and (slot_key == self._EMPTY_KEY or expires_at <= now):
+                    free = offset
+                if last_access < oldest_access:
+                    oldest, oldest_access = offset, last_access
+            target = same or free
+            if target is None:
+                target = oldest
+                self.evictions += 1
+                self._evictions_counter.inc()
+            self._write(target, digest, now + ttl, data)
+
+    def delete(self, key: str) -> bool:
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        with self._locked(bucket):
+            return self._delete_locked(bucket, digest)
+
+    def _delete_locked(self, bucket: int, digest: bytes) -> bool:
+        for way in range(self.ways):
+            offset = self._offset(bucket, way)
+            if self._SLOT.unpack_from(self._mm, offset)[1] == digest:
+                self._write(offset, self._EMPTY_KEY, 0.0, b"")
+                return True
+        return False
+
+    def generation(self, key: str) -> int:
+        digest = self._digest(key)
+        with self._locked(self._bucket(digest)):
+            return self._GENERATION.unpack_from(self._mm, self._generation_offset(digest))[0]
+
+    def invalidate(self, key: str) -> None:
+        digest = self._digest(key)
+        bucket = self._bucket(digest)
+        offset = self._generation_offset(digest)
+        with self._locked(bucket):
+            self._GENERATION.pack_into(self._mm, offset, self._GENERATION.unpack_from(self._mm, offset)[0] + 1)
+            self._delete_locked(bucket, digest)
+
+    def clear(self) -> None:
+        for bucket in range(self.buckets):
+            with self._locked(bucket):
+                for way in range(self.ways):
+                    offset = self._offset(bucket, way)
+                    if self._SLOT.unpack_from(self._mm, offset)[1] != self._EMPTY_KEY:
+                        self._write(offset, self._EMPTY_KEY, 0.0, b"")
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamanho e capacidade do cache compartilhado; contadores deste processo."""
+        now = time.time()
+        size = 0
+        for bucket in range(self.buckets):
+            for way in range(self.ways):
+                _version, key, expires_at, _last_access, _length = self._SLOT.unpack_from(self._mm, self._offset(bucket, way))
+                size += key != self._EMPTY_KEY and expires_at > now
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "too_large": self.too_large,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+
+def make_cache(name: str, maxsize: int, default_ttl: float, slot_bytes: Optional[int] = None) -> CacheBackend:
+    """Backend conforme `CACHE_BACKEND`: `memory` (padrão, por processo) ou
+    `shared` (`SharedMemoryCache`, entre os workers do host)."""
+    if os.environ.get("CACHE_BACKEND", "memory").strip().lower() == "shared" and maxsize > 0:
+        return SharedMemoryCache(
+            name,
+            maxsize=maxsize,
+            default_ttl=default_ttl,
+            slot_bytes=slot_bytes or int(os.environ.get("CACHE_SHARED_SLOT_BYTES", "2048")),
+            directory=os.environ.get("CACHE_SHARED_DIR") or None,
+        )
+    return MemoryCache(maxsize=maxsize, default_ttl=default_ttl, name=name)
@@ -0,0 +1,10 @@
+"""Leitura de configuração por variáveis de ambiente."""
+import os
+
+
+def env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_float(name: str, default: str) -> float:
+    return float(os.environ.get(name, default))
@@ -0,0 +1,33 @@
+"""ETags fortes de perfis e requisições condicionais (RFC 9110, seção 13).
+
+A versão de uma linha de `users` é o par `id` + `updated_at` (atualizado por
+trigger a cada `update`), então o ETag é um hash desse par: muda sempre que a
+linha muda e não depende da serialização da resposta.
+"""
+import hashlib
+from typing import Any, List, Mapping
+
+from starlette.responses import Response
+
+
+def etag_for(row: Mapping[str, Any]) -> str:
+    version = f"{row.get('id')}:{row.get('updated_at')}".encode()
+    return '"' + hashlib.blake2b(version, digest_size=16).hexdigest() + '"'
+
+
+def _tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: str, etag: str) -> bool:
+    """`If-None-Match` casa com `etag` (comparação fraca: `W/` é ignorado)."""
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in _tags(header))
+
+
+def match(header: str, etag: str) -> bool:
+    """`If-Match` casa com `etag` (comparação forte: tags `W/` nunca casam)."""
+    return any(tag == "*" or tag == etag for tag in _tags(header))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,33 +1,160 @@
+import atexit
+import copy
 import json
 import logging
-import time
-from typing import Any, Dict
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# Campos extras conhecidos (passados via `extra=`) que vão para o JSON
+EXTRA_FIELDS = frozenset((
+    "method", "path", "status", "latency_ms", "bytes_sent", "request_id", "user_id", "import_ms", "warmup_ms", "user_ids", "workers",
+))
+
+LOG_DROPPED = Counter("log_records_dropped_total", "Registros de log descartados por fila cheia")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BoundedQueueHandler"] = None
+_sampler: Optional["SuccessSampler"] = None
+
+
+def _json_dumps():
+    backend = os.environ.get("LOG_JSON_BACKEND", "orjson" if orjson else "json")
+    if backend == "orjson" and orjson is not None:
+        return lambda payload: orjson.dumps(payload, default=str).decode()
+    return lambda payload: json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro; usa orjson quando instalado."""
+
+    def __init__(self):
+        super().__init__()
+        self._dumps = _json_dumps()
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": int(record.created * 1000),
+        }
+        attrs = record.__dict__
+        for key in EXTRA_FIELDS.intersection(attrs):
+            payload[key] = attrs[key]
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return self._dumps(payload)
+
+
+class SuccessSampler(logging.Filter):
+    """Mantém só uma fração `rate` dos `http_request` com status < 400.
+
+    Erros e demais mensagens passam sempre.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.msg != "http_request" or getattr(record, "status", 500) >= 400:
+            return True
+        if random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Enfileira sem bloquear: com a fila cheia o registro é descartado e contado."""
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A formatação fica para a thread do listener; aqui só o que não pode
+        # esperar (mensagem com args e traceback, que referenciam estado vivo).
+        # Cópia rasa, como no QueueHandler padrão, para não afetar outros handlers
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.exc_text = exc_text
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_DROPPED.inc()
 
 
 def configure_logging() -> None:
+    global _listener, _queue_handler, _sampler
     logger = logging.getLogger("app")
     if logger.handlers:
         return
     logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler()
-
-    class JsonFormatter(logging.Formatter):
-        def format(self, record: logging.LogRecord) -> str:
-            payload: Dict[str, Any] = {
-                "level": record.levelname,
-                "message": record.getMessage(),
-                "logger": record.name,
-                "time": int(time.time() * 1000),
-            }
-            # Include extra fields if present
-            for key in ("method", "path", "status", "latency_ms", "request_id", "user_id"):
-                if hasattr(record, key):
-                    payload[key] = getattr(record, key)
-            return json.dumps(payload, ensure_ascii=False)
 
+    handler = logging.StreamHandler(sys.stderr)
     handler.setFormatter(JsonFormatter())
-    logger.addHandler(handler)
+
+    _queue_handler = BoundedQueueHandler(int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+    _sampler = SuccessSampler(float(os.environ.get("LOG_SAMPLE_RATE", "1.0")))
+    _queue_handler.addFilter(_sampler)
+    logger.addHandler(_queue_handler)
+
+    _listener = QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def reinit_after_fork() -> None:
+    """Recria fila e listener num processo filho: a thread do listener não sobrevive ao fork."""
+    global _listener
+    logger = logging.getLogger("app")
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+    _listener = None
+    configure_logging()
+
+
+def shutdown_logging() -> None:
+    """Para o listener depois de escrever o que ainda está na fila."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    """Registros na fila, descartados por fila cheia e removidos pela amostragem."""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0, "sampled_out": 0}
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "sampled_out": _sampler.sampled_out,
+    }
 
 
 def get_logger() -> logging.Logger:
-    return logging.getLogger("app")
\ No newline at end of file
+    return logging.getLogger("app")
@@ -0,0 +1,154 @@
+"""Métricas no formato Prometheus, expostas em `GET /metrics`.
+
+- `http_requests_total` e `http_request_duration_seconds`: por método, template
+  da rota e status (registradas pelo middleware de acesso em `main.py`)
+- `supabase_call_duration_seconds`: cada chamada ao Supabase, por operação
+  (`auth.get_user`, `table(users).select`, ...) e resultado (`ok`/`error`)
+- `supabase_http_*`: uso do pool de conexões compartilhado com o Supabase
+- `cache_hits_total`, `cache_misses_total`, `cache_evictions_total` e
+  `cache_too_large_total` por cache (`tokens`, `profiles`, `roles`), e
+  `cache_hit_ratio` calculado a partir deles na hora da coleta
+- `log_records_dropped_total`: registros de log perdidos com a fila cheia
+
+Com vários workers do uvicorn, defina `PROMETHEUS_MULTIPROC_DIR` (um diretório
+vazio) no ambiente do processo: cada worker grava seus valores em arquivos
+mmap ali e `/metrics` agrega todos, qualquer que seja o worker que responder.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+
+from . import tracing
+from .cache import CACHE_HITS, CACHE_MISSES
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+# Rotas não casadas (404) ficam num único label para não explodir a cardinalidade
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requisições HTTP atendidas",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_LATENCY = Histogram(
+    "supabase_call_duration_seconds",
+    "Latência das chamadas ao Supabase (GoTrue e PostgREST)",
+    ("operation", "outcome"),
+    buckets=LATENCY_BUCKETS,
+)
+
+# Pool HTTP compartilhado dos clientes Supabase (ver deps/supabase_client.py).
+# `livesum`: no modo multiprocess soma os workers vivos
+UPSTREAM_IN_FLIGHT = Gauge(
+    "supabase_http_requests_in_flight",
+    "Requisições ao Supabase em andamento (da saída até o fim da leitura do corpo)",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_POOL_CONNECTIONS = Gauge(
+    "supabase_http_pool_connections",
+    "Conexões abertas no pool HTTP do Supabase",
+    ("state",),
+    multiprocess_mode="livesum",
+)
+UPSTREAM_POOL_MAX = Gauge(
+    "supabase_http_pool_max_connections",
+    "Limite de conexões do pool HTTP do Supabase",
+    multiprocess_mode="livesum",
+)
+
+# `.labels()` resolve o filho sob um lock a cada chamada; os filhos já
+# resolvidos ficam num dict comum, lido sem lock no caminho quente
+_http_children: Dict[Tuple[str, str, int], Tuple[Counter, Histogram]] = {}
+_upstream_children: Dict[Tuple[str, str], Histogram] = {}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    key = (method, route, status)
+    children = _http_children.get(key)
+    if children is None:
+        labels = (method, route, str(status))
+        children = _http_children[key] = (HTTP_REQUESTS.labels(*labels), HTTP_LATENCY.labels(*labels))
+    children[0].inc()
+    children[1].observe(seconds)
+
+
+def observe_upstream(operation: str, outcome: str, seconds: float) -> None:
+    key = (operation, outcome)
+    child = _upstream_children.get(key)
+    if child is None:
+        child = _upstream_children[key] = UPSTREAM_LATENCY.labels(operation, outcome)
+    child.observe(seconds)
+
+
+@contextmanager
+def upstream_call(operation: str) -> Iterator[None]:
+    """Mede o bloco como uma chamada ao Supabase; serve também em código async.
+
+    Também vira um span do trace da requisição, quando há um (ver `tracing`).
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_upstream(operation, outcome, elapsed)
+        tracing.record(operation, start, elapsed)
+
+
+class CacheHitRatioCollector:
+    """`cache_hit_ratio` por cache, derivado dos contadores já somados.
+
+    Uma razão não se soma entre workers; por isso é calculada na coleta, sobre
+    os hits e misses agregados (`source` devolve as famílias de métricas).
+    """
+
+    def __init__(self, source: Callable[[], Iterable[Metric]]):
+        self._source = source
+
+    def collect(self) -> Iterator[Metric]:
+        totals: Dict[str, list] = {}
+        for family in self._source():
+            for s in family.samples:
+                if s.name in ("cache_hits_total", "cache_misses_total"):
+                    pair = totals.setdefault(s.labels["cache"], [0.0, 0.0])
+                    pair[s.name == "cache_misses_total"] += s.value
+        gauge = GaugeMetricFamily("cache_hit_ratio", "Fração das consultas atendidas pelo cache", labels=("cache",))
+        for name, (hits, misses) in sorted(totals.items()):
+            gauge.add_metric((name,), hits / (hits + misses) if hits + misses else 0.0)
+        yield gauge
+
+
+REGISTRY.register(CacheHitRatioCollector(lambda: [*CACHE_HITS.collect(), *CACHE_MISSES.collect()]))
+
+
+def render() -> Tuple[bytes, str]:
+    """Corpo e content-type de `/metrics`, agregando os workers se houver."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        collector = multiprocess.MultiProcessCollector(registry)
+        registry.register(CacheHitRatioCollector(collector.collect))
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
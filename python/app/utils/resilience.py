@@ -0,0 +1,305 @@
+"""Resiliência das chamadas ao Supabase: prazos, retries, hedging e circuit breaker.
+
+Aplicada no transporte HTTP compartilhado (`deps/supabase_client.py`), vale para
+toda chamada dos clientes assíncronos (GoTrue e PostgREST) sem mudar quem chama:
+
+- Prazo por tipo de operação, retries incluídos: `SUPABASE_DEADLINE_AUTH`,
+  `SUPABASE_DEADLINE_READ` e `SUPABASE_DEADLINE_WRITE`; estourado, vira 504
+- Retries com backoff exponencial e jitter total só para leituras idempotentes
+  (GET/HEAD), em erro de rede ou 502/503/504
+- Hedging opcional dos `select` do PostgREST (`SUPABASE_HEDGE_READS`): sem
+  resposta depois do p95 recente, uma segunda requisição sai e vale a primeira
+  que responder
+- Circuit breaker: com a taxa de falhas das últimas chamadas acima do limite,
+  tudo falha na hora com 503 por `SUPABASE_BREAKER_OPEN_SECONDS`; depois uma
+  chamada de teste decide se o circuito fecha
+
+Falhas do upstream (erro de rede, prazo estourado, 502/503/504) viram
+`UpstreamUnavailable`, um `HTTPException` (503/504), em vez do 400 genérico
+das rotas. Outros 5xx são erros da própria aplicação do Supabase (ex.: 500
+"Database error saving new user"): passam adiante como vieram e não contam
+como falha no breaker.
+"""
+import asyncio
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+import httpx
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+from .env import env_bool, env_float
+
+RETRIES = Counter(
+    "supabase_retries_total",
+    "Novas tentativas de leituras ao Supabase, por motivo (`error` de rede ou `status` 502/503/504)",
+    ("reason",),
+)
+HEDGES = Counter(
+    "supabase_hedged_requests_total",
+    "Leituras que ganharam uma segunda requisição, por quem respondeu primeiro",
+    ("winner",),
+)
+DEADLINE_EXCEEDED = Counter(
+    "supabase_deadline_exceeded_total",
+    "Chamadas ao Supabase abortadas pelo prazo, por tipo de operação",
+    ("kind",),
+)
+BREAKER_STATE = Gauge(
+    "supabase_circuit_state",
+    "Estado do circuit breaker do Supabase (0 fechado, 1 meio-aberto, 2 aberto)",
+    multiprocess_mode="livemax",
+)
+BREAKER_REJECTED = Counter(
+    "supabase_circuit_rejected_total",
+    "Chamadas recusadas na hora com o circuito aberto",
+)
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD"))
+RETRYABLE_STATUS = frozenset((502, 503, 504))
+
+UNAVAILABLE = "Supabase indisponível no momento, tente novamente em instantes"
+DEADLINE = "Tempo limite excedido ao consultar o Supabase"
+
+
+class UpstreamUnavailable(HTTPException):
+    """O Supabase falhou, demorou demais ou está com o circuito aberto."""
+
+    def __init__(self, detail: str = UNAVAILABLE, status_code: int = 503, retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after else None
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
+def raise_if_unavailable(exc: BaseException) -> None:
+    """Repassa a falha do upstream que os clientes (ex.: gotrue) embrulham em outra exceção."""
+    seen: Set[int] = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, UpstreamUnavailable):
+            raise exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+
+
+class CircuitBreaker:
+    """Janela das últimas `window` chamadas; abre com `failure_rate` de falhas.
+
+    Só conta depois de `min_calls` resultados. `failure_rate <= 0` desativa.
+
+    `allow` devolve um ticket (a época do estado atual, que muda a cada
+    transição) e `record` recebe de volta: resultados de chamadas admitidas num
+    estado anterior são ignorados. Assim, uma chamada lenta que começou com o
+    circuito fechado e termina com ele aberto não o fecha; só a chamada de teste
+    do meio-aberto decide.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_rate: float, min_calls: int, window: int, open_seconds: float):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=max(window, min_calls, 1))
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._epoch = 0
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        self._epoch += 1
+        BREAKER_STATE.set(state)
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> Optional[int]:
+        """Ticket da chamada admitida, a passar para `record`; None se recusada."""
+        if self.failure_rate <= 0 or self.state == self.CLOSED:
+            return self._epoch
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._probing:
+            # Uma única chamada de teste por vez
+            self._probing = True
+            return self._epoch
+        BREAKER_REJECTED.inc()
+        return None
+
+    def record(self, ticket: int, failed: Optional[bool]) -> None:
+        """Resultado de uma chamada admitida; `failed` é None quando ela foi cancelada."""
+        if self.failure_rate <= 0 or ticket != self._epoch:
+            return
+        if self.state == self.HALF_OPEN:
+            # Só a chamada de teste é admitida nesta época
+            self._probing = False
+            if failed:
+                self._open()
+            elif failed is not None:
+                self._outcomes.clear()
+                self._failures = 0
+                self._set_state(self.CLOSED)
+            return
+        if failed is None:
+            return
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._failures -= self._outcomes[0]
+        self._outcomes.append(failed)
+        self._failures += failed
+        if len(self._outcomes) >= self.min_calls and self._failures >= self.failure_rate * len(self._outcomes):
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN)
+
+
+class LatencyWindow:
+    """Latências recentes das leituras; o p95 é recalculado a cada `every` amostras."""
+
+    def __init__(self, size: int = 200, every: int = 20, min_samples: int = 20):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._every = every
+        self._min_samples = min_samples
+        self._since = 0
+        self._p95: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since += 1
+        if self._since >= self._every and len(self._samples) >= self._min_samples:
+            ordered = sorted(self._samples)
+            self._p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            self._since = 0
+
+    def p95(self) -> Optional[float]:
+        return self._p95
+
+
+def _close_late(task: asyncio.Future) -> None:
+    # Resposta de uma tentativa perdedora que chegou depois: devolve a conexão
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """Aplica prazo, retries, hedging e circuit breaker a cada requisição."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        self.deadlines: Dict[str, float] = {
+            "auth": env_float("SUPABASE_DEADLINE_AUTH", "5"),
+            "read": env_float("SUPABASE_DEADLINE_READ", "3"),
+            "write": env_float("SUPABASE_DEADLINE_WRITE", "10"),
+        }
+        self.retries = int(os.environ.get("SUPABASE_RETRIES", "2"))
+        self.backoff = env_float("SUPABASE_RETRY_BACKOFF", "0.05")
+        self.backoff_max = env_float("SUPABASE_RETRY_BACKOFF_MAX", "1")
+        self.hedge_reads = env_bool("SUPABASE_HEDGE_READS", False)
+        self.hedge_min_delay = env_float("SUPABASE_HEDGE_MIN_DELAY", "0.02")
+        self.breaker = CircuitBreaker(
+            failure_rate=env_float("SUPABASE_BREAKER_FAILURE_RATE", "0.5"),
+            min_calls=int(os.environ.get("SUPABASE_BREAKER_MIN_CALLS", "20")),
+            window=int(os.environ.get("SUPABASE_BREAKER_WINDOW", "50")),
+            open_seconds=env_float("SUPABASE_BREAKER_OPEN_SECONDS", "10"),
+        )
+        self.read_latency = LatencyWindow()
+
+    @staticmethod
+    def _kind(request: httpx.Request) -> str:
+        if request.url.path.startswith("/auth/"):
+            return "auth"
+        return "read" if request.method in IDEMPOTENT_METHODS else "write"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise UpstreamUnavailable(retry_after=self.breaker.retry_after())
+        kind = self._kind(request)
+        failed: Optional[bool] = None
+        try:
+            try:
+                response = await asyncio.wait_for(self._attempts(request, kind), self.deadlines[kind])
+            except asyncio.TimeoutError:
+                failed = True
+                DEADLINE_EXCEEDED.labels(kind).inc()
+                raise UpstreamUnavailable(DEADLINE, status_code=504) from None
+            except httpx.TransportError as e:
+                failed = True
+                raise UpstreamUnavailable() from e
+            # Só 502/503/504 indicam indisponibilidade; outros 5xx são erros da aplicação
+            failed = response.status_code in RETRYABLE_STATUS
+            if failed:
+                await response.aclose()
+                raise UpstreamUnavailable()
+            return response
+        finally:
+            self.breaker.record(ticket, failed)
+
+    async def _attempts(self, request: httpx.Request, kind: str) -> httpx.Response:
+        retries = self.retries if request.method in IDEMPOTENT_METHODS else 0
+        hedge = self.hedge_reads and kind == "read"
+        attempt = 0
+        while True:
+            try:
+                response = await (self._hedged(request) if hedge else self._send(request, kind))
+            except httpx.TransportError:
+                if attempt >= retries:
+                    raise
+                reason = "error"
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt >= retries:
+                    return response
+                await response.aclose()
+                reason = "status"
+            RETRIES.labels(reason).inc()
+            attempt += 1
+            # Jitter total: os retries de muitos clientes não chegam todos juntos
+            await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1))))
+
+    async def _send(self, request: httpx.Request, kind: str) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        if kind == "read" and response.status_code < 500:
+            self.read_latency.observe(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, request: httpx.Request) -> httpx.Response:
+        p95 = self.read_latency.p95()
+        if p95 is None:
+            return await self._send(request, "read")
+        primary = asyncio.ensure_future(self._send(request, "read"))
+        hedge = None
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=max(p95, self.hedge_min_delay))
+            if not done:
+                hedge = asyncio.ensure_future(self._send(request, "read"))
+                pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        await task.result().aclose()
+                if winner is not None:
+                    if hedge is not None:
+                        HEDGES.labels("primary" if winner is primary else "hedge").inc()
+                    return winner.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_close_late)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
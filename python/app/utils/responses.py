@@ -0,0 +1,34 @@
+"""Caminho rápido de resposta para modelos montados a partir de linhas do banco.
+
+Quando a rota devolve um `Response` pronto, o FastAPI não revalida nem
+reserializa o retorno pelo `response_model` (que continua valendo para o
+OpenAPI). Os modelos são montados com `model_construct` (sem validação: os
+dados vêm do nosso próprio banco) e serializados pelo serializador compilado
+que o pydantic-core gera para cada classe.
+"""
+from typing import Any, Dict, Mapping, Optional, Type, TypeVar
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def trusted(model: Type[M], data: Mapping[str, Any]) -> M:
+    """Instancia `model` sem validar; chaves fora do modelo são ignoradas."""
+    return model.model_construct(**data)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        content=model.__pydantic_serializer__.to_json(model),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def json_response(content: Dict[str, Any], status_code: int = 200) -> Response:
+    """Dicts já no formato final (ex.: projeções de `fields=`), direto para o orjson."""
+    return ORJSONResponse(content, status_code=status_code)
@@ -0,0 +1,96 @@
+"""Coalescência de leituras idênticas simultâneas ("single flight").
+
+Enquanto uma chamada para uma chave está em andamento, quem pedir a mesma
+chave espera por ela em vez de repetir a ida ao upstream, e recebe o mesmo
+resultado ou a mesma exceção. Nada é guardado depois que a chamada termina:
+isso é trabalho dos caches.
+
+`AsyncSingleFlight` serve às rotas `async def` (um event loop, sem locks);
+`SingleFlight` às funções síncronas executadas no threadpool.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from prometheus_client import Counter
+
+SINGLEFLIGHT_SAVED = Counter(
+    "singleflight_saved_total",
+    "Chamadas ao upstream evitadas por coalescência",
+    ("name",),
+)
+
+
+def _shared(result: Any) -> Any:
+    # Cada chamador recebe a própria cópia de resultados mutáveis
+    return dict(result) if isinstance(result, dict) else result
+
+
+class AsyncSingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.saved = 0
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._saved_counter = SINGLEFLIGHT_SAVED.labels(name)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            # Task própria: o cancelamento de um chamador não derruba os demais
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda task: self._finished(key, task))
+        else:
+            self.saved += 1
+            self._saved_counter.inc()
+        return _shared(await asyncio.shield(call))
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        self._calls.pop(key, None)
+        # Marca a exceção como consumida mesmo se todos os chamadores desistiram
+        if not task.cancelled():
+            task.exception()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.saved = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._saved_counter = SINGLEFLIGHT_SAVED.labels(name)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.saved += 1
+        if not leader:
+            self._saved_counter.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _shared(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
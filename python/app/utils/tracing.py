@@ -0,0 +1,159 @@
+"""Rastreamento leve por requisição: spans das chamadas ao Supabase.
+
+O middleware de acesso (`main.py`) abre um `Trace` por requisição numa
+`ContextVar`; `metrics.upstream_call` registra ali cada chamada ao Supabase e
+`span()` marca outros trechos (ex.: validação do token). No fim da requisição:
+
+- `TRACE_SERVER_TIMING=true`: header `Server-Timing` com o tempo de cada
+  operação (somado quando se repete) e o total, visível no DevTools
+- `TRACE_FILE=<caminho>`: uma linha JSON por requisição, para uma fração
+  `TRACE_SAMPLE_RATE` delas, gravada por uma thread própria
+
+Desligado (padrão), nenhum `Trace` é criado e registrar um span custa um
+`ContextVar.get()`.
+"""
+import atexit
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueListener
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .env import env_bool
+from .logging import BoundedQueueHandler, _json_dumps
+
+# (nome, início em perf_counter, duração em segundos)
+Span = Tuple[str, float, float]
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+# `table(users).select` -> `table.users.select`: nomes do Server-Timing são tokens HTTP
+_INVALID_METRIC_CHARS = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]+")
+_metric_names: Dict[str, str] = {}
+
+
+def _metric_name(name: str) -> str:
+    metric = _metric_names.get(name)
+    if metric is None:
+        metric = _metric_names[name] = re.sub(r"\.{2,}", ".", _INVALID_METRIC_CHARS.sub(".", name)).strip(".")
+    return metric
+
+
+class Trace:
+    __slots__ = ("started", "spans", "sampled", "_token")
+
+    def __init__(self, sampled: bool):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.sampled = sampled
+        self._token = None
+
+    def server_timing(self, total: float) -> str:
+        durations: Dict[str, float] = {}
+        for name, _start, seconds in self.spans:
+            metric = _metric_name(name)
+            durations[metric] = durations.get(metric, 0.0) + seconds
+        durations["total"] = total
+        return ", ".join(f"{metric};dur={seconds * 1000:.1f}" for metric, seconds in durations.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": [
+                {"name": name, "start_ms": round((start - self.started) * 1000, 2), "dur_ms": round(seconds * 1000, 2)}
+                for name, start, seconds in self.spans
+            ],
+        }
+
+
+def record(name: str, start: float, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((name, start, seconds))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, start, time.perf_counter() - start))
+
+
+class _TraceFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__()
+        self._dumps = _json_dumps()
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self._dumps(record.trace)
+
+
+class Tracer:
+    """Decide quais requisições são rastreadas e para onde vão os spans."""
+
+    def __init__(self, server_timing: bool, path: Optional[str], sample_rate: float):
+        self.server_timing = server_timing
+        self.path = path or None
+        self.sample_rate = sample_rate
+        self.enabled = server_timing or (self.path is not None and sample_rate > 0)
+        self._logger: Optional[logging.Logger] = None
+        self._listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+
+    def begin(self) -> Optional[Trace]:
+        if not self.enabled:
+            return None
+        sampled = self.path is not None and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+        if not (self.server_timing or sampled):
+            return None
+        trace = Trace(sampled)
+        trace._token = _current.set(trace)
+        return trace
+
+    def finish(self, trace: Trace, **fields: Any) -> None:
+        _current.reset(trace._token)
+        if trace.sampled:
+            self._trace_logger().info("trace", extra={"trace": {**fields, **trace.to_dict()}})
+
+    def _trace_logger(self) -> logging.Logger:
+        # Aberto no primeiro uso de cada processo: a thread de escrita não sobrevive ao fork
+        if self._pid != os.getpid():
+            logger = logging.getLogger("app.trace")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            queue_handler = BoundedQueueHandler(int(os.environ.get("LOG_QUEUE_SIZE", "10000")))
+            file_handler = logging.FileHandler(self.path, encoding="utf-8")
+            file_handler.setFormatter(_TraceFormatter())
+            logger.addHandler(queue_handler)
+            self._listener = QueueListener(queue_handler.queue, file_handler)
+            self._listener.start()
+            atexit.register(self.close)
+            self._logger = logger
+            self._pid = os.getpid()
+        return self._logger
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            self._pid = None
+
+
+tracer = Tracer(
+    server_timing=env_bool("TRACE_SERVER_TIMING", False),
+    path=os.environ.get("TRACE_FILE"),
+    sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "1.0")),
+)
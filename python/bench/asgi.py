@@ -0,0 +1,58 @@
+"""Chamada direta de um app ASGI, sem servidor nem cliente HTTP no meio.
+
+O corpo da resposta é descartado à medida que chega; só status, bytes e
+linhas são contados.
+"""
+import asyncio
+from typing import Iterable, Optional, Tuple
+
+
+async def call(
+    app,
+    method: str,
+    path: str,
+    *,
+    query: str = "",
+    headers: Iterable[Tuple[str, str]] = (),
+    body: bytes = b"",
+) -> dict:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    result = {"status": None, "bytes": 0, "lines": 0}
+    sent_request = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        # Como um servidor real: o corpo uma vez, depois bloqueia até o "disconnect"
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk: Optional[bytes] = message.get("body", b"")
+            result["bytes"] += len(chunk)
+            result["lines"] += chunk.count(b"\n")
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return result
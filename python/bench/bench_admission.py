@@ -0,0 +1,87 @@
+"""Carga acima da capacidade do upstream: sem limite vs com controle de admissão.
+
+O fake do Supabase atende no máximo `--capacity` chamadas ao mesmo tempo, cada
+uma levando `--latency` segundos. Requisições a `GET /users/me` chegam numa
+taxa fixa (carga aberta) acima do que ele aguenta; a comparação é a latência
+das requisições atendidas (200) e quantas foram recusadas rápido (503).
+
+    python -m python.bench.bench_admission --rate 300 --duration 3
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+from httpx import ASGITransport, AsyncClient
+
+from python.app.deps import supabase_client
+from python.app.main import app
+from python.app.utils import admission
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+
+def _percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _load(rate: float, duration: float) -> tuple:
+    latencies, statuses = [], Counter()
+
+    async def one(ac, i):
+        start = time.perf_counter()
+        try:
+            resp = await ac.get("/users/me", headers={"Authorization": f"Bearer uuid-{i}"})
+            status = resp.status_code
+        except Exception as e:
+            status = type(e).__name__
+        statuses[status] += 1
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=60) as ac:
+        tasks, start = [], time.perf_counter()
+        for i in range(int(rate * duration)):
+            # Chegadas em taxa fixa, independentes de quanto as anteriores demoram
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(ac, i)))
+        await asyncio.gather(*tasks)
+    # O pool HTTP fica preso ao event loop desta rodada
+    await supabase_client.close_async_clients()
+    return latencies, statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=300, help="requisições por segundo")
+    parser.add_argument("--duration", type=float, default=3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--capacity", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--queue", type=int, default=16)
+    parser.add_argument("--queue-timeout", type=float, default=0.25)
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.latency, capacity=args.capacity)
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        print(f"upstream: {args.capacity} simultâneas x {args.latency * 1000:.0f} ms; carga: {args.rate:.0f} req/s por {args.duration:.0f}s")
+        for label, limit in (("sem limite", 0), (f"admissão {args.limit}+{args.queue}", args.limit)):
+            admission.limiters["/users"] = admission.ConcurrencyLimiter("users", limit, args.queue, args.queue_timeout)
+            latencies, statuses = asyncio.run(_load(args.rate, args.duration))
+            print(
+                f"{label:<18} ok={statuses[200]:<5} 503={statuses[503]:<5} "
+                f"outros={sum(statuses.values()) - statuses[200] - statuses[503]:<5} "
+                f"p50={_percentile(latencies, 0.5) * 1000:7.0f}ms p99={_percentile(latencies, 0.99) * 1000:7.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""POST /batch vs as mesmas requisições enviadas separadamente.
+
+Cada ida e volta do cliente soma `--rtt` (latência de rede móvel simulada) ao
+tempo da requisição. "sequencial" manda uma requisição depois da outra,
+"paralelo" todas ao mesmo tempo (HTTP/2) e "batch" uma só com todas dentro.
+
+    python -m python.bench.bench_batch --size 5 --rtt 0.15 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from python.app.main import app
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+ADMIN = {"Authorization": "Bearer admin-bench"}
+LAUNCH_PATHS = ("/users/me", "/users?limit=20", "/users?status=active&limit=20", "/users?role=admin&limit=20")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _get(ac: AsyncClient, path: str, rtt: float) -> None:
+    await asyncio.sleep(rtt)
+    r = await ac.get(path, headers=ADMIN)
+    assert r.status_code == 200, r.text
+
+
+async def _sequential(ac: AsyncClient, paths: list, rtt: float) -> None:
+    for path in paths:
+        await _get(ac, path, rtt)
+
+
+async def _parallel(ac: AsyncClient, paths: list, rtt: float) -> None:
+    await asyncio.gather(*(_get(ac, path, rtt) for path in paths))
+
+
+async def _batch(ac: AsyncClient, paths: list, rtt: float) -> None:
+    await asyncio.sleep(rtt)
+    r = await ac.post("/batch", headers=ADMIN, json={"requests": [{"path": path} for path in paths]})
+    assert r.status_code == 200 and all(item["status"] == 200 for item in r.json()["responses"]), r.text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5, help="requisições por abertura do app")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--rtt", type=float, default=0.15)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    paths = [LAUNCH_PATHS[i % len(LAUNCH_PATHS)] for i in range(args.size)]
+    fake = FakeSupabase(latency=args.latency)
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        print(f"{args.size} requisições, rtt {args.rtt * 1000:.0f} ms, upstream {args.latency * 1000:.0f} ms")
+
+        async def run():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as ac:
+                for label, runner in (("sequencial", _sequential), ("paralelo", _parallel), ("batch", _batch)):
+                    fake.reset()
+                    latencies = []
+                    for _ in range(args.iterations):
+                        start = time.perf_counter()
+                        await runner(ac, paths, args.rtt)
+                        latencies.append(time.perf_counter() - start)
+                    calls = fake.stats()["calls"]
+                    print(
+                        f"{label:10} p50={_percentile(latencies, 0.5) * 1000:7.1f}ms p95={_percentile(latencies, 0.95) * 1000:7.1f}ms "
+                        f"upstream/abertura={sum(calls.values()) / args.iterations:.1f} {dict(sorted(calls.items()))}"
+                    )
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
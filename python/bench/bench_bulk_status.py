@@ -0,0 +1,66 @@
+"""PATCH /users/status em lote vs N chamadas de PATCH /users/{id}/status.
+
+    python -m python.bench.bench_bulk_status --users 2000 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+
+from python.app.main import app
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+ADMIN = {"Authorization": "Bearer admin-bench"}
+
+
+async def _single(ac: AsyncClient, ids: list, concurrency: int) -> None:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(user_id: str):
+        async with sem:
+            r = await ac.patch(f"/users/{user_id}/status", headers=ADMIN, json={"status": "blocked"})
+            assert r.status_code == 200, r.text
+
+    await asyncio.gather(*(one(i) for i in ids))
+
+
+async def _bulk(ac: AsyncClient, ids: list, _concurrency: int) -> None:
+    r = await ac.patch("/users/status", headers=ADMIN, json={"ids": ids, "status": "blocked"})
+    assert r.status_code == 200 and r.json()["updated"] == len(ids), r.text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=50, help="paralelismo do caminho item a item")
+    args = parser.parse_args()
+
+    ids = [str(uuid.UUID(int=i)) for i in range(args.users)]
+    fake = FakeSupabase(latency=args.latency)
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+
+        async def run():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as ac:
+                for label, runner in (("single", _single), ("bulk", _bulk)):
+                    fake.reset()
+                    start = time.perf_counter()
+                    await runner(ac, ids, args.concurrency)
+                    elapsed = time.perf_counter() - start
+                    calls = fake.stats()["calls"]
+                    print(
+                        f"{label:7} users={args.users} elapsed={elapsed:.2f}s "
+                        f"upstream_calls={sum(calls.values())} {dict(sorted(calls.items()))}"
+                    )
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Concorrência em voo contra o upstream: rotas sync (threadpool) vs async.
+
+Executa N chamadas simultâneas de `GET /users/me` contra o servidor fake e
+mede quantas requisições chegaram ao mesmo tempo no upstream.
+
+    python -m python.bench.bench_concurrency --requests 200 --latency 0.25
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import anyio
+from httpx import ASGITransport, AsyncClient
+
+from python.app.deps.supabase_client import get_anon_client
+from python.app.main import app
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+
+def _sync_me(token: str) -> dict:
+    # Mesmo caminho das rotas antigas (`def`): cliente sync dentro do threadpool
+    client = get_anon_client()
+    user = client.auth.get_user(token).user
+    return client.table("users").select("*").eq("id", user.id).single().execute().data
+
+
+async def _run_sync(n: int) -> None:
+    await asyncio.gather(*(anyio.to_thread.run_sync(_sync_me, f"uuid-{i}") for i in range(n)))
+
+
+async def _run_async(n: int) -> None:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as ac:
+        responses = await asyncio.gather(
+            *(ac.get("/users/me", headers={"Authorization": f"Bearer uuid-{i}"}) for i in range(n))
+        )
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.25)
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.latency)
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        limit = None
+        for label, runner in (("sync (threadpool)", _run_sync), ("async", _run_async)):
+            fake.reset()
+
+            async def run():
+                nonlocal limit
+                limit = anyio.to_thread.current_default_thread_limiter().total_tokens
+                start = time.perf_counter()
+                await runner(args.requests)
+                return time.perf_counter() - start
+
+            elapsed = asyncio.run(run())
+            stats = fake.stats()
+            print(
+                f"{label:18} requests={args.requests} threadpool={limit} "
+                f"max_in_flight={stats['max_in_flight']} elapsed={elapsed:.2f}s "
+                f"rps={args.requests / elapsed:.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Memória de pico ao exportar usuários via GET /users com Accept: application/x-ndjson.
+
+O app é chamado direto pela interface ASGI e o corpo é descartado à medida
+que chega, então o pico medido (tracemalloc) é só o do lado servidor.
+
+    python -m python.bench.bench_export --rows 20000 100000 --page 1000
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from python.app.main import app
+
+from . import asgi
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+
+async def _export(limit: int) -> tuple:
+    result = await asgi.call(
+        app,
+        "GET",
+        "/users",
+        query=f"limit={limit}",
+        headers=[("authorization", "Bearer admin-bench"), ("accept", "application/x-ndjson")],
+    )
+    return result["status"], result["lines"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--page", type=int, default=1000)
+    args = parser.parse_args()
+
+    for total in args.rows:
+        fake = FakeSupabase(latency=0, total_rows=total)
+        with fake.serve() as url:
+            os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+            os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+            from python.app.deps import supabase_client
+
+            supabase_client._async_anon_client = None  # novo servidor fake, novo cliente
+
+            async def run():
+                await _export(args.page)  # aquecimento (imports, clientes)
+                tracemalloc.start()
+                start = time.perf_counter()
+                status, lines = await _export(args.page)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                return status, lines, elapsed, peak
+
+            status, lines, elapsed, peak = asyncio.run(run())
+            print(
+                f"rows={total:>8} status={status} streamed={lines:>8} page={args.page} "
+                f"elapsed={elapsed:.1f}s peak_mem={peak / 1024 / 1024:.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
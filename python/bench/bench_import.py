@@ -0,0 +1,79 @@
+"""POST /users/import vs N chamadas de POST /auth/register.
+
+    python -m python.bench.bench_import --users 1000 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+from python.app.main import app
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+ADMIN = {"Authorization": "Bearer admin-bench"}
+
+
+def _rows(n: int) -> list:
+    return [
+        {"email": f"import-{i}@example.com", "password": "Senha1234", "name": f"Usuário {i}", "phone": "+5511999999999"}
+        for i in range(n)
+    ]
+
+
+async def _register(ac: AsyncClient, rows: list, concurrency: int) -> None:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(row: dict):
+        async with sem:
+            r = await ac.post("/auth/register", json=row)
+            assert r.status_code == 200, r.text
+
+    await asyncio.gather(*(one(row) for row in rows))
+
+
+async def _import(ac: AsyncClient, rows: list, _concurrency: int) -> None:
+    body = "".join(json.dumps(row) + "\n" for row in rows).encode()
+    r = await ac.post("/users/import", headers={**ADMIN, "Content-Type": "application/x-ndjson"}, content=body)
+    summary = json.loads(r.text.splitlines()[-1])["summary"]
+    assert r.status_code == 200 and summary["created"] == len(rows), r.text[-500:]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=1, help="paralelismo do caminho item a item")
+    args = parser.parse_args()
+
+    rows = _rows(args.users)
+    fake = FakeSupabase(latency=args.latency)
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        print(
+            f"upstream: {args.latency * 1000:.0f} ms; import com IMPORT_SIGNUP_CONCURRENCY="
+            f"{os.environ.get('IMPORT_SIGNUP_CONCURRENCY', '8')} e IMPORT_INSERT_CHUNK={os.environ.get('IMPORT_INSERT_CHUNK', '200')}"
+        )
+
+        async def run():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as ac:
+                for label, runner in (("register", _register), ("import", _import)):
+                    fake.reset()
+                    start = time.perf_counter()
+                    await runner(ac, rows, args.concurrency)
+                    elapsed = time.perf_counter() - start
+                    calls = fake.stats()["calls"]
+                    print(
+                        f"{label:8} users={args.users} elapsed={elapsed:.2f}s rows/s={args.users / elapsed:7.1f} "
+                        f"upstream_calls={sum(calls.values())} {dict(sorted(calls.items()))}"
+                    )
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
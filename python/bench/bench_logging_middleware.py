@@ -0,0 +1,91 @@
+"""Requisições/s em `GET /`: log de acesso via `BaseHTTPMiddleware` vs ASGI puro.
+
+Os dois apps têm o mesmo `GET /` e o mesmo CORS do app real; só muda o
+middleware de log. O logger escreve em /dev/null para que o custo de
+formatação entre na medida sem o custo do terminal.
+
+    python -m python.bench.bench_logging_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from python.app.main import RequestLoggingMiddleware, logger, root
+from python.app.utils import logging as app_logging
+
+from . import asgi
+
+
+class BaseHTTPRequestLoggingMiddleware(BaseHTTPMiddleware):
+    """Implementação anterior, mantida aqui só para comparação."""
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        extra = {
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "latency_ms": latency_ms,
+        }
+        try:
+            logger.info("http_request", extra=extra)
+        except Exception:
+            pass
+        return response
+
+
+def _build(middleware) -> FastAPI:
+    bench_app = FastAPI()
+    bench_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    bench_app.add_middleware(middleware)
+    bench_app.get("/")(root)
+    return bench_app
+
+
+async def _rps(bench_app, n: int) -> float:
+    for _ in range(200):
+        await asgi.call(bench_app, "GET", "/")
+    start = time.perf_counter()
+    for _ in range(n):
+        result = await asgi.call(bench_app, "GET", "/")
+    elapsed = time.perf_counter() - start
+    assert result["status"] == 200, result
+    return n / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    for handler in app_logging._listener.handlers:
+        handler.setStream(devnull)
+
+    results = {}
+    for label, middleware in (("BaseHTTPMiddleware", BaseHTTPRequestLoggingMiddleware), ("ASGI puro", RequestLoggingMiddleware)):
+        bench_app = _build(middleware)
+        # Melhor de N rodadas: reduz o ruído de GC e de outros processos
+        results[label] = max(asyncio.run(_rps(bench_app, args.requests)) for _ in range(args.rounds))
+        print(f"{label:<20} {results[label]:>9.0f} req/s")
+    base, pure = results.values()
+    print(f"ganho: {pure / base:.2f}x")
+    print(f"log: {app_logging.logging_stats()}")
+
+
+if __name__ == "__main__":
+    main()
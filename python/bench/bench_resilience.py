@@ -0,0 +1,90 @@
+"""Leituras ao PostgREST com falhas e cauda lenta: efeito dos retries e do hedging.
+
+`--requests` leituras de perfil (`users_repo.get_by_id`) com `--concurrency`
+simultâneas contra o fake do Supabase, que falha com 503 numa fração
+`--error-rate` das chamadas e demora `--tail-latency` numa fração `--tail-rate`.
+Cada configuração roda com um transporte novo; o relatório mostra erros,
+p50/p99 e chamadas ao upstream por leitura.
+
+    python -m python.bench.bench_resilience --error-rate 0.05 --tail-rate 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+
+from python.app.deps import supabase_client, users_repo
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+CONFIGS = (
+    ("sem retries", {"SUPABASE_RETRIES": "0", "SUPABASE_HEDGE_READS": "false"}),
+    ("retries", {"SUPABASE_RETRIES": "2", "SUPABASE_HEDGE_READS": "false"}),
+    ("retries + hedging", {"SUPABASE_RETRIES": "2", "SUPABASE_HEDGE_READS": "true"}),
+)
+
+
+def _percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _run(requests: int, concurrency: int) -> tuple:
+    latencies, outcomes = [], Counter()
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for i in queue:
+            start = time.perf_counter()
+            try:
+                await users_repo.get_by_id(f"uuid-{i}", columns="id,name,email")
+                outcomes["ok"] += 1
+            except HTTPException as e:
+                outcomes[e.status_code] += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # O pool HTTP (e o breaker) fica preso ao event loop desta rodada
+    await supabase_client.close_async_clients()
+    return latencies, outcomes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeSupabase(
+        latency=args.latency, jitter=0.2, error_rate=args.error_rate, tail_rate=args.tail_rate, tail_latency=args.tail_latency
+    )
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "SUPABASE_BREAKER_FAILURE_RATE": "0"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        print(
+            f"upstream: {args.latency * 1000:.0f} ms, {args.error_rate:.0%} de 503, "
+            f"{args.tail_rate:.0%} com {args.tail_latency * 1000:.0f} ms"
+        )
+        for label, env in CONFIGS:
+            os.environ.update(env)
+            fake.reset()
+            latencies, outcomes = asyncio.run(_run(args.requests, args.concurrency))
+            calls = sum(fake.stats()["calls"].values())
+            print(
+                f"{label:<18} erros={args.requests - outcomes['ok']:<5} "
+                f"p50={_percentile(latencies, 0.5) * 1000:6.1f}ms p99={_percentile(latencies, 0.99) * 1000:6.1f}ms "
+                f"upstream/leitura={calls / args.requests:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
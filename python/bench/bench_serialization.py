@@ -0,0 +1,95 @@
+"""Custo de serialização por resposta: caminho antigo vs caminho rápido.
+
+Antigo: modelo validado (`UserBasic(**row)`), revalidado e convertido pelo
+`response_model` do FastAPI e codificado pelo `JSONResponse` (json da stdlib).
+Rápido: `model_construct` + serializador compilado do pydantic-core.
+
+    python -m python.bench.bench_serialization --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from python.app.main import app
+from python.app.schemas import LoginResponse, UserBasic, UserMeResponse
+from python.app.utils.responses import json_response, model_response, trusted
+
+ROW = {
+    "id": "6f1c2e7a-0b3d-4c5e-8f6a-7b8c9d0e1f2a",
+    "name": "Usuário Bench",
+    "email": "usuario.bench@example.com",
+    "phone": "+5511999999999",
+    "status": "active",
+    "role": "user",
+    "created_at": "2024-01-15T10:30:00+00:00",
+    "updated_at": "2024-01-15T10:30:00+00:00",
+}
+
+
+def _field(path: str, method: str):
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and method in r.methods)
+    return route.secure_cloned_response_field, route.response_model_exclude_unset
+
+
+async def _old(path: str, method: str, build) -> bytes:
+    field, exclude_unset = _field(path, method)
+    content = await serialize_response(field=field, response_content=build(), exclude_unset=exclude_unset)
+    return JSONResponse(content).body
+
+
+CASES = {
+    "GET /users/me": (
+        ("/users/me", "GET"),
+        lambda: UserBasic(**ROW),
+        lambda: model_response(trusted(UserMeResponse, ROW)),
+    ),
+    "POST /auth/login": (
+        ("/auth/login", "POST"),
+        lambda: {"access_token": "a" * 600, "refresh_token": "r" * 24, "user": UserBasic(**ROW)},
+        lambda: model_response(LoginResponse.model_construct(
+            access_token="a" * 600, refresh_token="r" * 24, user=trusted(UserBasic, ROW)
+        )),
+    ),
+    "GET /users (100)": (
+        ("/users", "GET"),
+        lambda: {"users": [dict(ROW) for _ in range(100)], "next_cursor": "abc"},
+        lambda: json_response({"users": [dict(ROW) for _ in range(100)], "next_cursor": "abc"}),
+    ),
+}
+
+
+async def _measure(iterations: int) -> None:
+    for label, (route, build_old, build_new) in CASES.items():
+        old_body = await _old(*route, build_old)
+        new_body = build_new().body
+        assert json.loads(old_body) == json.loads(new_body), label
+
+        for _ in range(iterations // 10):
+            await _old(*route, build_old)
+            build_new()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await _old(*route, build_old)
+        old = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build_new()
+        new = (time.perf_counter() - start) / iterations
+        print(f"{label:<18} antigo={old * 1e6:8.1f}µs  rápido={new * 1e6:8.1f}µs  ganho={old / new:5.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(_measure(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cache por processo vs cache compartilhado entre workers (`CACHE_BACKEND`).
+
+Sobe a API de produção (`python -m python.app.serve`) com `--workers` workers
+contra o fake do Supabase, uma vez com cada backend, e dispara `--requests`
+`GET /users/me` de `--users` usuários diferentes (JWTs com `exp`, então a
+validação entra no cache de tokens). Cada requisição abre uma conexão nova,
+como clientes distintos atrás de um balanceador, e cai num worker qualquer.
+
+O relatório mostra p50/p99 e as chamadas ao upstream por requisição: com
+caches frios por worker, cada usuário é validado e lido até uma vez por
+worker; com o compartilhado, uma vez no host.
+
+    python -m python.bench.bench_shared_cache --workers 4 --users 200 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+from .fake_supabase import FAKE_KEY, FakeSupabase
+
+BACKENDS = ("memory", "shared")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _tokens(users: int) -> list:
+    exp = int(time.time()) + 3600
+    return [jwt.encode({"sub": f"uuid-{i}", "exp": exp}, "bench", algorithm="HS256") for i in range(users)]
+
+
+def _start(backend: str, workers: int, port: int, supabase_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "CACHE_BACKEND": backend,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_ANON_KEY": FAKE_KEY,
+        "AUTH_VERIFY_MODE": "remote",
+        "LOG_SAMPLE_RATE": "0",
+    }
+    env.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "python.app.serve"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                # Dá tempo aos demais workers de terminarem o warm-up
+                time.sleep(1)
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("API não ficou pronta")
+
+
+async def _run(port: int, tokens: list, requests: int, concurrency: int) -> list:
+    latencies = []
+    order = iter(random.Random(42).choices(tokens, k=requests))
+    # Sem keep-alive: cada requisição pode cair em outro worker
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+
+        async def worker() -> None:
+            for token in order:
+                start = time.perf_counter()
+                r = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+                assert r.status_code == 200, r.text
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    tokens = _tokens(args.users)
+    fake = FakeSupabase(latency=args.latency)
+    with fake.serve() as url:
+        print(f"{args.workers} workers, {args.users} usuários, {args.requests} requisições, upstream {args.latency * 1000:.0f} ms")
+        for backend in BACKENDS:
+            port = _free_port()
+            server = _start(backend, args.workers, port, url)
+            try:
+                fake.reset()
+                latencies = asyncio.run(_run(port, tokens, args.requests, args.concurrency))
+                calls = fake.stats()["calls"]
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            print(
+                f"{backend:7} p50={_percentile(latencies, 0.5) * 1000:6.1f}ms p99={_percentile(latencies, 0.99) * 1000:6.1f}ms "
+                f"upstream/req={sum(calls.values()) / args.requests:.3f} {dict(sorted(calls.items()))}"
+            )
+
+
+if __name__ == "__main__":
+    main()
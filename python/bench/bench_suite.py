@@ -0,0 +1,222 @@
+"""Suíte de carga: todas as rotas contra o Supabase fake, com concorrência fixa.
+
+Para cada cenário, `--concurrency` clientes fazem requisições em sequência até
+completar `--requests`. O app é chamado direto pela interface ASGI, no mesmo
+processo; o Supabase fake roda em outro. Relata RPS, p50/p95/p99, erros e
+chamadas ao upstream por requisição, e grava tudo em JSON para comparar
+execuções:
+
+    python -m python.bench.bench_suite --output base.json
+    python -m python.bench.bench_suite --output novo.json --compare base.json
+
+Com `--compare`, sai com código 1 se algum cenário perder mais que
+`--tolerance` de RPS ou ganhar mais que isso em p99.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+# Rate limit do login desligado: a carga toda vem do mesmo IP
+os.environ.setdefault("LOGIN_RATE_PER_IP", "0")
+os.environ.setdefault("LOGIN_RATE_PER_EMAIL", "0")
+
+from python.app.deps import supabase_client  # noqa: E402
+from python.app.main import app  # noqa: E402
+
+from . import asgi  # noqa: E402
+from .fake_supabase import FAKE_KEY, FakeSupabase  # noqa: E402
+
+JSON = ("content-type", "application/json")
+ADMIN = ("authorization", "Bearer admin-bench")
+
+# (método, path, query, headers, corpo) da i-ésima requisição de um cenário
+RequestSpec = Tuple[str, str, str, List[Tuple[str, str]], bytes]
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[int, int], RequestSpec]
+
+
+def _body(payload: dict) -> bytes:
+    return json.dumps(payload).encode()
+
+
+def _user(i: int, users: int) -> str:
+    # Os usuários se repetem, então os caches de token e perfil também são exercitados
+    return f"uuid-{i % users}"
+
+
+SCENARIOS = [
+    Scenario("GET /", lambda i, n: ("GET", "/", "", [], b"")),
+    Scenario("GET /users/me", lambda i, n: (
+        "GET", "/users/me", "", [("authorization", f"Bearer {_user(i, n)}")], b"",
+    )),
+    Scenario("PUT /users/{id}", lambda i, n: (
+        "PUT", f"/users/{_user(i, n)}", "",
+        [("authorization", f"Bearer {_user(i, n)}"), JSON], _body({"name": f"Nome {i}"}),
+    )),
+    Scenario("PATCH /users/{id}/status", lambda i, n: (
+        "PATCH", f"/users/{_user(i, n)}/status", "", [ADMIN, JSON], _body({"status": "blocked"}),
+    )),
+    Scenario("PATCH /users/status", lambda i, n: (
+        "PATCH", "/users/status", "", [ADMIN, JSON],
+        # `users.id` é uuid: ids fora do formato são recusados antes do PostgREST
+        _body({"ids": [str(uuid.UUID(int=(i * 50 + k) % n)) for k in range(50)], "status": "active"}),
+    )),
+    Scenario("GET /users", lambda i, n: ("GET", "/users", "limit=100", [ADMIN], b"")),
+    Scenario("POST /auth/login", lambda i, n: (
+        "POST", "/auth/login", "", [JSON], _body({"email": f"{_user(i, n)}@example.com", "password": "Senha123"}),
+    )),
+    Scenario("POST /auth/register", lambda i, n: (
+        "POST", "/auth/register", "", [JSON],
+        _body({"email": f"novo-{i}@example.com", "password": "Senha123", "name": "Bench", "phone": "+5511999999999"}),
+    )),
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+async def _run(scenario: Scenario, requests: int, concurrency: int, users: int) -> Tuple[List[float], Counter, float]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = itertools.count()
+
+    async def client() -> None:
+        while (i := next(counter)) < requests:
+            method, path, query, headers, body = scenario.build(i, users)
+            start = time.perf_counter()
+            result = await asgi.call(app, method, path, query=query, headers=headers, body=body)
+            latencies.append(time.perf_counter() - start)
+            statuses[result["status"]] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def _suite(fake: FakeSupabase, scenarios: List[Scenario], args) -> List[dict]:
+    results = []
+    for scenario in scenarios:
+        # Aquecimento: conexões abertas e caminhos de código já carregados
+        await _run(scenario, min(args.requests, args.concurrency * 2), args.concurrency, args.users)
+        fake.reset()
+        latencies, statuses, elapsed = await _run(scenario, args.requests, args.concurrency, args.users)
+        upstream = fake.stats()
+        calls = sum(upstream["calls"].values())
+        results.append({
+            "scenario": scenario.name,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rps": round(args.requests / elapsed, 1),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "errors": sum(n for status, n in statuses.items() if status >= 400),
+            "status_counts": {str(k): v for k, v in sorted(statuses.items())},
+            "upstream_calls_per_request": round(calls / args.requests, 3),
+            "upstream_calls": upstream["calls"],
+        })
+        print(_row(results[-1]), flush=True)
+    await supabase_client.close_async_clients()
+    return results
+
+
+def _row(r: dict) -> str:
+    return (
+        f"{r['scenario']:<26} rps={r['rps']:>8.1f} p50={r['p50_ms']:>7.1f}ms p95={r['p95_ms']:>7.1f}ms "
+        f"p99={r['p99_ms']:>7.1f}ms erros={r['errors']:<4} upstream/req={r['upstream_calls_per_request']:.2f}"
+    )
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Cenários que pioraram além da tolerância (RPS menor ou p99 maior)."""
+    before = {r["scenario"]: r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = before.get(r["scenario"])
+        if old is None:
+            continue
+        if r["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}: rps {old['rps']} -> {r['rps']}")
+        if r["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}: p99 {old['p99_ms']}ms -> {r['p99_ms']}ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=500, help="usuários distintos nos tokens e ids")
+    parser.add_argument("--latency", type=float, default=0.01, help="latência do Supabase fake, em segundos")
+    parser.add_argument("--jitter", type=float, default=0.2, help="variação da latência (fração)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de chamadas ao upstream que falham")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fração de chamadas ao upstream com latência de cauda")
+    parser.add_argument("--tail-latency", type=float, default=0.5, help="latência de cauda, em segundos")
+    parser.add_argument("--scenario", action="append", help='roda só este cenário (nome exato, ex.: "GET /users/me")')
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    parser.add_argument("--compare", help="resultado anterior (JSON) para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    fake = FakeSupabase(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        total_rows=10_000,
+    )
+    with fake.serve() as url:
+        os.environ.update({"SUPABASE_URL": url, "SUPABASE_ANON_KEY": FAKE_KEY, "AUTH_VERIFY_MODE": "remote"})
+        os.environ.pop("SUPABASE_SERVICE_ROLE_KEY", None)
+        results = asyncio.run(_suite(fake, scenarios, args))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSÃO {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Servidor local que imita o Supabase (GoTrue + PostgREST) para benchmarks.
+
+GoTrue: `POST /auth/v1/signup`, `POST /auth/v1/token`, `GET /auth/v1/user` e
+`GET /auth/v1/health`. PostgREST: `GET`/`POST`/`PATCH /rest/v1/users`. Não há
+estado: o access token é o próprio id do usuário (ou um JWT qualquer, do qual
+vale o `sub`), o usuário de um email é a parte antes do `@` e as linhas são
+geradas a partir do id.
+
+Cada chamada leva `latency` segundos (± `jitter`, fração da latência), ou
+`tail_latency` numa fração `tail_rate` delas (cauda lenta), e falha com 503
+numa fração `error_rate` das vezes. O servidor roda em um processo
+separado para não disputar o GIL com a API medida. Contadores ficam
+disponíveis em `GET /_fake/stats`.
+
+Uso típico:
+
+    fake = FakeSupabase(latency=0.05)
+    with fake.serve() as url:
+        os.environ["SUPABASE_URL"] = url
+        ...
+        print(fake.stats())
+"""
+import asyncio
+import contextlib
+import multiprocessing
+import random
+import re
+import socket
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import httpx
+import jwt
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Chave no formato JWT exigido pelo supabase-py; nunca é validada pelo servidor fake
+FAKE_KEY = "bench.bench.bench"
+
+# Listagens sem filtro de id devolvem linhas sintéticas `row-<n>`, uma por segundo a partir daqui
+LIST_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_KEYSET_RE = re.compile(r'created_at\.gt\."([^"]+)"')
+
+
+def fake_user(user_id: str) -> dict:
+    return {
+        "id": user_id,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": f"{user_id}@example.com",
+        "app_metadata": {"provider": "email"},
+        "user_metadata": {},
+        "created_at": "2024-01-15T10:30:00Z",
+    }
+
+
+def fake_row(user_id: str) -> dict:
+    return {
+        "id": user_id,
+        "name": "Usuário Bench",
+        "email": f"{user_id}@example.com",
+        "phone": "+5511999999999",
+        "status": "active",
+        "role": "admin" if user_id.startswith("admin") else "user",
+        "created_at": "2024-01-15T10:30:00Z",
+        "updated_at": "2024-01-15T10:30:00Z",
+    }
+
+
+def listed_row(n: int) -> dict:
+    return {
+        **fake_row(f"row-{n:09d}"),
+        "created_at": (LIST_EPOCH + timedelta(seconds=n)).isoformat(),
+    }
+
+
+class InjectedError(Exception):
+    pass
+
+
+class FakeSupabase:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        total_rows: int = 0,
+        capacity: int = 0,
+        error_rate: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+    ):
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.total_rows = total_rows
+        self.error_rate = error_rate
+        self.jitter = jitter
+        # capacity > 0: no máximo N requisições atendidas ao mesmo tempo (as
+        # demais esperam), como um banco saturado
+        self.capacity = capacity
+        self._slots = None
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @staticmethod
+    def _filtered_ids(request: Request) -> list:
+        if "email" in request.query_params:
+            return [request.query_params["email"].partition(".")[2].partition("@")[0]]
+        expr = request.query_params.get("id", "eq.uuid-bench")
+        op, _, value = expr.partition(".")
+        if op == "in":
+            return [v for v in value.strip("()").split(",") if v]
+        return [value]
+
+    @staticmethod
+    def _projected(row: dict, request: Request) -> dict:
+        select = request.query_params.get("select", "*")
+        if select == "*":
+            return row
+        return {c: row.get(c) for c in select.split(",")}
+
+    def _reset(self) -> None:
+        self.calls.clear()
+        self.errors.clear()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _upstream(self, name: str) -> None:
+        self.calls[name] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        latency = self.latency
+        if self.jitter:
+            latency *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.tail_rate and random.random() < self.tail_rate:
+            latency = self.tail_latency
+        try:
+            if self.capacity > 0:
+                if self._slots is None:
+                    self._slots = asyncio.Semaphore(self.capacity)
+                async with self._slots:
+                    await asyncio.sleep(latency)
+            else:
+                await asyncio.sleep(latency)
+        finally:
+            self.in_flight -= 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors[name] += 1
+            raise InjectedError(name)
+
+    async def _injected_error(self, request: Request, exc: InjectedError):
+        return JSONResponse({"code": 503, "message": f"erro injetado em {exc}"}, status_code=503)
+
+    async def health(self, request: Request):
+        return JSONResponse({"name": "GoTrue", "version": "fake"})
+
+    async def get_user(self, request: Request):
+        await self._upstream("auth.get_user")
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        user_id = token or "uuid-bench"
+        if token.count(".") == 2:
+            # JWT com `exp`: a API guarda a validação no cache de tokens
+            with contextlib.suppress(jwt.PyJWTError):
+                user_id = jwt.decode(token, options={"verify_signature": False}).get("sub", user_id)
+        return JSONResponse(fake_user(user_id))
+
+    async def signup(self, request: Request):
+        await self._upstream("auth.sign_up")
+        body = await request.json()
+        user = fake_user(body["email"].partition("@")[0])
+        user["email"] = body["email"]
+        return JSONResponse(user)
+
+    async def token(self, request: Request):
+        await self._upstream("auth.sign_in_with_password")
+        body = await request.json()
+        user_id = body.get("email", "uuid-bench@example.com").partition("@")[0]
+        return JSONResponse({
+            "access_token": user_id,
+            "refresh_token": f"refresh-{user_id}",
+            "expires_in": 3600,
+            "token_type": "bearer",
+            "user": fake_user(user_id),
+        })
+
+    def _list(self, request: Request) -> list:
+        start = 0
+        match = _KEYSET_RE.search(request.query_params.get("or", ""))
+        if match:
+            start = int((datetime.fromisoformat(match.group(1)) - LIST_EPOCH).total_seconds()) + 1
+        stop = min(self.total_rows, start + int(request.query_params.get("limit", self.total_rows)))
+        return [self._projected(listed_row(n), request) for n in range(start, stop)]
+
+    async def select_users(self, request: Request):
+        await self._upstream("table(users).select")
+        if "id" not in request.query_params and "order" in request.query_params:
+            return JSONResponse(self._list(request))
+        rows = [self._projected(fake_row(i), request) for i in self._filtered_ids(request)]
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            return JSONResponse(rows[0])
+        return JSONResponse(rows)
+
+    async def insert_users(self, request: Request):
+        await self._upstream("table(users).insert")
+        body = await request.json()
+        rows = body if isinstance(body, list) else [body]
+        return JSONResponse([self._projected({**fake_row(r.get("id", "uuid-bench")), **r}, request) for r in rows], status_code=201)
+
+    async def update_users(self, request: Request):
+        await self._upstream("table(users).update")
+        updates = await request.json()
+        rows = [self._projected({**fake_row(i), **updates}, request) for i in self._filtered_ids(request)]
+        return JSONResponse(rows)
+
+    async def stats_endpoint(self, request: Request):
+        return JSONResponse({"calls": dict(self.calls), "errors": dict(self.errors), "max_in_flight": self.max_in_flight})
+
+    async def reset_endpoint(self, request: Request):
+        self._reset()
+        return JSONResponse({"ok": True})
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/auth/v1/health", self.health, methods=["GET"]),
+                Route("/auth/v1/user", self.get_user, methods=["GET"]),
+                Route("/auth/v1/signup", self.signup, methods=["POST"]),
+                Route("/auth/v1/token", self.token, methods=["POST"]),
+                Route("/rest/v1/users", self.select_users, methods=["GET"]),
+                Route("/rest/v1/users", self.insert_users, methods=["POST"]),
+                Route("/rest/v1/users", self.update_users, methods=["PATCH"]),
+                Route("/_fake/stats", self.stats_endpoint, methods=["GET"]),
+                Route("/_fake/reset", self.reset_endpoint, methods=["POST"]),
+            ],
+            exception_handlers={InjectedError: self._injected_error},
+        )
+
+    def _run(self, host: str, port: int) -> None:
+        uvicorn.run(self.app(), host=host, port=port, log_level="warning", access_log=False)
+
+    @contextlib.contextmanager
+    def serve(self, host: str = "127.0.0.1") -> Iterator[str]:
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        process = multiprocessing.Process(target=self._run, args=(host, port), daemon=True)
+        process.start()
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    httpx.get(f"{self.url}/_fake/stats")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline or not process.is_alive():
+                        raise RuntimeError("Servidor fake do Supabase não iniciou")
+                    time.sleep(0.05)
+            yield self.url
+        finally:
+            process.terminate()
+            process.join(timeout=5)
+
+    def stats(self) -> dict:
+        return httpx.get(f"{self.url}/_fake/stats").json()
+
+    def reset(self) -> None:
+        httpx.post(f"{self.url}/_fake/reset")
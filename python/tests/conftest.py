@@ -0,0 +1,251 @@
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Union
+
+import httpx
+import pytest
+
+from python.app.deps import supabase_client, users_repo
+from python.app.utils import admission
+from python.app.utils import auth as auth_utils
+from python.app.utils.cache import MemoryCache
+
+
+class FakeUpstream:
+    """GoTrue + PostgREST em memória, servidos aos clientes httpx via MockTransport.
+
+    Cada requisição que chega ao "Supabase" fica registrada em `calls`, o que
+    permite afirmar quantas idas ao upstream uma rota fez. `inject` programa
+    falhas para as próximas chamadas de um método/path.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, dict] = {}
+        self.tokens: Dict[str, str] = {}
+        self.passwords: Dict[str, str] = {}
+        self.calls: List[tuple] = []
+        self.faults: Dict[tuple, Deque[Union[int, float, str]]] = {}
+
+    def inject(self, method: str, path: str, *faults: Union[int, float, str, asyncio.Event]) -> None:
+        """Próximas chamadas a `method path`, uma falha por chamada: um status HTTP
+        (int), um atraso em segundos antes da resposta normal (float), `"disconnect"`
+        ou um `asyncio.Event` (a resposta é montada na hora e só sai quando ele for setado)."""
+        self.faults.setdefault((method, path), deque()).extend(faults)
+
+    def add_user(self, user_id: Optional[str] = None, *, token: Optional[str] = None, password: Optional[str] = None, **fields) -> dict:
+        user_id = user_id or str(uuid.uuid4())
+        row = {
+            "id": user_id,
+            "name": "Teste",
+            "email": f"{user_id}@example.com",
+            "phone": "+5511999999999",
+            "status": "active",
+            "role": "user",
+            "created_at": "2024-01-15T10:30:00+00:00",
+            "updated_at": "2024-01-15T10:30:00+00:00",
+        }
+        row.update(fields)
+        self.users[user_id] = row
+        if token:
+            self.tokens[token] = user_id
+        if password:
+            self.passwords[row["email"]] = password
+        return row
+
+    def count(self, method: Optional[str] = None, path: Optional[str] = None) -> int:
+        return sum(1 for m, p in self.calls if (method is None or m == method) and (path is None or p == path))
+
+    # GoTrue
+
+    def _auth_user(self, user_id: str) -> dict:
+        row = self.users.get(user_id, {})
+        return {
+            "id": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": row.get("email"),
+            "app_metadata": {"provider": "email"},
+            "user_metadata": {},
+            "created_at": "2024-01-15T10:30:00+00:00",
+        }
+
+    def _gotrue(self, request: httpx.Request, path: str) -> httpx.Response:
+        if path == "/auth/v1/user":
+            token = request.headers.get("authorization", "").removeprefix("Bearer ")
+            if token not in self.tokens:
+                return httpx.Response(401, json={"code": 401, "msg": "invalid JWT"})
+            return httpx.Response(200, json=self._auth_user(self.tokens[token]))
+        body = json.loads(request.content or b"{}")
+        if path == "/auth/v1/signup":
+            user_id = str(uuid.uuid4())
+            self.passwords[body["email"]] = body["password"]
+            user = self._auth_user(user_id)
+            user["email"] = body["email"]
+            return httpx.Response(200, json=user)
+        if path == "/auth/v1/token":
+            email = body.get("email")
+            if self.passwords.get(email) != body.get("password"):
+                return httpx.Response(400, json={"error": "invalid_grant", "error_description": "Invalid login credentials"})
+            user_id = next((u["id"] for u in self.users.values() if u["email"] == email), str(uuid.uuid4()))
+            token = f"token-{user_id}"
+            self.tokens[token] = user_id
+            return httpx.Response(200, json={
+                "access_token": token,
+                "refresh_token": f"refresh-{user_id}",
+                "expires_in": 3600,
+                "token_type": "bearer",
+                "user": self._auth_user(user_id),
+            })
+        return httpx.Response(404, json={"msg": "not found"})
+
+    # PostgREST
+
+    @staticmethod
+    def _split_top_level(expr: str) -> List[str]:
+        parts, depth, quoted, current = [], 0, False, ""
+        for ch in expr:
+            if ch == '"':
+                quoted = not quoted
+            elif not quoted and ch == "(":
+                depth += 1
+            elif not quoted and ch == ")":
+                depth -= 1
+            elif not quoted and ch == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+            current += ch
+        parts.append(current)
+        return parts
+
+    @classmethod
+    def _condition(cls, row: dict, column: str, expr: str) -> bool:
+        if column in ("or", "and"):
+            results = [cls._logic(row, part) for part in cls._split_top_level(expr[1:-1])]
+            return any(results) if column == "or" else all(results)
+        op, _, value = expr.partition(".")
+        value = value.strip('"')
+        current = "" if row.get(column) is None else str(row.get(column))
+        if op == "eq":
+            return current == value
+        if op == "in":
+            return current in value.strip("()").split(",")
+        if op in ("gt", "gte", "lt", "lte"):
+            return {"gt": current > value, "gte": current >= value, "lt": current < value, "lte": current <= value}[op]
+        raise AssertionError(f"Operador não suportado no fake: {op}")
+
+    @classmethod
+    def _logic(cls, row: dict, part: str) -> bool:
+        # `col.op.valor` ou `and(...)`/`or(...)` dentro de um filtro lógico
+        if part.startswith(("and(", "or(")):
+            name, _, rest = part.partition("(")
+            return cls._condition(row, name, "(" + rest)
+        column, _, expr = part.partition(".")
+        return cls._condition(row, column, expr)
+
+    @classmethod
+    def _matches(cls, row: dict, params: httpx.QueryParams) -> bool:
+        for column, expr in params.multi_items():
+            if column in ("select", "limit", "order", "offset", "columns"):
+                continue
+            if not cls._condition(row, column, expr):
+                return False
+        return True
+
+    @staticmethod
+    def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+        if not select or select == "*":
+            return [dict(r) for r in rows]
+        columns = select.split(",")
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    def _postgrest(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        select = params.get("select")
+        if request.method == "POST":
+            body = json.loads(request.content)
+            rows = body if isinstance(body, list) else [body]
+            inserted = []
+            for row in rows:
+                row = {k: v for k, v in row.items() if v is not None}
+                inserted.append(self.add_user(row.pop("id", None), **row))
+            return self._representation(request, inserted, select, status=201)
+        matched = [r for r in self.users.values() if self._matches(r, params)]
+        if request.method == "PATCH":
+            updates = json.loads(request.content)
+            for row in matched:
+                row.update(updates)
+                row["updated_at"] = "2024-02-01T12:00:00+00:00"
+            return self._representation(request, matched, select)
+        if "order" in params:
+            columns = [c.split(".")[0] for c in params["order"].split(",")]
+            matched.sort(key=lambda r: tuple(str(r.get(c)) for c in columns))
+        if "limit" in params:
+            matched = matched[: int(params["limit"])]
+        rows = self._project(matched, select)
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return httpx.Response(406, json={
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                })
+            return httpx.Response(200, json=rows[0])
+        return httpx.Response(200, json=rows)
+
+    def _representation(self, request: httpx.Request, rows: List[dict], select: Optional[str], status: int = 200) -> httpx.Response:
+        if "return=representation" not in request.headers.get("prefer", ""):
+            return httpx.Response(204 if status == 200 else status)
+        return httpx.Response(status, json=self._project(rows, select))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        pending = self.faults.get((request.method, request.url.path))
+        if pending:
+            fault = pending.popleft()
+            if fault == "disconnect":
+                self.calls.append((request.method, request.url.path))
+                raise httpx.ConnectError("conexão recusada (falha injetada)", request=request)
+            if isinstance(fault, int):
+                self.calls.append((request.method, request.url.path))
+                return httpx.Response(fault, json={"code": fault, "message": "erro injetado"})
+            if isinstance(fault, asyncio.Event):
+                response = self.handler(request)
+                await fault.wait()
+                return response
+            await asyncio.sleep(fault)
+        return self.handler(request)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append((request.method, path))
+        if path.startswith("/auth/v1/"):
+            return self._gotrue(request, path)
+        if path == "/rest/v1/users":
+            return self._postgrest(request)
+        return httpx.Response(404, json={"message": "not found"})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Supabase fake: todos os clientes httpx assíncronos criados no teste falam com ele."""
+    fake = FakeUpstream()
+    transport = httpx.MockTransport(fake.handle)
+    monkeypatch.setattr(supabase_client, "_pool_transport", lambda: transport)
+    monkeypatch.setattr(supabase_client, "_transport", None)
+    for var in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("SUPABASE_URL", "http://supabase.test")
+    monkeypatch.setenv("SUPABASE_ANON_KEY", "anon.key.test")
+    monkeypatch.delenv("SUPABASE_SERVICE_ROLE_KEY", raising=False)
+    monkeypatch.setenv("AUTH_VERIFY_MODE", "remote")
+    monkeypatch.setattr(supabase_client, "_async_anon_client", None)
+    monkeypatch.setattr(supabase_client, "_async_service_client", None)
+    monkeypatch.setattr(auth_utils, "token_cache", auth_utils.TokenCache(maxsize=0))
+    monkeypatch.setattr(users_repo, "profile_cache", MemoryCache(maxsize=0))
+    monkeypatch.setattr(users_repo, "role_cache", MemoryCache(maxsize=0))
+    monkeypatch.setattr(admission, "login_ip_limiter", admission.TokenBucketLimiter("login_ip", rate=0, burst=0))
+    monkeypatch.setattr(admission, "login_email_limiter", admission.TokenBucketLimiter("login_email", rate=0, burst=0))
+    return fake
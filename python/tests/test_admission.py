@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+from python.app.utils import admission
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_hands_off_and_rejects():
+    limiter = admission.ConcurrencyLimiter("teste", limit=1, queue_size=1, queue_timeout=1)
+    await limiter.acquire()
+    queued = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats() == {"active": 1, "waiting": 1, "rejected": 0}
+
+    # Fila cheia: recusa imediata
+    with pytest.raises(admission.Overloaded):
+        await limiter.acquire()
+
+    limiter.release()
+    await queued
+    assert limiter.stats() == {"active": 1, "waiting": 0, "rejected": 1}
+    limiter.release()
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_queue_timeout():
+    limiter = admission.ConcurrencyLimiter("teste", limit=1, queue_size=5, queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(admission.Overloaded):
+        await limiter.acquire()
+    assert limiter.waiting == 0
+    limiter.release()
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_overloaded_group_gets_fast_503(upstream, monkeypatch):
+    upstream.add_user("uuid-1", token="tok-1")
+    users = admission.ConcurrencyLimiter("users", limit=1, queue_size=0, queue_timeout=1)
+    monkeypatch.setitem(admission.limiters, "/users", users)
+    await users.acquire()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+        # Outros grupos não são afetados
+        assert (await ac.get("/")).status_code == 200
+        users.release()
+        resp = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+        assert resp.status_code == 200
+    assert users.active == 0
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limited_per_ip_and_email(upstream, monkeypatch):
+    upstream.add_user("uuid-1", password="Senha123")
+    monkeypatch.setattr(admission, "login_email_limiter", admission.TokenBucketLimiter("login_email", rate=0.01, burst=2))
+    body = {"email": "uuid-1@example.com", "password": "Senha123"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        statuses = [(await ac.post("/auth/login", json=body)).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        other = await ac.post("/auth/login", json={**body, "email": "outro@example.com"})
+        assert other.status_code == 400
+
+        monkeypatch.setattr(admission, "login_ip_limiter", admission.TokenBucketLimiter("login_ip", rate=0.01, burst=1))
+        await ac.post("/auth/login", json={**body, "email": "mais-um@example.com"})
+        resp = await ac.post("/auth/login", json={**body, "email": "ainda-outro@example.com"})
+    assert resp.status_code == 429
+    assert int(resp.headers["retry-after"]) >= 1
+    # Tentativas recusadas não chegam ao GoTrue
+    assert upstream.count("POST", "/auth/v1/token") == 4
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+
+from python.app.utils import auth as auth_utils
+
+SECRET = "super-secret-jwt-token-with-at-least-32-characters"
+ISSUER = "https://projeto.supabase.co/auth/v1"
+
+
+def mint(key=SECRET, alg="HS256", headers=None, **overrides):
+    now = int(time.time())
+    claims = {
+        "sub": "uuid-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "iat": now,
+        "exp": now + 3600,
+        "app_metadata": {"provider": "email"},
+    }
+    claims.update(overrides)
+    claims = {k: v for k, v in claims.items() if v is not None}
+    return jwt.encode(claims, key, algorithm=alg, headers=headers)
+
+
+@pytest.fixture
+def secret_mode(monkeypatch):
+    monkeypatch.setenv("AUTH_VERIFY_MODE", "secret")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setenv("SUPABASE_URL", "https://projeto.supabase.co")
+    monkeypatch.setattr(auth_utils, "_verifier", None)
+    monkeypatch.setattr(auth_utils, "token_cache", auth_utils.TokenCache(maxsize=0))
+
+    def no_network(_token):
+        raise AssertionError("GoTrue não deve ser chamado no modo local")
+
+    monkeypatch.setattr(auth_utils, "_get_user_remote", no_network)
+
+
+def test_secret_mode_accepts_valid_token(secret_mode):
+    user = auth_utils.get_user_from_token(f"Bearer {mint()}")
+    assert user["id"] == "uuid-1"
+    assert user["email"] == "user@example.com"
+    assert user["app_metadata"] == {"provider": "email"}
+
+
+@pytest.mark.parametrize("overrides", [
+    {"exp": int(time.time()) - 10},
+    {"aud": "anon-service"},
+    {"iss": "https://outro.supabase.co/auth/v1"},
+    {"exp": None},
+])
+def test_secret_mode_rejects_bad_claims(secret_mode, overrides):
+    with pytest.raises(HTTPException) as exc:
+        auth_utils.get_user_from_token(f"Bearer {mint(**overrides)}")
+    assert exc.value.status_code == 401
+
+
+def test_secret_mode_rejects_wrong_signature_and_alg_none(secret_mode):
+    forged = mint(key="outro-secret-qualquer-com-32-caracteres!!")
+    unsigned = jwt.encode({"sub": "uuid-1"}, None, algorithm="none")
+    for token in (forged, unsigned, "not-a-jwt"):
+        with pytest.raises(HTTPException) as exc:
+            auth_utils.get_user_from_token(f"Bearer {token}")
+        assert exc.value.status_code == 401
+
+
+def _rsa_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    public_jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return private_key, public_jwk
+
+
+def test_jwks_cache_refreshes_on_unknown_kid():
+    key1, jwk1 = _rsa_jwk("k1")
+    key2, jwk2 = _rsa_jwk("k2")
+    published = {"keys": [jwk1]}
+    fetches = []
+
+    def fetch(url):
+        fetches.append(url)
+        return published
+
+    cache = auth_utils.JwksCache("https://jwks.test", fetch=fetch, min_refresh_interval=0)
+    verifier = auth_utils.LocalJwtVerifier(audience="authenticated", issuer=ISSUER, jwks=cache)
+
+    assert verifier.verify(mint(key1, alg="RS256", headers={"kid": "k1"}))["sub"] == "uuid-1"
+    assert verifier.verify(mint(key1, alg="RS256", headers={"kid": "k1"}))["sub"] == "uuid-1"
+    assert len(fetches) == 1
+
+    # Rotação de chaves: novo kid força uma recarga do JWKS
+    published = {"keys": [jwk1, jwk2]}
+    assert verifier.verify(mint(key2, alg="RS256", headers={"kid": "k2"}))["sub"] == "uuid-1"
+    assert len(fetches) == 2
+
+
+def test_jwks_cache_rate_limits_refresh_and_rejects_hs256():
+    key1, jwk1 = _rsa_jwk("k1")
+    fetches = []
+
+    def fetch(_url):
+        fetches.append(1)
+        return {"keys": [jwk1]}
+
+    cache = auth_utils.JwksCache("https://jwks.test", fetch=fetch, min_refresh_interval=60)
+    verifier = auth_utils.LocalJwtVerifier(audience="authenticated", issuer=ISSUER, jwks=cache)
+
+    for _ in range(3):
+        with pytest.raises(jwt.InvalidTokenError):
+            verifier.verify(mint(key1, alg="RS256", headers={"kid": "desconhecido"}))
+    assert len(fetches) == 1
+
+    # Sem secret configurado, tokens HS256 não são aceitos no modo JWKS
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        verifier.verify(mint())
+
+
+@pytest.mark.asyncio
+async def test_async_path_fetches_jwks_off_the_event_loop(monkeypatch):
+    key1, jwk1 = _rsa_jwk("k1")
+    loop_ran = threading.Event()
+
+    def slow_fetch(_url):
+        # Só termina se o loop continuar rodando enquanto o JWKS é baixado
+        assert loop_ran.wait(2)
+        return {"keys": [jwk1]}
+
+    cache = auth_utils.JwksCache("https://jwks.test", fetch=slow_fetch, min_refresh_interval=0)
+    verifier = auth_utils.LocalJwtVerifier(audience="authenticated", issuer=ISSUER, jwks=cache)
+    monkeypatch.setenv("AUTH_VERIFY_MODE", "jwks")
+    monkeypatch.setattr(auth_utils, "_verifier", verifier)
+    monkeypatch.setattr(auth_utils, "token_cache", auth_utils.TokenCache(maxsize=0))
+
+    async def tick():
+        await asyncio.sleep(0.01)
+        loop_ran.set()
+
+    user, _ = await asyncio.gather(
+        auth_utils.get_user_from_token_async(f"Bearer {mint(key1, alg='RS256', headers={'kid': 'k1'})}"),
+        tick(),
+    )
+    assert user["id"] == "uuid-1"
+    assert not cache.needs_refresh("k1")
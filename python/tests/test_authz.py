@@ -0,0 +1,95 @@
+import time
+
+import jwt
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.deps import users_repo
+from python.app.main import app
+from python.app.utils import auth as auth_utils
+from python.app.utils.cache import MemoryCache
+
+REST = "/rest/v1/users"
+SECRET = "super-secret-jwt-token-with-at-least-32-characters"
+
+
+def mint(sub, **app_metadata):
+    now = int(time.time())
+    return jwt.encode({
+        "sub": sub,
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iss": "http://supabase.test/auth/v1",
+        "iat": now,
+        "exp": now + 3600,
+        "app_metadata": {"provider": "email", **app_metadata},
+        # Editável pelo próprio usuário: nunca vale como role
+        "user_metadata": {"role": "admin"},
+    }, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def secret_mode(upstream, monkeypatch):
+    monkeypatch.setenv("AUTH_VERIFY_MODE", "secret")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(auth_utils, "_verifier", None)
+    return upstream
+
+
+async def _patch_status(token, user_id="uuid-2", status="blocked"):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.patch(f"/users/{user_id}/status", headers={"Authorization": f"Bearer {token}"}, json={"status": status})
+
+
+@pytest.mark.asyncio
+async def test_admin_from_token_claims_makes_no_authorization_query(secret_mode):
+    upstream = secret_mode
+    upstream.add_user("uuid-2")
+
+    for status in ("blocked", "active", "inactive"):
+        resp = await _patch_status(mint("admin-1", role="admin"), status=status)
+        assert resp.status_code == 200
+
+    # Só os updates: nenhum select de role e nenhuma ida ao GoTrue
+    assert upstream.count() == 3
+    assert upstream.count("PATCH", REST) == 3
+
+
+@pytest.mark.asyncio
+async def test_user_metadata_role_is_ignored(secret_mode):
+    upstream = secret_mode
+    upstream.add_user("uuid-1", role="user")
+
+    resp = await _patch_status(mint("uuid-1"), user_id="uuid-1")
+
+    assert resp.status_code == 403
+    # Sem role nas claims, cai na tabela users
+    assert upstream.count("GET", REST) == 1
+    assert upstream.count("PATCH", REST) == 0
+
+
+@pytest.mark.asyncio
+async def test_role_cache_serves_repeated_calls_and_is_invalidated_on_role_change(upstream, monkeypatch):
+    monkeypatch.setattr(users_repo, "role_cache", MemoryCache(maxsize=16, default_ttl=60))
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    upstream.add_user("uuid-2")
+
+    for _ in range(3):
+        assert (await _patch_status("tok-admin")).status_code == 200
+    assert upstream.count("GET", REST) == 1
+
+    await users_repo.update("admin-1", {"role": "user"}, columns="id,role")
+    assert (await _patch_status("tok-admin")).status_code == 403
+    assert upstream.count("GET", REST) == 2
+
+
+@pytest.mark.asyncio
+async def test_non_role_updates_keep_the_cached_role(upstream, monkeypatch):
+    monkeypatch.setattr(users_repo, "role_cache", MemoryCache(maxsize=16, default_ttl=60))
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+
+    assert await users_repo.get_role("admin-1") == "admin"
+    await users_repo.update("admin-1", {"name": "Outro Nome"}, columns="id")
+    assert await users_repo.get_role("admin-1") == "admin"
+    assert users_repo.invalidate_role("admin-1")
+    assert await users_repo.get_role("nao-existe") is None
+    assert upstream.count("GET", REST) == 2
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient, ASGITransport
+from python.app.deps import users_repo
+from python.app.main import app
+from python.app.utils import auth as auth_utils
+
+REST = "/rest/v1/users"
+AUTH_USER = "/auth/v1/user"
+
+
+async def _batch(requests, token="tok-1"):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        return await ac.post("/batch", headers={"Authorization": f"Bearer {token}"}, json={"requests": requests})
+
+
+@pytest.mark.asyncio
+async def test_batch_authenticates_once_and_returns_each_response(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+
+    resp = await _batch([
+        {"path": "/users/me"},
+        {"method": "PUT", "path": "/users/uuid-1", "body": {"name": "Novo Nome"}},
+        {"path": "/users/me"},
+        {"path": "/nao-existe"},
+    ])
+
+    assert resp.status_code == 200
+    first, update, second, missing = resp.json()["responses"]
+    assert first["status"] == 200 and first["body"]["name"] == "Teste"
+    assert first["headers"]["etag"]
+    assert update["status"] == 200 and update["body"]["user"]["name"] == "Novo Nome"
+    # A leitura depois da escrita enxerga a escrita
+    assert second["status"] == 200 and second["body"]["name"] == "Novo Nome"
+    assert missing["status"] == 404
+    assert upstream.count("GET", AUTH_USER) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_consecutive_reads_concurrently(upstream, monkeypatch):
+    upstream.add_user("uuid-1", token="tok-1")
+    active = peak = 0
+    original = users_repo.get_profile
+
+    async def slow_get_profile(user_id):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.01)
+            return await original(user_id)
+        finally:
+            active -= 1
+
+    monkeypatch.setattr(users_repo, "get_profile", slow_get_profile)
+
+    resp = await _batch([{"path": "/users/me"}] * 3 + [{"method": "PUT", "path": "/users/uuid-1", "body": {"name": "Outro"}}, {"path": "/users/me"}])
+
+    assert [r["status"] for r in resp.json()["responses"]] == [200] * 5
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_subrequest_errors_stay_in_their_slot(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+
+    resp = await _batch([
+        {"method": "PUT", "path": "/users/uuid-2", "body": {"name": "Outro"}},
+        {"method": "PUT", "path": "/users/uuid-1", "body": {"name": "x"}},
+        {"path": "/batch"},
+        {"path": "/users/me", "headers": {"Authorization": "Bearer outro-token"}},
+    ])
+
+    forbidden, invalid, nested, me = resp.json()["responses"]
+    assert forbidden["status"] == 403
+    assert invalid["status"] == 422 and invalid["body"]["message"] == "Erro de validação"
+    assert nested["status"] == 400
+    # O Authorization do lote vale para todas as sub-requisições
+    assert me["status"] == 200 and me["body"]["id"] == "uuid-1"
+
+
+@pytest.mark.asyncio
+async def test_batch_requires_token_and_limits_size(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+
+    resp = await _batch([{"path": "/users/me"}], token="invalido")
+    assert resp.status_code == 401
+
+    resp = await _batch([{"path": "/users/me"}] * 21)
+    assert resp.status_code == 422
+    resp = await _batch([])
+    assert resp.status_code == 422
+    assert upstream.count("GET", REST) == 0
+
+
+@pytest.mark.asyncio
+async def test_authenticated_context_only_applies_to_its_token(upstream):
+    upstream.add_user("uuid-2", token="tok-2")
+    user = {"id": "uuid-1"}
+    with auth_utils.authenticated("Bearer tok-1", user):
+        assert await auth_utils.get_user_from_token_async("Bearer tok-1") is user
+        assert (await auth_utils.get_user_from_token_async("Bearer tok-2"))["id"] == "uuid-2"
+    assert upstream.count("GET", AUTH_USER) == 1
+    with pytest.raises(HTTPException) as exc:
+        await auth_utils.get_user_from_token_async("Bearer tok-1")
+    assert exc.value.status_code == 401
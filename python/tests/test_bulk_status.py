@@ -0,0 +1,68 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+from python.app.routers import users as users_router
+
+REST = "/rest/v1/users"
+ADMIN = {"Authorization": "Bearer tok-admin"}
+
+
+def uid(i):
+    return f"00000000-0000-0000-0000-{i:012d}"
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_checks_role_once_and_updates_per_chunk(upstream, monkeypatch):
+    monkeypatch.setattr(users_router, "BULK_STATUS_CHUNK_SIZE", 2)
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    for i in range(1, 5):
+        upstream.add_user(uid(i))
+
+    ids = [uid(1), uid(2), uid(3), uid(2), uid(99), uid(4)]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.patch("/users/status", headers=ADMIN, json={"ids": ids, "status": "blocked"})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["updated"] == 4
+    assert [r["id"] for r in body["results"]] == [uid(1), uid(2), uid(3), uid(99), uid(4)]
+    assert body["results"][3] == {"id": uid(99), "updated": False, "status": None, "error": "Usuário não encontrado"}
+    assert all(upstream.users[uid(i)]["status"] == "blocked" for i in range(1, 5))
+    # 1 select de role + 3 lotes (5 ids distintos / 2)
+    assert upstream.count("GET", REST) == 1
+    assert upstream.count("PATCH", REST) == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_rejects_bad_ids_alone_and_normalizes_uppercase(upstream):
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    first, second = "6f1c2e7a-0b3d-4c5e-8f6a-7b8c9d0e1f2a", "8a2d3f4b-1c2e-4d5f-9a0b-1c2d3e4f5a6b"
+    upstream.add_user(first)
+    upstream.add_user(second)
+
+    ids = [first.upper(), "1),role.eq.(admin", second, first]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.patch("/users/status", headers=ADMIN, json={"ids": ids, "status": "blocked"})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["updated"] == 2
+    # Maiúsculas viram a forma canônica (e duplicam o mesmo id); o id inválido não entra no lote
+    assert body["results"] == [
+        {"id": first, "updated": True, "status": "blocked", "error": None},
+        {"id": "1),role.eq.(admin", "updated": False, "status": None, "error": "ID inválido"},
+        {"id": second, "updated": True, "status": "blocked", "error": None},
+    ]
+    assert upstream.users["admin-1"]["status"] == "active"
+    assert upstream.count("PATCH", REST) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_requires_admin_and_valid_status(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.patch("/users/status", headers={"Authorization": "Bearer tok-1"}, json={"ids": [uid(1)], "status": "blocked"})
+        assert resp.status_code == 403
+        resp = await ac.patch("/users/status", headers={"Authorization": "Bearer tok-1"}, json={"ids": [], "status": "unknown"})
+        assert resp.status_code == 422
+    assert upstream.count("PATCH", REST) == 0
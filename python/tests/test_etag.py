@@ -0,0 +1,88 @@
+import time
+
+import jwt
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.deps import users_repo
+from python.app.main import app
+from python.app.utils import auth as auth_utils
+from python.app.utils import etag
+from python.app.utils.cache import MemoryCache
+
+REST = "/rest/v1/users"
+AUTH = {"Authorization": "Bearer tok-1"}
+
+
+def test_conditional_header_matching():
+    tag = etag.etag_for({"id": "uuid-1", "updated_at": "2024-01-15T10:30:00+00:00"})
+    assert tag.startswith('"') and tag.endswith('"')
+    assert tag != etag.etag_for({"id": "uuid-1", "updated_at": "2024-02-01T12:00:00+00:00"})
+    assert etag.none_match(f'"outro", W/{tag}', tag)
+    assert etag.none_match("*", tag)
+    assert not etag.none_match('"outro"', tag)
+    assert etag.match(f'"outro", {tag}', tag)
+    assert not etag.match(f"W/{tag}", tag)
+
+
+@pytest.mark.asyncio
+async def test_me_revalidates_without_upstream_calls(upstream, monkeypatch):
+    monkeypatch.setattr(auth_utils, "token_cache", auth_utils.TokenCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(users_repo, "profile_cache", MemoryCache(maxsize=16, default_ttl=30))
+    # Só tokens com `exp` entram no cache de tokens
+    token = jwt.encode({"sub": "uuid-1", "exp": int(time.time()) + 3600}, "segredo-de-teste", algorithm="HS256")
+    upstream.add_user("uuid-1", token=token)
+    auth = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        first = await ac.get("/users/me", headers=auth)
+        tag = first.headers["etag"]
+        calls = len(upstream.calls)
+
+        again = await ac.get("/users/me", headers={**auth, "If-None-Match": tag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["etag"] == tag
+        assert len(upstream.calls) == calls
+
+        stale = await ac.get("/users/me", headers={**auth, "If-None-Match": '"antigo"'})
+        assert stale.status_code == 200
+        assert stale.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_put_if_match(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        tag = (await ac.get("/users/me", headers=AUTH)).headers["etag"]
+
+        ok = await ac.put("/users/uuid-1", headers={**AUTH, "If-Match": tag}, json={"name": "Novo Nome"})
+        assert ok.status_code == 200
+        new_tag = ok.headers["etag"]
+        assert new_tag != tag
+
+        # O ETag antigo ficou para trás: 412 e nada é escrito
+        patches = upstream.count("PATCH", REST)
+        conflict = await ac.put("/users/uuid-1", headers={**AUTH, "If-Match": tag}, json={"name": "Outro"})
+        assert conflict.status_code == 412
+        assert upstream.count("PATCH", REST) == patches
+        assert upstream.users["uuid-1"]["name"] == "Novo Nome"
+
+        me = await ac.get("/users/me", headers=AUTH)
+        assert me.headers["etag"] == new_tag
+
+
+@pytest.mark.asyncio
+async def test_put_if_match_loses_race_to_concurrent_write(upstream, monkeypatch):
+    upstream.add_user("uuid-1", token="tok-1")
+    get_by_id = users_repo.get_by_id
+
+    async def read_then_concurrent_write(user_id, columns):
+        row = await get_by_id(user_id, columns)
+        upstream.users[user_id]["updated_at"] = "2024-03-01T00:00:00+00:00"
+        return row
+
+    monkeypatch.setattr(users_repo, "get_by_id", read_then_concurrent_write)
+    tag = etag.etag_for(upstream.users["uuid-1"])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.put("/users/uuid-1", headers={**AUTH, "If-Match": tag}, json={"name": "Novo Nome"})
+    assert resp.status_code == 412
+    assert upstream.users["uuid-1"]["name"] == "Teste"
@@ -0,0 +1,48 @@
+import json
+import logging
+
+from prometheus_client import REGISTRY
+from python.app.utils.logging import BoundedQueueHandler, JsonFormatter, SuccessSampler
+
+
+def record(msg="http_request", **extra):
+    rec = logging.LogRecord("app", logging.INFO, __file__, 1, msg, None, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_formatter_emits_known_extras_only():
+    line = JsonFormatter().format(record(method="GET", path="/users/{id}", status=200, bytes_sent=10, other="x"))
+    payload = json.loads(line)
+    assert payload["message"] == "http_request"
+    assert payload["path"] == "/users/{id}"
+    assert payload["bytes_sent"] == 10
+    assert "other" not in payload
+
+
+def test_full_queue_drops_instead_of_blocking():
+    before = REGISTRY.get_sample_value("log_records_dropped_total")
+    handler = BoundedQueueHandler(maxsize=2)
+    for _ in range(5):
+        handler.handle(record(status=200))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    assert REGISTRY.get_sample_value("log_records_dropped_total") == before + 3
+
+
+def test_sampler_keeps_errors_and_other_messages():
+    sampler = SuccessSampler(rate=0.0)
+    assert not sampler.filter(record(status=200))
+    assert sampler.filter(record(status=500))
+    assert sampler.filter(record("startup"))
+    assert sampler.sampled_out == 1
+
+
+def test_prepared_record_does_not_touch_original():
+    handler = BoundedQueueHandler(maxsize=10)
+    original = record("user %s", status=200)
+    original.args = ("x",)
+    handler.handle(original)
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "user x" and queued.args is None
+    assert original.args == ("x",)
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from gotrue import AsyncGoTrueClient
+from httpx import AsyncClient, ASGITransport
+from python.app.deps import users_repo
+from python.app.main import app
+from python.app.routers import auth as auth_router
+
+
+@pytest.mark.asyncio
+async def test_login_fetches_profile_while_authenticating(upstream, monkeypatch):
+    row = upstream.add_user(password="Senha123")
+    profile_started = asyncio.Event()
+    get_by_email = users_repo.get_by_email
+
+    async def tracked_get_by_email(email, columns):
+        profile_started.set()
+        return await get_by_email(email, columns)
+
+    async def sign_in(self, credentials):
+        # Só conclui se a busca do perfil já tiver começado
+        await asyncio.wait_for(profile_started.wait(), 1)
+        return await sign_in_with_password(self, credentials)
+
+    sign_in_with_password = AsyncGoTrueClient.sign_in_with_password
+    monkeypatch.setattr(users_repo, "get_by_email", tracked_get_by_email)
+    monkeypatch.setattr(AsyncGoTrueClient, "sign_in_with_password", sign_in)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.post("/auth/login", json={"email": row["email"], "password": "Senha123"})
+    assert r.status_code == 200
+    user = r.json()["user"]
+    assert (user["id"], user["email"]) == (row["id"], row["email"])
+
+
+@pytest.mark.asyncio
+async def test_failed_login_looks_the_same_with_or_without_account(upstream, monkeypatch):
+    row = upstream.add_user(password="Senha123")
+    discarded = []
+    discard = auth_router._discard
+    monkeypatch.setattr(auth_router, "_discard", lambda task: (discarded.append(task), discard(task)))
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        existing = await ac.post("/auth/login", json={"email": row["email"], "password": "Errada123"})
+        missing = await ac.post("/auth/login", json={"email": "ninguem@example.com", "password": "Errada123"})
+    assert existing.status_code == missing.status_code == 400
+    assert existing.json() == missing.json()
+    assert len(discarded) == 2
+    await asyncio.sleep(0)
+    assert all(task.done() for task in discarded)
@@ -0,0 +1,65 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+from python.app.deps import users_repo
+from python.app.main import app
+from python.app.utils.cache import MemoryCache
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_request_and_upstream_histograms(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    me = {"method": "GET", "route": "/users/me", "status": "200"}
+    before_requests = sample("http_requests_total", **me)
+    before_get_user = sample("supabase_call_duration_seconds_count", operation="auth.get_user", outcome="ok")
+    before_select = sample("supabase_call_duration_seconds_count", operation="table(users).select", outcome="ok")
+    before_unmatched = sample("http_requests_total", method="GET", route="<unmatched>", status="404")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for _ in range(2):
+            assert (await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})).status_code == 200
+        await ac.get("/nao-existe")
+        resp = await ac.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/users/me",status="200"}' in resp.text
+    assert sample("http_requests_total", **me) == before_requests + 2
+    assert sample("http_request_duration_seconds_count", **me) >= 2
+    assert sample("supabase_call_duration_seconds_count", operation="auth.get_user", outcome="ok") == before_get_user + 2
+    assert sample("supabase_call_duration_seconds_count", operation="table(users).select", outcome="ok") == before_select + 2
+    assert sample("http_requests_total", method="GET", route="<unmatched>", status="404") == before_unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_upstream_call_is_labeled_error(upstream):
+    before = sample("supabase_call_duration_seconds_count", operation="auth.get_user", outcome="error")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers={"Authorization": "Bearer desconhecido"})
+    assert resp.status_code == 401
+    assert sample("supabase_call_duration_seconds_count", operation="auth.get_user", outcome="error") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_cache_counters_and_hit_ratio(upstream, monkeypatch):
+    monkeypatch.setattr(users_repo, "profile_cache", MemoryCache(maxsize=1, default_ttl=30, name="profiles"))
+    upstream.add_user("uuid-1", token="tok-1")
+    upstream.add_user("uuid-2", token="tok-2")
+    before = {name: sample(name, cache="profiles") for name in ("cache_hits_total", "cache_misses_total", "cache_evictions_total")}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for token in ("tok-1", "tok-1", "tok-2"):
+            assert (await ac.get("/users/me", headers={"Authorization": f"Bearer {token}"})).status_code == 200
+        resp = await ac.get("/metrics")
+
+    assert sample("cache_hits_total", cache="profiles") == before["cache_hits_total"] + 1
+    assert sample("cache_misses_total", cache="profiles") == before["cache_misses_total"] + 2
+    assert sample("cache_evictions_total", cache="profiles") == before["cache_evictions_total"] + 1
+    hits, misses = sample("cache_hits_total", cache="profiles"), sample("cache_misses_total", cache="profiles")
+    assert sample("cache_hit_ratio", cache="profiles") == pytest.approx(hits / (hits + misses))
+    assert 'cache_hit_ratio{cache="profiles"}' in resp.text
+
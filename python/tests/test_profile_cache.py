@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+from python.app.deps import users_repo
+from python.app.utils.cache import MemoryCache
+
+REST = "/rest/v1/users"
+
+
+@pytest.fixture
+def profile_cache(monkeypatch, upstream):
+    cache = MemoryCache(maxsize=2, default_ttl=30)
+    monkeypatch.setattr(users_repo, "profile_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_me_is_served_from_cache(upstream, profile_cache):
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        for _ in range(3):
+            resp = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+            assert resp.status_code == 200
+    assert upstream.count("GET", REST) == 1
+    stats = profile_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_ratio"] == pytest.approx(2 / 3, rel=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cached_profile(upstream, profile_cache):
+    upstream.add_user("uuid-1", token="tok-1", name="Antigo")
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        me = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+        assert me.json()["name"] == "Antigo"
+
+        await ac.put("/users/uuid-1", headers={"Authorization": "Bearer tok-1"}, json={"name": "Novo Nome"})
+        me = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+        assert me.json()["name"] == "Novo Nome"
+
+        await ac.patch("/users/uuid-1/status", headers={"Authorization": "Bearer tok-admin"}, json={"status": "blocked"})
+        me = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+        assert me.json()["status"] == "blocked"
+
+
+@pytest.mark.asyncio
+async def test_read_in_flight_during_a_write_does_not_recache_the_old_row(upstream, profile_cache):
+    upstream.add_user("uuid-1", token="tok-1", name="Antigo")
+    auth = {"Authorization": "Bearer tok-1"}
+    hold = asyncio.Event()
+    # O select de `/users/me` lê a linha antiga e fica preso até depois do PUT
+    upstream.inject("GET", REST, hold)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        stale = asyncio.ensure_future(ac.get("/users/me", headers=auth))
+        while upstream.count("GET", REST) == 0:
+            await asyncio.sleep(0)
+
+        resp = await ac.put("/users/uuid-1", headers=auth, json={"name": "Novo Nome"})
+        assert resp.status_code == 200
+        # Quem lê depois da escrita não se junta à leitura antiga
+        fresh = await asyncio.wait_for(ac.get("/users/me", headers=auth), 1)
+        assert fresh.json()["name"] == "Novo Nome"
+
+        hold.set()
+        assert (await stale).json()["name"] == "Antigo"
+        me = await ac.get("/users/me", headers=auth)
+        assert me.json()["name"] == "Novo Nome"
+
+
+def test_memory_cache_ttl_and_lru(monkeypatch):
+    import time
+
+    cache = MemoryCache(maxsize=2, default_ttl=10)
+    cache.set("a", {"id": "a"})
+    cache.set("b", {"id": "b"}, ttl=1)
+    assert cache.get("a") == {"id": "a"}
+    cache.set("c", {"id": "c"})  # "b" é o menos usado recentemente
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
@@ -0,0 +1,37 @@
+import logging
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+
+
+def access_logs(caplog):
+    return [r for r in caplog.records if r.name == "app" and r.getMessage() == "http_request"]
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_echoed_and_logged(caplog):
+    caplog.set_level(logging.INFO, logger="app")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/", headers={"X-Request-ID": "req-123"})
+        generated = await ac.get("/")
+    assert resp.headers["x-request-id"] == "req-123"
+    assert len(generated.headers["x-request-id"]) == 32
+
+    first, second = access_logs(caplog)
+    assert first.request_id == "req-123"
+    assert second.request_id == generated.headers["x-request-id"]
+    assert first.method == "GET" and first.path == "/" and first.status == 200
+    assert first.bytes_sent == len(resp.content)
+
+
+@pytest.mark.asyncio
+async def test_logs_route_template_instead_of_raw_path(caplog, upstream):
+    caplog.set_level(logging.INFO, logger="app")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.patch("/users/uuid-42/status", json={"status": "blocked"}, headers={"Authorization": "Bearer x"})
+        await ac.get("/nao-existe")
+    routed, unmatched = access_logs(caplog)
+    assert routed.path == "/users/{id}/status"
+    assert routed.status == 401
+    assert unmatched.path == "/nao-existe" and unmatched.status == 404
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+from python.app.deps import supabase_client
+from python.app.main import app
+from python.app.utils.resilience import CircuitBreaker, ResilientTransport
+
+REST = "/rest/v1/users"
+AUTH = {"Authorization": "Bearer tok-1"}
+
+
+@pytest.fixture
+def fast_retries(monkeypatch, upstream):
+    monkeypatch.setenv("SUPABASE_RETRY_BACKOFF", "0")
+    upstream.add_user("uuid-1", token="tok-1")
+    return upstream
+
+
+def client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_reads_are_retried_on_network_errors_and_5xx(fast_retries):
+    fast_retries.inject("GET", REST, 503, "disconnect")
+    async with client() as ac:
+        resp = await ac.get("/users/me", headers=AUTH)
+    assert resp.status_code == 200
+    assert fast_retries.count("GET", REST) == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_are_not_retried(fast_retries):
+    fast_retries.inject("PATCH", REST, 503)
+    async with client() as ac:
+        resp = await ac.put("/users/uuid-1", headers=AUTH, json={"name": "Novo Nome"})
+    assert resp.status_code == 503
+    assert resp.json() == {"detail": "Supabase indisponível no momento, tente novamente em instantes"}
+    assert fast_retries.count("PATCH", REST) == 1
+
+
+@pytest.mark.asyncio
+async def test_auth_outage_is_503_not_invalid_token(fast_retries):
+    fast_retries.inject("GET", "/auth/v1/user", 503, 502, 504)
+    async with client() as ac:
+        resp = await ac.get("/users/me", headers=AUTH)
+    assert resp.status_code == 503
+    assert fast_retries.count("GET", "/auth/v1/user") == 3
+
+
+@pytest.mark.asyncio
+async def test_other_5xx_are_application_errors_not_outages(fast_retries, monkeypatch):
+    monkeypatch.setenv("SUPABASE_BREAKER_MIN_CALLS", "1")
+    fast_retries.inject("PATCH", REST, 500)
+    async with client() as ac:
+        resp = await ac.put("/users/uuid-1", headers=AUTH, json={"name": "Novo Nome"})
+    # O erro real do PostgREST chega à rota, e o breaker não conta como falha
+    assert resp.status_code == 400
+    assert resp.json() == {"detail": "erro injetado"}
+    assert supabase_client.get_transport().breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_deadline_covers_slow_reads(fast_retries, monkeypatch):
+    monkeypatch.setenv("SUPABASE_DEADLINE_READ", "0.05")
+    fast_retries.inject("GET", REST, 1.0)
+    async with client() as ac:
+        start = time.perf_counter()
+        resp = await ac.get("/users/me", headers=AUTH)
+    assert resp.status_code == 504
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_fails_fast_and_recovers(fast_retries, monkeypatch):
+    for name, value in {
+        "SUPABASE_RETRIES": "0",
+        "SUPABASE_BREAKER_FAILURE_RATE": "0.5",
+        "SUPABASE_BREAKER_MIN_CALLS": "4",
+        "SUPABASE_BREAKER_WINDOW": "4",
+        "SUPABASE_BREAKER_OPEN_SECONDS": "30",
+    }.items():
+        monkeypatch.setenv(name, value)
+    fast_retries.inject("GET", REST, 503, 503)
+    async with client() as ac:
+        # Cada /users/me: auth.get_user (ok) + select (503) -> 2 de 4 falharam
+        for _ in range(2):
+            assert (await ac.get("/users/me", headers=AUTH)).status_code == 503
+        breaker = supabase_client.get_transport().breaker
+        assert breaker.state == CircuitBreaker.OPEN
+
+        calls = len(fast_retries.calls)
+        resp = await ac.get("/users/me", headers=AUTH)
+        assert resp.status_code == 503
+        assert int(resp.headers["retry-after"]) > 0
+        assert len(fast_retries.calls) == calls
+        assert REGISTRY.get_sample_value("supabase_circuit_state") == CircuitBreaker.OPEN
+
+        # Passado o tempo aberto, uma chamada de teste bem-sucedida fecha o circuito
+        breaker._opened_at -= 30
+        assert (await ac.get("/users/me", headers=AUTH)).status_code == 200
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_slow_read_is_hedged(monkeypatch):
+    monkeypatch.setenv("SUPABASE_HEDGE_READS", "true")
+    delays = [0.5, 0.0]
+
+    async def handler(request):
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json=[{"id": "uuid-1"}])
+
+    transport = ResilientTransport(httpx.MockTransport(handler))
+    transport.read_latency._p95 = 0.01
+
+    def hedge_wins():
+        return REGISTRY.get_sample_value("supabase_hedged_requests_total", {"winner": "hedge"}) or 0
+
+    before = hedge_wins()
+    async with httpx.AsyncClient(transport=transport, base_url="http://supabase.test") as http:
+        start = time.perf_counter()
+        resp = await http.get(REST)
+    assert resp.json() == [{"id": "uuid-1"}]
+    assert time.perf_counter() - start < 0.3
+    assert delays == []
+    assert hedge_wins() == before + 1
+
+
+def test_late_success_from_before_the_circuit_opened_does_not_close_it():
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=2, open_seconds=30)
+    slow = breaker.allow()
+    for _ in range(2):
+        breaker.record(breaker.allow(), True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # A chamada lenta, admitida com o circuito fechado, termina bem depois que ele abriu
+    breaker.record(slow, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() is None
+
+    # Só a chamada de teste do meio-aberto decide
+    breaker._opened_at -= 30
+    probe = breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is None
+    breaker.record(slow, False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(probe, False)
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,33 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+
+
+@pytest.mark.asyncio
+async def test_rows_are_trusted_and_serialized_with_all_fields(upstream):
+    # E-mail que o EmailStr recusaria: a linha vem do nosso banco e não é revalidada
+    upstream.add_user("uuid-1", token="tok-1", email="legado@localhost", phone=None)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers={"Authorization": "Bearer tok-1"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json() == {
+        "id": "uuid-1",
+        "email": "legado@localhost",
+        "name": "Teste",
+        "phone": None,
+        "status": "active",
+        "role": "user",
+        "created_at": "2024-01-15T10:30:00+00:00",
+        "updated_at": "2024-01-15T10:30:00+00:00",
+    }
+
+
+def test_openapi_keeps_response_models():
+    paths = app.openapi()["paths"]
+    schema = paths["/users/me"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/UserMeResponse"}
+    login = paths["/auth/login"]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert login == {"$ref": "#/components/schemas/LoginResponse"}
+    user_basic = app.openapi()["components"]["schemas"]["UserBasic"]
+    assert user_basic["properties"]["email"]["anyOf"][0]["format"] == "email"
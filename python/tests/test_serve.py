@@ -0,0 +1,19 @@
+from python.app import serve
+
+
+def test_multiprocess_dir_cleanup_only_removes_prometheus_files(tmp_path, monkeypatch):
+    for name in ("counter_101.db", "gauge_livesum_102.db", "histogram_103.db", "dados.db", "notas.txt"):
+        (tmp_path / name).write_text("x")
+    (tmp_path / "sub").mkdir()
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    serve._prepare_multiprocess_dir(workers=2)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dados.db", "notas.txt", "sub"]
+
+
+def test_multiprocess_dir_is_created_when_missing(tmp_path, monkeypatch):
+    directory = tmp_path / "prometheus"
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(directory))
+    serve._prepare_multiprocess_dir(workers=2)
+    assert directory.is_dir()
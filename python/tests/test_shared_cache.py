@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+from python.app.deps import users_repo
+from python.app.utils import auth as auth_utils
+from python.app.utils.cache import MemoryCache, SharedMemoryCache, make_cache
+
+
+@pytest.fixture
+def cache():
+    cache = SharedMemoryCache("test", maxsize=4, default_ttl=10, slot_bytes=256, ways=2)
+    yield cache
+    cache.close()
+
+
+def test_shared_cache_get_set_delete(cache):
+    assert cache.get("a") is None
+    cache.set("a", {"id": "a", "n": 1})
+    assert cache.get("a") == {"id": "a", "n": 1}
+    cache.set("a", {"id": "a", "n": 2})
+    assert cache.get("a") == {"id": "a", "n": 2}
+    assert cache.delete("a")
+    assert not cache.delete("a")
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 0)
+
+
+def test_shared_cache_ttl(cache, monkeypatch):
+    cache.set("a", {"id": "a"}, ttl=1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2)
+    assert cache.get("a") is None
+
+
+def test_shared_cache_evicts_least_recently_used_of_the_bucket(monkeypatch):
+    clock = iter(range(1_000_000_000, 1_000_001_000))
+    monkeypatch.setattr(time, "time", lambda: float(next(clock)))
+    # Um bucket só, com 2 slots
+    cache = SharedMemoryCache("test", maxsize=2, default_ttl=600, slot_bytes=256, ways=2)
+    cache.set("a", {"id": "a"})
+    cache.set("b", {"id": "b"})
+    assert cache.get("a") == {"id": "a"}
+    cache.set("c", {"id": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"} and cache.get("c") == {"id": "c"}
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_shared_cache_drops_values_that_do_not_fit(cache):
+    cache.set("a", {"id": "a"})
+    cache.set("a", {"id": "a", "blob": "x" * 1000})
+    assert cache.get("a") is None
+    assert cache.stats()["too_large"] == 1
+
+
+def _child(cache, ready, done):
+    # Processo irmão (como outro worker): lê o que o pai gravou e grava por cima
+    assert cache.get("user") == {"name": "pai"}
+    cache.set("user", {"name": "filho"})
+    cache.set("token", {"id": "uuid-1"})
+    ready.set()
+    done.wait(5)
+    # A remoção feita pelo pai vale aqui também
+    assert cache.get("token") is None
+
+
+def test_shared_cache_is_shared_across_forked_processes(cache):
+    ctx = multiprocessing.get_context("fork")
+    ready, done = ctx.Event(), ctx.Event()
+    cache.set("user", {"name": "pai"})
+    child = ctx.Process(target=_child, args=(cache, ready, done))
+    child.start()
+    assert ready.wait(5)
+    assert cache.get("user") == {"name": "filho"}
+    assert cache.get("token") == {"id": "uuid-1"}
+    cache.delete("token")
+    done.set()
+    child.join(5)
+    assert child.exitcode == 0
+
+
+def test_shared_cache_by_directory(tmp_path):
+    first = SharedMemoryCache("profiles", maxsize=8, slot_bytes=256, directory=str(tmp_path))
+    second = SharedMemoryCache("profiles", maxsize=8, slot_bytes=256, directory=str(tmp_path))
+    first.set("uuid-1", {"id": "uuid-1"})
+    assert second.get("uuid-1") == {"id": "uuid-1"}
+    first.close()
+    second.close()
+
+
+def test_make_cache_follows_cache_backend(monkeypatch):
+    assert isinstance(make_cache("tokens", 16, 60), MemoryCache)
+    monkeypatch.setenv("CACHE_BACKEND", "shared")
+    cache = make_cache("tokens", 16, 60)
+    assert isinstance(cache, SharedMemoryCache)
+    cache.close()
+    # Tamanho 0 desativa o cache, em qualquer backend
+    assert isinstance(make_cache("tokens", 0, 60), MemoryCache)
+
+
+def test_token_cache_on_shared_backend():
+    backend = SharedMemoryCache("tokens", maxsize=8, slot_bytes=512)
+    tokens = auth_utils.TokenCache(ttl=60, backend=backend)
+    exp = int(time.time()) + 3600
+    tokens.put("tok-1", {"id": "uuid-1", "app_metadata": {"provider": "email"}}, exp=exp)
+    assert tokens.get("tok-1") == {"id": "uuid-1", "app_metadata": {"provider": "email"}, "exp": exp}
+    assert tokens.invalidate("tok-1")
+    backend.close()
+
+
+def test_token_cache_keeps_large_gotrue_users_within_the_slot():
+    backend = SharedMemoryCache("tokens", maxsize=8, slot_bytes=2048)
+    tokens = auth_utils.TokenCache(ttl=60, backend=backend)
+    exp = int(time.time()) + 3600
+    user = {
+        "id": "uuid-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "app_metadata": {"provider": "google", "providers": ["google", "email"]},
+        "user_metadata": {"avatar_url": "https://example.com/" + "a" * 1500, "full_name": "Usuário Teste"},
+        "identities": [{"id": str(i), "identity_data": {"sub": "x" * 200}} for i in range(3)],
+    }
+    tokens.put("tok-1", user, exp=exp)
+
+    assert tokens.get("tok-1") == {
+        "id": "uuid-1",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "app_metadata": {"provider": "google", "providers": ["google", "email"]},
+        "exp": exp,
+    }
+    assert backend.stats()["too_large"] == 0
+    backend.close()
+
+
+def _invalidate_in_sibling(cache, key):
+    cache.invalidate(key)
+
+
+def test_invalidation_in_another_process_blocks_a_stale_set(cache):
+    ctx = multiprocessing.get_context("fork")
+    # A leitura começa neste processo...
+    generation = cache.generation("uuid-1")
+    # ...outro worker grava e invalida...
+    child = ctx.Process(target=_invalidate_in_sibling, args=(cache, "uuid-1"))
+    child.start()
+    child.join(5)
+    assert child.exitcode == 0
+    # ...e a linha lida antes da escrita não volta para o cache
+    cache.set("uuid-1", {"name": "Antigo"}, if_generation=generation)
+    assert cache.get("uuid-1") is None
+
+    cache.set("uuid-1", {"name": "Novo"}, if_generation=cache.generation("uuid-1"))
+    assert cache.get("uuid-1") == {"name": "Novo"}
+
+
+def _write_profile_in_sibling(user_id):
+    users_repo._invalidate(user_id)
+
+
+@pytest.mark.asyncio
+async def test_profile_read_in_flight_while_another_worker_writes(upstream, monkeypatch):
+    shared = SharedMemoryCache("profiles", maxsize=8, slot_bytes=512)
+    monkeypatch.setattr(users_repo, "profile_cache", shared)
+    upstream.add_user("uuid-1", name="Antigo")
+    hold = asyncio.Event()
+    upstream.inject("GET", "/rest/v1/users", hold)
+
+    read = asyncio.ensure_future(users_repo.get_profile("uuid-1"))
+    while upstream.count("GET", "/rest/v1/users") == 0:
+        await asyncio.sleep(0)
+    # O PUT cai em outro worker, que herdou o mesmo cache compartilhado
+    child = multiprocessing.get_context("fork").Process(target=_write_profile_in_sibling, args=("uuid-1",))
+    child.start()
+    child.join(5)
+    assert child.exitcode == 0
+    hold.set()
+
+    assert (await read)["name"] == "Antigo"
+    assert shared.get("uuid-1") is None
+    shared.close()
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from python.app.deps import users_repo
+from python.app.utils import auth as auth_utils
+from python.app.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_me_reads_share_upstream_calls(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    saved_before = auth_utils._remote_flight_async.saved
+
+    users = await asyncio.gather(*(auth_utils.get_user_from_token_async("Bearer tok-1") for _ in range(5)))
+    profiles = await asyncio.gather(*(users_repo.get_profile("uuid-1") for _ in range(5)))
+
+    assert {u["id"] for u in users} == {"uuid-1"}
+    assert all(p["id"] == "uuid-1" for p in profiles)
+    assert upstream.count("GET", "/auth/v1/user") == 1
+    assert upstream.count("GET", "/rest/v1/users") == 1
+    assert auth_utils._remote_flight_async.saved == saved_before + 4
+    # Cada chamador recebe uma cópia própria
+    profiles[0]["name"] = "alterado"
+    assert profiles[1]["name"] == "Teste"
+
+
+@pytest.mark.asyncio
+async def test_in_flight_validations_are_keyed_by_token_hash(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    upstream.inject("GET", "/auth/v1/user", 0.01)
+
+    pending = asyncio.ensure_future(auth_utils.get_user_from_token_async("Bearer tok-1"))
+    while not auth_utils._remote_flight_async._calls:
+        await asyncio.sleep(0)
+    assert list(auth_utils._remote_flight_async._calls) == [auth_utils.TokenCache._key("tok-1")]
+    assert (await pending)["id"] == "uuid-1"
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_remembered(upstream):
+    results = await asyncio.gather(
+        *(auth_utils.get_user_from_token_async("Bearer invalido") for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, HTTPException) and r.status_code == 401 for r in results)
+    assert upstream.count("GET", "/auth/v1/user") == 1
+
+    with pytest.raises(HTTPException):
+        await auth_utils.get_user_from_token_async("Bearer invalido")
+    assert upstream.count("GET", "/auth/v1/user") == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = AsyncSingleFlight("teste")
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    first = asyncio.ensure_future(flight.do("k", slow))
+    second = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == {"ok": True}
+    assert flight.saved == 1
+
+
+def test_sync_single_flight_across_threads():
+    flight = SingleFlight("teste")
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"id": "uuid-1"}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": "uuid-1"}] * 5
+    assert flight.saved == 4
+
+
+def test_sync_single_flight_propagates_errors():
+    flight = SingleFlight("teste")
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("falhou")))
+    assert flight.do("k", lambda: 42) == 42
@@ -0,0 +1,24 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_warmup(upstream):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        r = await ac.get("/ready")
+        assert r.status_code == 503
+        assert r.json() == {"status": "starting"}
+
+        async with app.router.lifespan_context(app):
+            r = await ac.get("/ready")
+            assert r.status_code == 200
+            body = r.json()
+            assert body["status"] == "ready"
+            assert body["import_ms"] > 0
+            assert body["warmup_ms"] >= 0
+            assert upstream.count("GET", "/auth/v1/health") >= 1
+
+        r = await ac.get("/ready")
+        assert r.status_code == 503
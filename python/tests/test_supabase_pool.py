@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+from python.app.deps import supabase_client
+from python.app.main import app
+
+
+@pytest.mark.asyncio
+async def test_all_clients_share_one_transport(upstream, monkeypatch):
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service.key.test")
+    anon = supabase_client.get_async_anon_client()
+    service = supabase_client.get_async_service_client()
+    transports = {
+        anon.auth._http_client._transport,
+        anon.postgrest.session._transport,
+        service.auth._http_client._transport,
+        service.postgrest.session._transport,
+    }
+    assert transports == {supabase_client.get_transport()}
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_and_closes_pool(upstream, monkeypatch):
+    monkeypatch.setenv("SUPABASE_HTTP_WARMUP_CONNECTIONS", "3")
+    async with app.router.lifespan_context(app):
+        assert upstream.count("GET", "/auth/v1/health") == 3
+        assert supabase_client._async_anon_client is not None
+    assert supabase_client._transport is None
+    assert supabase_client._async_anon_client is None
+
+
+@pytest.mark.asyncio
+async def test_in_flight_gauge_tracks_open_responses():
+    def in_flight():
+        return REGISTRY.get_sample_value("supabase_http_requests_in_flight")
+
+    mock = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(b"{}")))
+    transport = supabase_client.PooledTransport(mock, max_connections=10)
+    base = in_flight()
+    async with httpx.AsyncClient(transport=transport, base_url="http://supabase.test") as client:
+        async with client.stream("GET", "/rest/v1/users") as resp:
+            assert in_flight() == base + 1
+            await resp.aread()
+        assert in_flight() == base
+        await client.get("/rest/v1/users")
+        assert in_flight() == base
+    assert REGISTRY.get_sample_value("supabase_http_pool_max_connections") == 10
@@ -0,0 +1,66 @@
+import time
+
+import jwt
+import pytest
+
+from python.app.utils import auth as auth_utils
+
+
+def make_token(exp_in=3600, sub="uuid-1"):
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + exp_in}, "segredo-de-teste", algorithm="HS256")
+
+
+@pytest.fixture
+def remote_calls(monkeypatch):
+    calls = []
+
+    def fake_remote(token):
+        calls.append(token)
+        return {"id": jwt.decode(token, options={"verify_signature": False})["sub"], "email": "user@example.com"}
+
+    monkeypatch.setenv("AUTH_VERIFY_MODE", "remote")
+    monkeypatch.setattr(auth_utils, "_get_user_remote", fake_remote)
+    monkeypatch.setattr(auth_utils, "token_cache", auth_utils.TokenCache(maxsize=2, ttl=60))
+    return calls
+
+
+def test_repeat_requests_hit_cache(remote_calls):
+    token = make_token()
+    for _ in range(3):
+        assert auth_utils.get_user_from_token(f"Bearer {token}")["id"] == "uuid-1"
+    assert len(remote_calls) == 1
+    stats = auth_utils.token_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    # Só o hash do token é usado como chave
+    assert list(auth_utils.token_cache.backend._entries) == [auth_utils.TokenCache._key(token)]
+    assert token not in auth_utils.TokenCache._key(token)
+
+
+def test_entry_never_outlives_token_exp(remote_calls, monkeypatch):
+    token = make_token(exp_in=5)
+    auth_utils.get_user_from_token(f"Bearer {token}")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 6)
+    assert auth_utils.token_cache.get(token) is None
+
+
+def test_lru_eviction_and_invalidation(remote_calls):
+    t1, t2, t3 = (make_token(sub=f"uuid-{i}") for i in range(1, 4))
+    for t in (t1, t2):
+        auth_utils.get_user_from_token(f"Bearer {t}")
+    auth_utils.get_user_from_token(f"Bearer {t1}")  # t1 passa a ser o mais recente
+    auth_utils.get_user_from_token(f"Bearer {t3}")  # expulsa t2
+    assert auth_utils.token_cache.stats()["evictions"] == 1
+    assert auth_utils.token_cache.get(t2) is None
+    assert auth_utils.token_cache.get(t1) is not None
+
+    assert auth_utils.invalidate_token(f"Bearer {t1}") is True
+    auth_utils.get_user_from_token(f"Bearer {t1}")
+    assert remote_calls.count(t1) == 2
+
+
+def test_tokens_without_exp_are_not_cached(remote_calls):
+    token = jwt.encode({"sub": "uuid-1"}, "segredo-de-teste", algorithm="HS256")
+    auth_utils.get_user_from_token(f"Bearer {token}")
+    auth_utils.get_user_from_token(f"Bearer {token}")
+    assert len(remote_calls) == 2
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+from python.app.utils import tracing
+
+AUTH = {"Authorization": "Bearer tok-1"}
+
+
+def _metrics(header):
+    return {item.split(";")[0].strip(): float(item.split("dur=")[1]) for item in header.split(",")}
+
+
+@pytest.mark.asyncio
+async def test_server_timing_breaks_down_upstream_calls(upstream, monkeypatch):
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(server_timing=True, path=None, sample_rate=1.0))
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers=AUTH)
+    assert resp.status_code == 200
+    timings = _metrics(resp.headers["server-timing"])
+    assert set(timings) == {"auth.token", "auth.get_user", "table.users.select", "total"}
+    assert timings["auth.get_user"] <= timings["auth.token"] <= timings["total"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_tracing_adds_nothing(upstream, monkeypatch):
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(server_timing=False, path=None, sample_rate=1.0))
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers=AUTH)
+    assert "server-timing" not in resp.headers
+    assert tracing._current.get() is None
+
+
+@pytest.mark.asyncio
+async def test_sampled_traces_go_to_file(upstream, monkeypatch, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = tracing.Tracer(server_timing=False, path=str(path), sample_rate=1.0)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users/me", headers={**AUTH, "X-Request-ID": "req-1"})
+        await ac.get("/")
+    tracer.close()
+
+    assert "server-timing" not in resp.headers
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["path"] for line in lines] == ["/users/me", "/"]
+    me = lines[0]
+    assert (me["request_id"], me["status"]) == ("req-1", 200)
+    assert [s["name"] for s in me["spans"]] == ["auth.get_user", "auth.token", "table(users).select"]
+    assert all(s["start_ms"] >= 0 and s["dur_ms"] >= 0 for s in me["spans"])
+    assert lines[1]["spans"] == []
+
+
+def test_sample_rate_zero_disables_file_tracing(tmp_path):
+    tracer = tracing.Tracer(server_timing=False, path=str(tmp_path / "t.jsonl"), sample_rate=0.0)
+    assert tracer.begin() is None
+    assert not (tmp_path / "t.jsonl").exists()
@@ -0,0 +1,176 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.deps import user_import
+from python.app.main import app
+
+REST = "/rest/v1/users"
+SIGNUP = "/auth/v1/signup"
+ADMIN = {"Authorization": "Bearer tok-admin"}
+
+
+def _ndjson(rows):
+    return "".join(json.dumps(r) + "\n" for r in rows).encode()
+
+
+def _row(i):
+    return {"email": f"user{i}@example.com", "password": "Segredo123", "name": f"User {i}", "phone": "+5511999999999"}
+
+
+async def _import(body, content_type="application/x-ndjson", headers=ADMIN):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.post("/users/import", headers={**headers, "Content-Type": content_type}, content=body)
+    lines = [json.loads(line) for line in resp.text.splitlines()] if resp.status_code == 200 else []
+    return resp, lines
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_signs_up_each_row_and_inserts_in_chunks(upstream, monkeypatch):
+    monkeypatch.setenv("IMPORT_INSERT_CHUNK", "2")
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+
+    resp, lines = await _import(_ndjson([_row(i) for i in range(5)]))
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    results, summary = lines[:-1], lines[-1]
+    assert summary == {"summary": {"rows": 5, "created": 5, "auth_created": 0, "invalid": 0, "failed": 0}}
+    assert sorted(r["line"] for r in results) == [1, 2, 3, 4, 5]
+    assert all(r["status"] == "created" for r in results)
+    for r in results:
+        assert upstream.users[r["id"]]["email"] == r["email"]
+    assert upstream.count("POST", SIGNUP) == 5
+    # 5 linhas em lotes de 2
+    assert upstream.count("POST", REST) == 3
+
+
+@pytest.mark.asyncio
+async def test_import_csv_reports_invalid_rows_without_stopping(upstream):
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    body = (
+        "email,password,name,phone\n"
+        "a@example.com,Segredo123,Ana,+5511999999999\n"
+        "nao-e-email,Segredo123,Bia,+5511999999999\n"
+        "\n"
+        "c@example.com,123,Caio,+5511999999999\n"
+        "d@example.com,Segredo123,Duda,+5511999999999\n"
+    ).encode()
+
+    resp, lines = await _import(body, content_type="text/csv")
+
+    assert resp.status_code == 200
+    by_line = {r["line"]: r for r in lines[:-1]}
+    assert by_line[2]["status"] == "created"
+    assert by_line[3]["status"] == "invalid" and "email" in by_line[3]["error"]
+    assert by_line[5]["status"] == "invalid" and "password" in by_line[5]["error"]
+    assert by_line[6]["status"] == "created"
+    assert lines[-1] == {"summary": {"rows": 4, "created": 2, "auth_created": 0, "invalid": 2, "failed": 0}}
+    assert upstream.count("POST", SIGNUP) == 2
+
+
+@pytest.mark.asyncio
+async def test_import_csv_without_required_columns_stops_at_header(upstream):
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+
+    resp, lines = await _import(b"email,name\na@example.com,Ana\n", content_type="text/csv")
+
+    assert resp.status_code == 200
+    assert lines[0]["line"] == 1 and "password" in lines[0]["error"]
+    assert lines[-1] == {"summary": {"rows": 1, "created": 0, "auth_created": 0, "invalid": 1, "failed": 0}}
+    assert upstream.count("POST", SIGNUP) == 0
+
+
+@pytest.mark.asyncio
+async def test_import_failed_chunk_is_retried_row_by_row(upstream, monkeypatch):
+    monkeypatch.setenv("IMPORT_INSERT_CHUNK", "3")
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    # O lote falha inteiro; isolando as linhas, só a primeira tentativa individual falha
+    upstream.inject("POST", REST, 409, 409)
+
+    resp, lines = await _import(_ndjson([_row(i) for i in range(3)]))
+
+    summary = lines[-1]["summary"]
+    assert summary == {"rows": 3, "created": 2, "auth_created": 1, "invalid": 0, "failed": 0}
+    # O sign-up deu certo: a conta existe no GoTrue sem linha em `users`, e o id volta
+    orphan = [r for r in lines[:-1] if r["status"] == "auth_created"]
+    assert len(orphan) == 1 and orphan[0]["id"] and orphan[0]["error"]
+    assert orphan[0]["id"] not in upstream.users
+    # 1 lote + 3 inserts individuais
+    assert upstream.count("POST", REST) == 4
+
+
+@pytest.mark.asyncio
+async def test_import_limits_concurrent_sign_ups(upstream, monkeypatch):
+    monkeypatch.setenv("IMPORT_SIGNUP_CONCURRENCY", "3")
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    active = peak = 0
+    original = user_import._sign_up
+
+    async def slow_sign_up(email, password):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.01)
+            return await original(email, password)
+        finally:
+            active -= 1
+
+    monkeypatch.setattr(user_import, "_sign_up", slow_sign_up)
+
+    resp, lines = await _import(_ndjson([_row(i) for i in range(12)]))
+
+    assert lines[-1]["summary"]["created"] == 12
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_long_lines(upstream, monkeypatch):
+    monkeypatch.setenv("IMPORT_MAX_LINE_BYTES", "200")
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    big = {**_row(1), "name": "x" * 500}
+
+    resp, lines = await _import(_ndjson([big, _row(2)]))
+
+    assert {"line": 1, "status": "invalid", "error": "linha maior que 200 bytes"} in lines
+    assert lines[-1] == {"summary": {"rows": 2, "created": 1, "auth_created": 0, "invalid": 1, "failed": 0}}
+
+
+@pytest.mark.asyncio
+async def test_import_requires_admin(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+
+    resp, _ = await _import(_ndjson([_row(1)]), headers={"Authorization": "Bearer tok-1"})
+
+    assert resp.status_code == 403
+    assert upstream.count("POST", SIGNUP) == 0
+
+
+@pytest.mark.asyncio
+async def test_import_interrupted_before_insert_logs_accounts_without_profile(upstream, monkeypatch):
+    hold = asyncio.Event()
+    # O insert do lote fica sem resposta e o cliente desconecta com as contas já criadas no GoTrue
+    upstream.inject("POST", REST, hold)
+    warnings = []
+    monkeypatch.setattr(user_import.logger, "warning", lambda msg, extra=None: warnings.append((msg, extra)))
+
+    async def body():
+        yield _ndjson([_row(1), _row(2)])
+
+    results = user_import.import_users(body(), "ndjson")
+    first = asyncio.ensure_future(results.__anext__())
+    while upstream.count("POST", REST) == 0:
+        await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert upstream.count("POST", SIGNUP) == 2
+    [(message, extra)] = warnings
+    assert message == "import_auth_created"
+    # Sem resposta do insert não há como saber se o perfil foi gravado: os ids vão para o log
+    assert len(set(extra["user_ids"])) == 2
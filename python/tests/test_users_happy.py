@@ -1,11 +1,13 @@
 import pytest
-from httpx import AsyncClient, ASGITransport
+from httpx import AsyncClient, ASGITransport, QueryParams
 from python.app.main import app
 
 
 class FakeBuilder:
     def __init__(self, data):
         self._data = data
+        self._single = False
+        self.params = QueryParams()
 
     def select(self, *_args, **_kwargs):
         return self
@@ -19,15 +21,19 @@ class FakeBuilder:
     def eq(self, *_args, **_kwargs):
         return self
 
+    def limit(self, *_args, **_kwargs):
+        return self
+
     def single(self):
+        self._single = True
         return self
 
-    def execute(self):
+    async def execute(self):
         class R:
             def __init__(self, d):
                 self.data = d
                 self.error = None
-        return R(self._data)
+        return R(self._data if self._single else [self._data])
 
 
 class FakeDB:
@@ -41,11 +47,14 @@ class FakeDB:
 @pytest.mark.asyncio
 async def test_users_me_success(monkeypatch):
     # Fake token decode
-    from python.app.utils import auth as auth_utils
-    monkeypatch.setattr(auth_utils, "get_user_from_token", lambda bearer: {"id": "uuid-1", "email": "user@example.com"})
+    from python.app.routers import users as users_router
+
+    async def fake_user_from_token(bearer):
+        return {"id": "uuid-1", "email": "user@example.com"}
+
+    monkeypatch.setattr(users_router, "get_user_from_token_async", fake_user_from_token)
 
     # Fake DB clients
-    from python.app.deps import supabase_client
     fake_user = {
         "id": "uuid-1",
         "email": "user@example.com",
@@ -53,8 +62,11 @@ async def test_users_me_success(monkeypatch):
         "phone": "+5511999999999",
         "status": "active",
     }
-    monkeypatch.setattr(supabase_client, "get_anon_client", lambda: FakeDB(fake_user))
-    monkeypatch.setattr(supabase_client, "get_service_client", lambda: None)
+    from python.app.deps import users_repo
+    from python.app.utils.cache import MemoryCache
+    monkeypatch.setattr(users_repo, "profile_cache", MemoryCache())
+    monkeypatch.setattr(users_repo, "get_async_anon_client", lambda: FakeDB(fake_user))
+    monkeypatch.setattr(users_repo, "get_async_service_client", lambda: None)
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         resp = await ac.get("/users/me", headers={"Authorization": "Bearer token"})
@@ -66,11 +78,14 @@ async def test_users_me_success(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_update_user_success(monkeypatch):
-    from python.app.utils import auth as auth_utils
-    monkeypatch.setattr(auth_utils, "get_user_from_token", lambda bearer: {"id": "uuid-1", "email": "user@example.com"})
+    from python.app.routers import users as users_router
+
+    async def fake_user_from_token(bearer):
+        return {"id": "uuid-1", "email": "user@example.com"}
+
+    monkeypatch.setattr(users_router, "get_user_from_token_async", fake_user_from_token)
 
     # Fake DB returns updated user on select
-    from python.app.deps import supabase_client
     updated_user = {
         "id": "uuid-1",
         "email": "user@example.com",
@@ -78,8 +93,11 @@ async def test_update_user_success(monkeypatch):
         "phone": "+5511999999999",
         "status": "active",
     }
-    monkeypatch.setattr(supabase_client, "get_anon_client", lambda: FakeDB(updated_user))
-    monkeypatch.setattr(supabase_client, "get_service_client", lambda: None)
+    from python.app.deps import users_repo
+    from python.app.utils.cache import MemoryCache
+    monkeypatch.setattr(users_repo, "profile_cache", MemoryCache())
+    monkeypatch.setattr(users_repo, "get_async_anon_client", lambda: FakeDB(updated_user))
+    monkeypatch.setattr(users_repo, "get_async_service_client", lambda: None)
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         resp = await ac.put("/users/uuid-1", headers={"Authorization": "Bearer token"}, json={"name": "Novo Nome"})
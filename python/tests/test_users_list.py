@@ -0,0 +1,102 @@
+import base64
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+
+REST = "/rest/v1/users"
+ADMIN = {"Authorization": "Bearer tok-admin"}
+ADMIN_ID = "00000000-0000-0000-0000-00000000a000"
+
+
+def uid(i):
+    return f"00000000-0000-0000-0000-{i:012d}"
+
+
+def seed(upstream, n):
+    upstream.add_user(ADMIN_ID, token="tok-admin", role="admin", created_at="2024-01-01T00:00:00+00:00")
+    for i in range(n):
+        # Pares com o mesmo created_at exercitam o desempate por id
+        upstream.add_user(
+            uid(i),
+            created_at=f"2024-02-{i // 2 + 1:02d}T00:00:00+00:00",
+            status="blocked" if i % 3 == 0 else "active",
+        )
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_walks_every_row_once(upstream):
+    seed(upstream, 7)
+    seen, cursor = [], None
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            resp = await ac.get("/users", headers=ADMIN, params=params)
+            assert resp.status_code == 200
+            body = resp.json()
+            seen += [u["id"] for u in body["users"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+    assert seen == [ADMIN_ID] + [uid(i) for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_filters_and_field_projection(upstream):
+    seed(upstream, 6)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users", headers=ADMIN, params={"status": "blocked", "fields": "email"})
+        assert resp.status_code == 200
+        users = resp.json()["users"]
+        assert [u["id"] for u in users] == [uid(0), uid(3)]
+        assert set(users[0]) == {"id", "email"}
+
+        resp = await ac.get("/users", headers=ADMIN, params={"fields": "password"})
+        assert resp.status_code == 400
+        resp = await ac.get("/users", headers=ADMIN, params={"cursor": "lixo"})
+        assert resp.status_code == 400
+
+
+
+def cursor_of(*values):
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    # Valores que escapariam das aspas do filtro `or=(...)`
+    cursor_of('2024-01-01T00:00:00+00:00",role.eq."admin', uid(1)),
+    cursor_of("2024-01-01T00:00:00+00:00", f'{uid(1)}",role.eq."admin'),
+    cursor_of("ontem", uid(1)),
+    cursor_of(20240101, uid(1)),
+    cursor_of("2024-01-01T00:00:00+00:00", "uuid-1"),
+])
+@pytest.mark.asyncio
+async def test_cursor_must_hold_a_timestamp_and_a_uuid(upstream, cursor):
+    seed(upstream, 2)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users", headers=ADMIN, params={"cursor": cursor})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Cursor inválido"
+    assert upstream.count("GET", REST) == 1
+
+@pytest.mark.asyncio
+async def test_ndjson_streams_page_by_page(upstream):
+    seed(upstream, 9)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users", headers={**ADMIN, "Accept": "application/x-ndjson"}, params={"limit": 4, "fields": "status"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(lines) == 10
+    assert set(lines[1]) == {"id", "status"}
+    # role do admin + 3 páginas (4 + 4 + 2)
+    assert upstream.count("GET", REST) == 4
+
+
+@pytest.mark.asyncio
+async def test_list_requires_admin(upstream):
+    upstream.add_user("uuid-1", token="tok-1")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.get("/users", headers={"Authorization": "Bearer tok-1"})
+    assert resp.status_code == 403
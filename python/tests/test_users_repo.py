@@ -0,0 +1,55 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from python.app.main import app
+
+REST = "/rest/v1/users"
+
+
+@pytest.mark.asyncio
+async def test_update_user_is_single_upstream_write(upstream):
+    upstream.add_user("uuid-1", token="tok-1", name="Antigo")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.put("/users/uuid-1", headers={"Authorization": "Bearer tok-1"}, json={"name": "Novo Nome"})
+    assert resp.status_code == 200
+    user = resp.json()["user"]
+    assert user["name"] == "Novo Nome"
+    assert user["updated_at"] == "2024-02-01T12:00:00+00:00"
+    assert upstream.count(path=REST) == 1
+    assert upstream.count("PATCH", REST) == 1
+
+
+@pytest.mark.asyncio
+async def test_patch_status_does_not_reselect(upstream):
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    upstream.add_user("uuid-2")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.patch("/users/uuid-2/status", headers={"Authorization": "Bearer tok-admin"}, json={"status": "blocked"})
+    assert resp.status_code == 200
+    assert resp.json()["user"] == {**resp.json()["user"], "id": "uuid-2", "status": "blocked"}
+    # select do role do admin + update com representação
+    assert upstream.count("GET", REST) == 1
+    assert upstream.count("PATCH", REST) == 1
+
+
+@pytest.mark.asyncio
+async def test_patch_status_unknown_user_is_404(upstream):
+    upstream.add_user("admin-1", token="tok-admin", role="admin")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.patch("/users/nao-existe/status", headers={"Authorization": "Bearer tok-admin"}, json={"status": "blocked"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_register_inserts_and_returns_row_in_one_call(upstream):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        resp = await ac.post("/auth/register", json={
+            "email": "novo@example.com",
+            "password": "Senha123",
+            "name": "Novo",
+            "phone": "+5511999999999",
+        })
+    assert resp.status_code == 200
+    assert resp.json()["user"]["email"] == "novo@example.com"
+    assert upstream.count("POST", "/auth/v1/signup") == 1
+    assert upstream.count(path=REST) == 1
+    assert upstream.count("POST", REST) == 1